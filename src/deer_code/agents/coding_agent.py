@@ -1,40 +1,62 @@
 import os
+from typing import Optional
 
 from langchain.agents import create_agent
 from langchain.tools import BaseTool
 from langgraph.checkpoint.base import RunnableConfig
 
+from deer_code.config import get_config_section
 from deer_code.models import init_chat_model
 from deer_code.project import project
 from deer_code.prompts import apply_prompt_template
 from deer_code.tools import (
+    bash_job_tool,
     bash_tool,
     grep_tool,
     ls_tool,
+    patch_tool,
     text_editor_tool,
     todo_write_tool,
     tree_tool,
 )
 
+from .scheduler import DEFAULT_MAX_WORKERS, ToolSchedulerMiddleware
 from .state import CodingAgentState
 
 
-def create_coding_agent(plugin_tools: list[BaseTool] = [], **kwargs):
+def create_coding_agent(
+    plugin_tools: list[BaseTool] = [],
+    max_tool_workers: Optional[int] = None,
+    **kwargs,
+):
     """Create a coding agent.
 
     Args:
         plugin_tools: Additional tools to add to the agent.
+        max_tool_workers: Maximum number of read-only tool calls run concurrently.
+            Defaults to `tools.scheduler.max_workers` in the config.
         **kwargs: Additional keyword arguments to pass to the agent.
 
     Returns:
         The coding agent.
     """
+    if max_tool_workers is None:
+        max_tool_workers = (
+            get_config_section(["tools", "scheduler", "max_workers"])
+            or DEFAULT_MAX_WORKERS
+        )
+    middleware = [
+        ToolSchedulerMiddleware(max_workers=max_tool_workers),
+        *kwargs.pop("middleware", []),
+    ]
     return create_agent(
         model=init_chat_model(),
         tools=[
             bash_tool,
+            bash_job_tool,
             grep_tool,
             ls_tool,
+            patch_tool,
             text_editor_tool,
             todo_write_tool,
             tree_tool,
@@ -45,6 +67,7 @@ def create_coding_agent(plugin_tools: list[BaseTool] = [], **kwargs):
         ),
         state_schema=CodingAgentState,
         name="coding_agent",
+        middleware=middleware,
         **kwargs,
     )
 
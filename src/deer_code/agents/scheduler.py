@@ -0,0 +1,222 @@
+"""
+Scheduling of the tool calls emitted in a single model turn.
+
+The tool node starts every tool call of an AIMessage at once. The scheduler
+middleware splits the calls into batches, in tool_call order:
+- consecutive read-only calls (see `deer_code.tools.side_effects`) form one
+  batch and run concurrently, at most `max_workers` at a time.
+- every mutating call is a batch of its own.
+A batch only starts once all the batches before it have finished, so mutating
+calls see the effects of the calls emitted before them and vice versa.
+Results are still returned by the tool node in the original tool_call order.
+
+Calls that already have a ToolMessage, e.g. when resuming after an interrupt,
+are not run again by the tool node, so they are left out of the batches.
+"""
+
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import ToolCallRequest
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.types import Command
+
+from deer_code.tools.side_effects import is_read_only
+
+DEFAULT_MAX_WORKERS = 4
+
+# Seconds a call waits for the batches before it, after which it runs anyway
+BATCH_WAIT_TIMEOUT = 900
+
+
+def plan_batches(read_only: list[bool]) -> list[int]:
+    """
+    Assign each tool call to a batch.
+
+    Args:
+        read_only: Whether each tool call is read-only, in tool_call order.
+
+    Returns:
+        The batch number of each tool call. Batch numbers start at 0 and are
+        consecutive.
+    """
+    batches: list[int] = []
+    batch = -1
+    for i, is_read in enumerate(read_only):
+        if not (is_read and i > 0 and read_only[i - 1]):
+            batch += 1
+        batches.append(batch)
+    return batches
+
+
+class _Plan:
+    """The execution state of the tool calls of one AIMessage."""
+
+    def __init__(self, batches: list[int], max_workers: int):
+        self.batches = batches
+        self.remaining = Counter(batches)
+        self.pending = len(batches)
+        self.current = 0
+        self.max_workers = max_workers
+        self.condition = threading.Condition()
+        self.slots = threading.Semaphore(max_workers)
+        # Created lazily because they must be bound to the running event loop
+        self.async_condition: Optional[asyncio.Condition] = None
+        self.async_slots: Optional[asyncio.Semaphore] = None
+
+    def finish(self, batch: int) -> bool:
+        """Record a finished call. Return True if the batch is complete."""
+        self.pending -= 1
+        self.remaining[batch] -= 1
+        if self.remaining[batch] == 0:
+            self.current = batch + 1
+            return True
+        return False
+
+
+class ToolSchedulerMiddleware(AgentMiddleware):
+    """Run read-only tool calls concurrently and mutating tool calls in order."""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        """
+        Initialize ToolSchedulerMiddleware.
+
+        Args:
+            max_workers: Maximum number of read-only tool calls running at the
+                same time.
+        """
+        super().__init__()
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self._plans: dict[tuple[str, ...], _Plan] = {}
+        self._lock = threading.Lock()
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], ToolMessage | Command],
+    ) -> ToolMessage | Command:
+        scheduled = self._schedule(request)
+        if scheduled is None:
+            return handler(request)
+        key, plan, batch = scheduled
+
+        with plan.condition:
+            if not plan.condition.wait_for(
+                lambda: plan.current >= batch, timeout=BATCH_WAIT_TIMEOUT
+            ):
+                self._abandon(key, plan)
+        try:
+            with plan.slots:
+                return handler(request)
+        finally:
+            with plan.condition:
+                if plan.finish(batch):
+                    plan.condition.notify_all()
+            self._release(key, plan)
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command]],
+    ) -> ToolMessage | Command:
+        scheduled = self._schedule(request)
+        if scheduled is None:
+            return await handler(request)
+        key, plan, batch = scheduled
+
+        with self._lock:
+            if plan.async_condition is None:
+                plan.async_condition = asyncio.Condition()
+                plan.async_slots = asyncio.Semaphore(plan.max_workers)
+        try:
+            async with plan.async_condition:
+                await asyncio.wait_for(
+                    plan.async_condition.wait_for(lambda: plan.current >= batch),
+                    BATCH_WAIT_TIMEOUT,
+                )
+        except asyncio.TimeoutError:
+            self._abandon(key, plan)
+        try:
+            async with plan.async_slots:
+                return await handler(request)
+        finally:
+            async with plan.async_condition:
+                if plan.finish(batch):
+                    plan.async_condition.notify_all()
+            self._release(key, plan)
+
+    def _schedule(
+        self, request: ToolCallRequest
+    ) -> Optional[tuple[tuple[str, ...], _Plan, int]]:
+        """Find the plan and batch of a tool call, or None if it can't be scheduled."""
+        messages = request.state.get("messages", []) if isinstance(request.state, dict) else []
+        position = _find_ai_message(messages, request.tool_call.get("id"))
+        if position is None:
+            return None
+        message = messages[position]
+        # Only the calls without a result yet are run by the tool node
+        answered = {
+            later.tool_call_id
+            for later in messages[position + 1 :]
+            if isinstance(later, ToolMessage)
+        }
+        tool_calls = [call for call in message.tool_calls if call.get("id") not in answered]
+        key = tuple(call.get("id") or "" for call in tool_calls)
+        if len(set(key)) != len(key) or request.tool_call["id"] not in key:
+            # Calls can't be told apart, fall back to the tool node's default
+            return None
+        index = key.index(request.tool_call["id"])
+
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                tools = _tools_by_name(request)
+                read_only = [
+                    is_read_only(tools.get(call["name"]), call.get("args"))
+                    for call in tool_calls
+                ]
+                plan = _Plan(plan_batches(read_only), self.max_workers)
+                self._plans[key] = plan
+        return key, plan, plan.batches[index]
+
+    def _release(self, key: tuple[str, ...], plan: _Plan) -> None:
+        with self._lock:
+            if plan.pending == 0 and self._plans.get(key) is plan:
+                del self._plans[key]
+
+    def _abandon(self, key: tuple[str, ...], plan: _Plan) -> None:
+        """Forget a plan whose earlier batches never finished."""
+        with self._lock:
+            if self._plans.get(key) is plan:
+                del self._plans[key]
+
+
+def _find_ai_message(messages: list, tool_call_id: Optional[str]) -> Optional[int]:
+    """Find the position of the latest AIMessage that emitted the tool call."""
+    if not tool_call_id:
+        return None
+    for position in range(len(messages) - 1, -1, -1):
+        message = messages[position]
+        if isinstance(message, AIMessage) and any(
+            call.get("id") == tool_call_id for call in message.tool_calls
+        ):
+            return position
+    return None
+
+
+def _tools_by_name(request: ToolCallRequest) -> dict[str, Any]:
+    """Return the tools available to the agent, keyed by name."""
+    tools = {}
+    runtime_tools = getattr(request.runtime, "tools", None) or []
+    for tool in runtime_tools:
+        name = getattr(tool, "name", None)
+        if name:
+            tools[name] = tool
+    if request.tool is not None:
+        tools[request.tool.name] = request.tool
+    return tools
@@ -1,5 +1,6 @@
 import asyncio
 import re
+import threading
 
 from langchain.messages import AIMessage, AnyMessage, HumanMessage, ToolMessage
 from langgraph.graph.state import CompiledStateGraph
@@ -12,6 +13,8 @@ from textual.widgets import Footer, Header, Input, TabbedContent, TabPane
 from deer_code.agents import create_coding_agent
 from deer_code.project import project
 from deer_code.tools import load_mcp_tools
+from deer_code.tools.terminal.tool import BASH_OUTPUT_KEY, get_terminal_pool
+from deer_code.watcher import FileChange, start_project_watcher, stop_project_watcher
 
 from .components import ChatView, EditorTabs, TerminalView, TodoListView
 from .theme import DEER_DARK_THEME
@@ -108,9 +111,37 @@ class ConsoleApp(App):
         self.focus_input()
         editor_tabs = self.query_one("#editor-tabs", EditorTabs)
         editor_tabs.open_welcome()
+        self._start_watcher()
+        # Start bash while the user types the first message
+        get_terminal_pool().warm()
 
         asyncio.create_task(self._init_agent())
 
+    def on_unmount(self) -> None:
+        stop_project_watcher()
+
+    @work(thread=True, exclusive=True, group="watcher")
+    def _start_watcher(self) -> None:
+        # The first scan of a large tree takes a while, so keep it off the UI thread
+        watcher = start_project_watcher(project.root_dir)
+        if not self.is_running:
+            stop_project_watcher()
+            return
+        watcher.subscribe(self._on_files_changed)
+
+    def _on_files_changed(self, changes: list[FileChange]) -> None:
+        paths = [change.path for change in changes]
+        try:
+            self.call_from_thread(self._reload_files, paths)
+        except RuntimeError:
+            # Published from the app's own thread, or while the app isn't running
+            if threading.current_thread() is threading.main_thread():
+                self._reload_files(paths)
+
+    def _reload_files(self, paths: list[str]) -> None:
+        editor_tabs = self.query_one("#editor-tabs", EditorTabs)
+        editor_tabs.reload_files(paths)
+
     def on_input_submitted(self, event: Input.Submitted) -> None:
         if not self.is_generating and event.input.id == "chat-input":
             user_input = event.value.strip()
@@ -146,11 +177,14 @@ class ConsoleApp(App):
     async def _handle_user_input(self, user_message: HumanMessage) -> None:
         self._process_outgoing_message(user_message)
         self.is_generating = True
-        async for chunk in self._coding_agent.astream(
+        async for mode, chunk in self._coding_agent.astream(
             {"messages": [user_message]},
-            stream_mode="updates",
+            stream_mode=["updates", "custom"],
             config={"recursion_limit": 100, "thread_id": "thread_1"},
         ):
+            if mode == "custom":
+                self._process_custom_chunk(chunk)
+                continue
             roles = chunk.keys()
             for role in roles:
                 messages: list[AnyMessage] = chunk[role].get("messages", [])
@@ -159,6 +193,11 @@ class ConsoleApp(App):
         self.is_generating = False
         self.focus_input()
 
+    def _process_custom_chunk(self, chunk) -> None:
+        if isinstance(chunk, dict) and BASH_OUTPUT_KEY in chunk:
+            terminal_view = self.query_one("#terminal-view", TerminalView)
+            terminal_view.stream(chunk["tool_call_id"], chunk[BASH_OUTPUT_KEY])
+
     def _process_outgoing_message(self, message: HumanMessage) -> None:
         chat_view = self.query_one("#chat-view", ChatView)
         chat_view.add_message(message)
@@ -194,6 +233,11 @@ class ConsoleApp(App):
             elif tool_name == "grep":
                 self._terminal_tool_calls.append(tool_call["id"])
                 terminal_view.write(f"$ grep {" ".join(tool_args.values())}")
+            elif tool_name == "bash_job":
+                self._terminal_tool_calls.append(tool_call["id"])
+                terminal_view.write(
+                    f"$ bash_job {tool_args["command"]}{f" {tool_args["job_id"]}" if tool_args.get("job_id") else ""}"
+                )
             elif tool_name == "ls":
                 self._terminal_tool_calls.append(tool_call["id"])
                 terminal_view.write(f"$ ls {" ".join(tool_args.values())}")
@@ -218,10 +262,10 @@ class ConsoleApp(App):
         terminal_view = self.query_one("#terminal-view", TerminalView)
         if message.tool_call_id in self._terminal_tool_calls:
             output = self._extract_code(message.content)
-            terminal_view.write(
-                output if output.strip() != "" else "\n(empty)\n",
-                muted=True,
-            )
+            output = output if output.strip() != "" else "\n(empty)\n"
+            # Output streamed while the command ran is replaced by the result
+            if not terminal_view.end_stream(message.tool_call_id, output):
+                terminal_view.write(output, muted=True)
             self._terminal_tool_calls.remove(message.tool_call_id)
         elif self._mutable_text_editor_tool_calls.get(message.tool_call_id):
             path = self._mutable_text_editor_tool_calls[message.tool_call_id]
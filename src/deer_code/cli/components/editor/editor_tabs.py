@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from textual.app import ComposeResult
@@ -25,6 +26,13 @@ class EditorTabs(TabbedContent):
         tab.update(file_text)
         return tab
 
+    def reload_files(self, paths: list[str]):
+        """Reload the open tabs of the files that changed on disk."""
+        changed = {os.path.realpath(path) for path in paths}
+        for path, tab in self.tab_map.items():
+            if os.path.realpath(path) in changed and os.path.isfile(path):
+                tab.update()
+
     def open_welcome(self):
         tab = TabPane(title="Welcome", id="welcome-tab")
         markdown = Markdown(Path("docs/welcome.md").read_text(), id="welcome-view")
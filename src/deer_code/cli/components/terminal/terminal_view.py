@@ -1,6 +1,12 @@
 from textual.containers import VerticalScroll
 from textual.widgets import Static
 
+# Seconds between two refreshes of the output of a running command
+STREAM_REFRESH_INTERVAL = 0.1
+
+# Number of trailing characters of a running command shown live
+STREAM_MAX_CHARS = 20_000
+
 
 class TerminalView(VerticalScroll):
     """Terminal view component"""
@@ -21,6 +27,10 @@ class TerminalView(VerticalScroll):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.terminal_output = []
+        # Output of running commands by key, and the widgets showing it
+        self._streams: dict[str, str] = {}
+        self._stream_items: dict[str, Static] = {}
+        self._refresh_scheduled = False
 
     def write(self, text: str, muted: bool = False) -> None:
         """Add output to terminal"""
@@ -28,3 +38,35 @@ class TerminalView(VerticalScroll):
         item = Static(text, classes=f"{'muted' if muted else ''}")
         self.mount(item)
         self.scroll_end(animate=True)
+
+    def stream(self, key: str, text: str) -> None:
+        """Append output of a running command, refreshing the view at most every STREAM_REFRESH_INTERVAL."""
+        self._streams[key] = (self._streams.get(key, "") + text)[-STREAM_MAX_CHARS:]
+        if key not in self._stream_items:
+            item = Static("", classes="muted")
+            self._stream_items[key] = item
+            self.mount(item)
+        if not self._refresh_scheduled:
+            self._refresh_scheduled = True
+            self.set_timer(STREAM_REFRESH_INTERVAL, self._refresh_streams)
+
+    def end_stream(self, key: str, text: str) -> bool:
+        """Replace the live output of a command with its result.
+
+        Returns:
+            bool: False if no output was streamed for the command.
+        """
+        item = self._stream_items.pop(key, None)
+        self._streams.pop(key, None)
+        if item is None:
+            return False
+        self.terminal_output.append(text)
+        item.update(text)
+        self.scroll_end(animate=False)
+        return True
+
+    def _refresh_streams(self) -> None:
+        self._refresh_scheduled = False
+        for key, text in self._streams.items():
+            self._stream_items[key].update(text)
+        self.scroll_end(animate=False)
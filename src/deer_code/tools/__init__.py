@@ -2,10 +2,12 @@
 # This allows tests to import specific modules without triggering all dependencies
 
 __all__ = [
+    "bash_job_tool",
     "bash_tool",
     "grep_tool",
     "load_mcp_tools",
     "ls_tool",
+    "patch_tool",
     "perplexity_search_tool",
     "tavily_search_tool",
     "text_editor_tool",
@@ -19,6 +21,9 @@ def __getattr__(name):
     if name == "text_editor_tool":
         from .edit import text_editor_tool
         return text_editor_tool
+    elif name == "patch_tool":
+        from .edit import patch_tool
+        return patch_tool
     elif name == "grep_tool":
         from .fs import grep_tool
         return grep_tool
@@ -40,6 +45,9 @@ def __getattr__(name):
     elif name == "bash_tool":
         from .terminal.tool import bash_tool
         return bash_tool
+    elif name == "bash_job_tool":
+        from .terminal.tool import bash_job_tool
+        return bash_job_tool
     elif name == "todo_write_tool":
         from .todo import todo_write_tool
         return todo_write_tool
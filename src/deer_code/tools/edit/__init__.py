@@ -1,6 +1,6 @@
 # Lazy imports to avoid loading langchain dependencies at import time
 
-__all__ = ["TextEditor", "text_editor_tool"]
+__all__ = ["TextEditor", "patch_tool", "text_editor_tool"]
 
 
 def __getattr__(name):
@@ -11,4 +11,7 @@ def __getattr__(name):
     elif name == "text_editor_tool":
         from .tool import text_editor_tool
         return text_editor_tool
+    elif name == "patch_tool":
+        from .tool import patch_tool
+        return patch_tool
     raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
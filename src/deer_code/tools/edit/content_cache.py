@@ -0,0 +1,186 @@
+"""
+Process-wide cache of decoded file contents for the text editor.
+
+A `view` followed by a `str_replace` on the same file used to read and decode
+it from disk each time. Contents are now cached by resolved path and served
+while the file's (mtime_ns, size, inode) are unchanged. Writes made through the
+editor update the cache in place.
+
+File timestamps have a coarse granularity on some filesystems, so a file
+rewritten with the same size right after it was cached could keep the same
+mtime. Like git's "racy" index entries, an entry whose mtime is too close to
+the time it was cached is re-read once before it is trusted.
+"""
+
+import os
+import stat as stat_module
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+# Total number of characters kept in the cache
+DEFAULT_MAX_CHARS = 64 * 1024 * 1024
+
+# Files larger than this are never cached
+MAX_CACHED_FILE_SIZE = 8 * 1024 * 1024
+
+# Entries modified within this window before being cached are re-read once.
+# Kernels stamp files from a clock that ticks every few milliseconds.
+RACY_WINDOW_NS = 10_000_000
+
+# Window used when the filesystem only stores whole seconds
+COARSE_RACY_WINDOW_NS = 1_000_000_000
+
+
+class _Entry(NamedTuple):
+    content: str
+    mtime_ns: int
+    size: int
+    inode: int
+    cached_at_ns: int
+
+
+class FileContentCache:
+    """A size-bounded LRU cache of file contents validated by stat."""
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS):
+        """
+        Initialize FileContentCache.
+
+        Args:
+            max_chars: Maximum total number of characters cached. The least
+                recently used files are evicted first.
+        """
+        self.max_chars = max_chars
+        self.hits = 0
+        self.misses = 0
+        self._chars = 0
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def read(self, path: Path, stat: Optional[os.stat_result] = None) -> str:
+        """
+        Return the content of a file, from the cache when it is still valid.
+
+        Args:
+            path: The resolved path of the file.
+            stat: The result of `os.stat(path)`, if already known.
+
+        Returns:
+            The decoded file content.
+
+        Raises:
+            OSError: If the file cannot be read.
+            UnicodeDecodeError: If the file is not valid text.
+        """
+        key = os.fspath(path)
+        if stat is None:
+            stat = os.stat(key)
+        content = self.get(key, stat)
+        if content is not None:
+            return content
+
+        with open(key, "r") as file:
+            before = os.fstat(file.fileno())
+            content = file.read()
+            after = os.fstat(file.fileno())
+        if _signature(before) == _signature(after):
+            self.put(key, content, after)
+        return content
+
+    def get(self, path: str | Path, stat: os.stat_result) -> Optional[str]:
+        """
+        Return the cached content of a file, or None if missing or outdated.
+
+        Args:
+            path: The resolved path of the file.
+            stat: The current `os.stat` result of the file.
+        """
+        key = os.fspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_valid(entry, stat):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.content
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(
+        self, path: str | Path, content: str, stat: Optional[os.stat_result] = None
+    ) -> None:
+        """
+        Cache the content of a file.
+
+        Args:
+            path: The resolved path of the file.
+            content: The decoded content, as read from or written to the file.
+            stat: The `os.stat` result matching `content`. Defaults to a fresh stat.
+        """
+        key = os.fspath(path)
+        if stat is None:
+            try:
+                stat = os.stat(key)
+            except OSError:
+                self.invalidate(key)
+                return
+        if not stat_module.S_ISREG(stat.st_mode) or stat.st_size > MAX_CACHED_FILE_SIZE:
+            self.invalidate(key)
+            return
+        entry = _Entry(content, stat.st_mtime_ns, stat.st_size, stat.st_ino, time.time_ns())
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._chars += len(content)
+            while self._chars > self.max_chars and self._entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, path: Optional[str | Path] = None) -> None:
+        """
+        Drop the cached content of a file, or of every file.
+
+        Args:
+            path: The resolved path of the file. If None, the whole cache is cleared.
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._chars = 0
+            else:
+                self._remove(os.fspath(path))
+
+    def stats(self) -> dict:
+        """Return the hit and miss counters and the cache size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "chars": self._chars,
+            }
+
+    def _is_valid(self, entry: _Entry, stat: os.stat_result) -> bool:
+        if (entry.mtime_ns, entry.size, entry.inode) != _signature(stat):
+            return False
+        # A write in the same timestamp tick as the cached one would go unnoticed
+        window = RACY_WINDOW_NS
+        if entry.mtime_ns % 1_000_000_000 == 0:
+            window = COARSE_RACY_WINDOW_NS
+        return entry.cached_at_ns - entry.mtime_ns > window
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._chars -= len(entry.content)
+
+
+def _signature(stat: os.stat_result) -> tuple[int, int, int]:
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+# The cache shared by every TextEditor in the process
+content_cache = FileContentCache()
@@ -0,0 +1,130 @@
+"""
+Atomic file writes and per-file locks for the text editor.
+
+A file is written to a temporary file in the same directory, optionally
+fsync'ed, then renamed over the target with `os.replace`, so readers see
+either the old or the new content and never a partial write. Renaming only
+becomes durable once the directory itself is fsync'ed; callers writing many
+files fsync each directory once at the end instead of after every file.
+
+Edits are optimistic: the editor remembers the (mtime_ns, size, inode) of the
+content it based an edit on, and the write fails with `EditConflictError` if
+the file changed in the meantime. The check and the rename happen under a
+per-file lock, so edits of the same file by threads of this process are
+serialized while edits of different files run in parallel. Other processes
+are detected by the check, not blocked.
+"""
+
+import contextlib
+import os
+import stat
+import tempfile
+import threading
+import weakref
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+# Umask assumed where the process's umask can't be read
+DEFAULT_UMASK = 0o022
+
+_locks: "weakref.WeakValueDictionary[str, threading.RLock]" = weakref.WeakValueDictionary()
+_locks_guard = threading.Lock()
+
+
+class EditConflictError(ValueError):
+    """Raised when a file changed after the editor read it."""
+
+
+def _read_umask() -> int:
+    """
+    Return the umask of the process.
+
+    `os.umask` can only read the umask by setting it, which would briefly
+    change the mode of the files other threads create, so the umask is read
+    from /proc instead, where available.
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("Umask:"):
+                    return int(line.split(":", 1)[1], 8)
+    except (OSError, ValueError):
+        pass
+    return DEFAULT_UMASK
+
+
+_UMASK = _read_umask()
+
+
+def file_signature(file_stat: os.stat_result) -> tuple[int, int, int]:
+    """Return the (mtime_ns, size, inode) that identifies a version of a file."""
+    return file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino
+
+
+def current_signature(path: Path) -> Optional[tuple[int, int, int]]:
+    """Return the signature of a file, or None if it does not exist."""
+    try:
+        return file_signature(os.stat(path))
+    except FileNotFoundError:
+        return None
+
+
+@contextlib.contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold the lock of a file for the threads of this process."""
+    key = os.fspath(path)
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.RLock()
+    with lock:
+        yield
+
+
+def atomic_write_text(path: Path, content: str, *, fsync: bool = False) -> None:
+    """
+    Replace the content of a file in one step.
+
+    Args:
+        path: The path of the file. Its directory must exist.
+        content: The text to write.
+        fsync: Whether to flush the file to disk before it replaces the old one.
+            The directory still has to be fsync'ed for the rename to be durable.
+
+    Raises:
+        OSError: If the file cannot be written.
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write(content)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(temp_path)
+        raise
+
+
+def fsync_directories(directories: Iterable[Path]) -> None:
+    """Make the renames and deletions in each directory durable, once per directory."""
+    for directory in set(map(os.fspath, directories)):
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        except OSError:
+            # Some filesystems do not support fsync on directories
+            pass
+        finally:
+            os.close(fd)
@@ -0,0 +1,229 @@
+"""
+Undo journal for edits made through the text editor.
+
+Each edit is recorded as a reverse diff: the offset of the changed region and
+its text before and after the edit, with the unchanged prefix and suffix of the
+file left out. Recording and undoing an edit therefore cost time and memory
+proportional to the change, not to the file.
+
+Entries are kept in a ring buffer of bounded length. When the text they hold
+exceeds the memory budget, the oldest entries are spilled to a directory on
+disk if one is configured, or dropped otherwise.
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+# Number of edits that can be undone
+DEFAULT_MAX_ENTRIES = 256
+
+# Characters of diff text kept in memory before spilling to disk
+DEFAULT_MAX_MEMORY_CHARS = 8 * 1024 * 1024
+
+
+class JournalEntry(NamedTuple):
+    """The reverse diff of one edit."""
+
+    path: str
+    # Offset of the changed region
+    start: int
+    # Length of the file after the edit
+    new_length: int
+    # Whether the file existed before and after the edit
+    old_exists: bool
+    new_exists: bool
+    # Text of the changed region before and after the edit, None once spilled
+    old_text: Optional[str]
+    new_text: Optional[str]
+    spill_file: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.old_text or "") + len(self.new_text or "")
+
+
+class EditJournal:
+    """A bounded journal of reverse diffs, undone most recent first per file."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_memory_chars: int = DEFAULT_MAX_MEMORY_CHARS,
+        spill_dir: Optional[Path] = None,
+    ):
+        """
+        Initialize EditJournal.
+
+        Args:
+            max_entries: Maximum number of edits kept. The oldest are forgotten first.
+            max_memory_chars: Maximum number of diff characters kept in memory.
+            spill_dir: Directory where the diffs of older entries are moved once
+                the memory budget is exceeded. If None, those entries are dropped.
+        """
+        self.max_entries = max_entries
+        self.max_memory_chars = max_memory_chars
+        self.spill_dir = spill_dir
+        self._entries: deque[JournalEntry] = deque()
+        self._memory_chars = 0
+        self._lock = threading.Lock()
+
+    def record(self, path: Path, old: Optional[str], new: Optional[str]) -> None:
+        """
+        Record an edit of a file.
+
+        Args:
+            path: The resolved path of the file.
+            old: The content before the edit, or None if the file did not exist.
+            new: The content after the edit, or None if the file was deleted.
+        """
+        old_content = old or ""
+        new_content = new or ""
+        start = _common_prefix_length(old_content, new_content)
+        end = _common_suffix_length(old_content, new_content, start)
+        entry = JournalEntry(
+            path=os.fspath(path),
+            start=start,
+            new_length=len(new_content),
+            old_exists=old is not None,
+            new_exists=new is not None,
+            old_text=old_content[start : len(old_content) - end],
+            new_text=new_content[start : len(new_content) - end],
+        )
+        with self._lock:
+            self._entries.append(entry)
+            self._memory_chars += entry.size
+            while len(self._entries) > self.max_entries:
+                self._discard(self._entries.popleft())
+            self._enforce_memory_budget()
+
+    def pop(self, path: Path) -> Optional[JournalEntry]:
+        """
+        Remove and return the latest edit of a file, with its diff loaded.
+
+        Args:
+            path: The resolved path of the file.
+
+        Returns:
+            The entry, or None if no edit of the file is recorded.
+        """
+        key = os.fspath(path)
+        with self._lock:
+            for index in range(len(self._entries) - 1, -1, -1):
+                entry = self._entries[index]
+                if entry.path == key:
+                    del self._entries[index]
+                    self._memory_chars -= entry.size
+                    return self._load(entry)
+        return None
+
+    def push(self, entry: JournalEntry) -> None:
+        """Put back an entry returned by `pop` that could not be undone."""
+        with self._lock:
+            self._entries.append(entry)
+            self._memory_chars += entry.size
+            self._enforce_memory_budget()
+
+    def undo(self, entry: JournalEntry, current: Optional[str]) -> Optional[str]:
+        """
+        Compute the content of a file before an edit.
+
+        Args:
+            entry: The entry of the edit, as returned by `pop`.
+            current: The current content of the file, or None if it does not exist.
+
+        Returns:
+            The content before the edit, or None if the file did not exist.
+
+        Raises:
+            ValueError: If the file was changed after the edit.
+        """
+        end = entry.start + len(entry.new_text)
+        if (
+            (current is not None) != entry.new_exists
+            or len(current or "") != entry.new_length
+            or (current or "")[entry.start : end] != entry.new_text
+        ):
+            raise ValueError(
+                f"{entry.path} was changed after the last edit and cannot be undone. "
+                "View the file and edit it instead."
+            )
+        if not entry.old_exists:
+            return None
+        current = current or ""
+        return current[: entry.start] + entry.old_text + current[end:]
+
+    def clear(self) -> None:
+        """Forget every entry and remove the spilled diffs."""
+        with self._lock:
+            self._entries.clear()
+            self._memory_chars = 0
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _enforce_memory_budget(self) -> None:
+        index = 0
+        while self._memory_chars > self.max_memory_chars and index < len(self._entries) - 1:
+            entry = self._entries[index]
+            if entry.spill_file is not None:
+                index += 1
+                continue
+            if self.spill_dir is None:
+                del self._entries[index]
+                self._memory_chars -= entry.size
+                continue
+            self._entries[index] = self._spill(entry)
+            self._memory_chars -= entry.size
+            index += 1
+
+    def _spill(self, entry: JournalEntry) -> JournalEntry:
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        spill_file = self.spill_dir / f"{uuid.uuid4().hex}.json"
+        spill_file.write_text(json.dumps([entry.old_text, entry.new_text]))
+        return entry._replace(old_text=None, new_text=None, spill_file=str(spill_file))
+
+    def _load(self, entry: JournalEntry) -> JournalEntry:
+        if entry.spill_file is None:
+            return entry
+        old_text, new_text = json.loads(Path(entry.spill_file).read_text())
+        os.unlink(entry.spill_file)
+        return entry._replace(old_text=old_text, new_text=new_text, spill_file=None)
+
+    def _discard(self, entry: JournalEntry) -> None:
+        self._memory_chars -= entry.size
+        if entry.spill_file is not None:
+            with contextlib.suppress(OSError):
+                os.unlink(entry.spill_file)
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    """Return the length of the common prefix, comparing slices in C."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix_length(a: str, b: str, prefix: int) -> int:
+    """Return the length of the common suffix that does not overlap the prefix."""
+    low, high = 0, min(len(a), len(b)) - prefix
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle : len(a) - low] == b[len(b) - middle : len(b) - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
@@ -0,0 +1,135 @@
+"""
+Line-offset index for viewing ranges of very large files.
+
+Splitting a multi-gigabyte file into lines to show fifty of them costs time
+and memory proportional to the file. Instead, the file is memory-mapped and
+scanned once in fixed-size blocks, counting newlines in C and recording how
+many lines start before each block. A range of lines is then located with a
+binary search plus a short scan inside one block, and only the bytes of that
+range are decoded.
+
+Indexes are cached by resolved path and validated by (mtime_ns, size, inode),
+so paging through a file scans it only once.
+"""
+
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+# Files at least this large are viewed through a line index
+LARGE_FILE_SIZE = 1024 * 1024
+
+# Size of the blocks whose newline counts are recorded
+BLOCK_SIZE = 64 * 1024
+
+# Number of indexes kept in memory
+MAX_CACHED_INDEXES = 16
+
+
+class LineIndex:
+    """Locates lines of a memory-mapped file without splitting all of it."""
+
+    def __init__(self, path: str | Path, stat: Optional[os.stat_result] = None):
+        """
+        Build the index of a file.
+
+        Args:
+            path: The path of the file to index.
+            stat: The result of `os.stat(path)`, if already known.
+        """
+        self.path = os.fspath(path)
+        stat = stat or os.stat(self.path)
+        self.signature = _signature(stat)
+        self.size = stat.st_size
+        # _newlines_before[i] is the number of newlines before block i
+        self._newlines_before = array("q", [0])
+        with open(self.path, "rb") as file, _map(file, self.size) as data:
+            newlines = 0
+            for start in range(0, self.size, BLOCK_SIZE):
+                newlines += data[start : start + BLOCK_SIZE].count(b"\n")
+                self._newlines_before.append(newlines)
+        # Like str.split("\n"), text after the last newline is a line, even if empty
+        self.line_count = newlines + 1
+
+    def read_lines(self, start_line: int, end_line: int) -> str:
+        """
+        Read a range of lines from the file.
+
+        Args:
+            start_line: The first line to read, 1-indexed.
+            end_line: The last line to read, inclusive.
+
+        Returns:
+            The text of the lines, without the final line break.
+        """
+        with open(self.path, "rb") as file, _map(file, self.size) as data:
+            start = self._line_start(data, start_line)
+            end = self._line_start(data, end_line + 1) - 1 if end_line < self.line_count else self.size
+            return data[start:max(start, end)].decode(errors="replace")
+
+    def _line_start(self, data, line: int) -> int:
+        """Return the offset where a line starts, i.e. after its previous newline."""
+        if line <= 1:
+            return 0
+        newline = line - 1
+        block = bisect_left(self._newlines_before, newline) - 1
+        position = block * BLOCK_SIZE
+        for _ in range(newline - self._newlines_before[block]):
+            position = data.find(b"\n", position) + 1
+        return position
+
+
+_indexes: OrderedDict[str, LineIndex] = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_line_index(path: str | Path, stat: Optional[os.stat_result] = None) -> LineIndex:
+    """
+    Return the line index of a file, reusing a cached one if the file is unchanged.
+
+    Args:
+        path: The resolved path of the file.
+        stat: The result of `os.stat(path)`, if already known.
+
+    Returns:
+        The LineIndex of the file.
+    """
+    key = os.fspath(path)
+    stat = stat or os.stat(key)
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None and index.signature == _signature(stat):
+            _indexes.move_to_end(key)
+            return index
+
+    index = LineIndex(key, stat)
+    with _lock:
+        _indexes[key] = index
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def _map(file, size: int) -> mmap.mmap:
+    if size == 0:
+        # Empty files cannot be mapped
+        return _EmptyMap()
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class _EmptyMap(bytes):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+def _signature(stat: os.stat_result) -> tuple[int, int, int]:
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
@@ -0,0 +1,264 @@
+"""
+Outline of the classes, functions and methods of a source file.
+
+Python files are parsed with `ast`. Other languages use a regex per line to
+find definitions, and brace matching (or the next definition, for languages
+without braces) to find where they end. Outlines are cached by content hash,
+so a file is only parsed again after it changes.
+"""
+
+import ast
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+# Number of outlines kept in memory
+MAX_CACHED_OUTLINES = 256
+
+
+class Symbol(NamedTuple):
+    """A class, function or method and the lines it spans (1-indexed, inclusive)."""
+
+    kind: str
+    name: str
+    start_line: int
+    end_line: int
+    depth: int = 0
+
+
+_BRACE_LANGUAGES = {
+    # Definitions of C-like languages. A match may end before its `{`.
+    "js": [
+        ("class", r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+([A-Za-z_$][\w$]*)"),
+        ("interface", r"^\s*(?:export\s+)?interface\s+([A-Za-z_$][\w$]*)"),
+        ("function", r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)"),
+        ("function", r"^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|[A-Za-z_$][\w$]*\s*=>)"),
+        ("method", r"^\s+(?:(?:public|private|protected|static|readonly|async|get|set|override)\s+)*(?!if\b|for\b|while\b|switch\b|catch\b|return\b|function\b)([A-Za-z_$][\w$]*)\s*\([^;]*\)\s*(?::[^{;]+)?\{\s*$"),
+    ],
+    "go": [
+        ("function", r"^func\s+(?:\([^)]*\)\s*)?([A-Za-z_]\w*)"),
+        ("type", r"^type\s+([A-Za-z_]\w*)\s+(?:struct|interface)\b"),
+    ],
+    "rust": [
+        ("function", r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?(?:extern\s+\"[^\"]*\"\s+)?fn\s+([A-Za-z_]\w*)"),
+        ("struct", r"^\s*(?:pub(?:\([^)]*\))?\s+)?struct\s+([A-Za-z_]\w*)"),
+        ("enum", r"^\s*(?:pub(?:\([^)]*\))?\s+)?enum\s+([A-Za-z_]\w*)"),
+        ("trait", r"^\s*(?:pub(?:\([^)]*\))?\s+)?trait\s+([A-Za-z_]\w*)"),
+        ("impl", r"^\s*impl(?:<[^>]*>)?\s+([^{]+?)\s*(?:\{|$)"),
+    ],
+    "java": [
+        ("class", r"^\s*(?:(?:public|private|protected|static|final|abstract|sealed|partial|internal|data|open)\s+)*(?:class|interface|enum|record|struct)\s+([A-Za-z_]\w*)"),
+        ("method", r"^\s+(?:(?:public|private|protected|static|final|abstract|synchronized|override|virtual|async|internal)\s+)+[\w<>\[\],.?\s]+?\s+([A-Za-z_]\w*)\s*\([^;]*$"),
+    ],
+    "c": [
+        ("struct", r"^\s*(?:typedef\s+)?(?:struct|class|union|enum)\s+([A-Za-z_]\w*)\s*(?::[^{;]*)?\{?\s*$"),
+        ("function", r"^(?!\s*(?:if|for|while|switch|return|else)\b)[A-Za-z_][\w\s\*&:<>,]*?[\s\*&]([A-Za-z_][\w:~]*)\s*\([^;]*\)\s*(?:const\s*)?\{?\s*$"),
+    ],
+}
+
+_INDENT_LANGUAGES = {
+    "ruby": [
+        ("class", r"^\s*class\s+([A-Z][\w:]*)"),
+        ("module", r"^\s*module\s+([A-Z][\w:]*)"),
+        ("method", r"^\s*def\s+((?:self\.)?[\w?!=]+)"),
+    ],
+    "lua": [
+        ("function", r"^\s*(?:local\s+)?function\s+([\w.:]+)"),
+    ],
+    "shell": [
+        ("function", r"^\s*(?:function\s+)?([A-Za-z_][\w-]*)\s*\(\)\s*\{?"),
+    ],
+}
+
+_EXTENSIONS = {
+    **dict.fromkeys([".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx", ".mts", ".cts", ".vue", ".svelte"], "js"),
+    ".go": "go",
+    ".rs": "rust",
+    **dict.fromkeys([".java", ".kt", ".kts", ".scala", ".cs", ".swift", ".dart", ".php"], "java"),
+    **dict.fromkeys([".c", ".h", ".cc", ".cpp", ".cxx", ".hh", ".hpp", ".hxx", ".m", ".mm"], "c"),
+    **dict.fromkeys([".rb", ".rake"], "ruby"),
+    ".lua": "lua",
+    **dict.fromkeys([".sh", ".bash", ".zsh"], "shell"),
+}
+
+_COMPILED = {
+    language: [(kind, re.compile(pattern)) for kind, pattern in patterns]
+    for language, patterns in {**_BRACE_LANGUAGES, **_INDENT_LANGUAGES}.items()
+}
+
+_cache: OrderedDict[tuple[str, str], list[Symbol]] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_outline(content: str, suffix: str) -> Optional[list[Symbol]]:
+    """
+    Return the outline of a file, from the cache if its content was seen before.
+
+    Args:
+        content: The content of the file.
+        suffix: The file extension, e.g. ".py", used to pick the parser.
+
+    Returns:
+        The symbols in the order they appear, or None if the language is not supported.
+    """
+    suffix = suffix.lower()
+    language = "python" if suffix in (".py", ".pyi") else _EXTENSIONS.get(suffix)
+    if language is None:
+        return None
+
+    key = (language, hashlib.blake2b(content.encode(errors="surrogatepass"), digest_size=16).hexdigest())
+    with _cache_lock:
+        symbols = _cache.get(key)
+        if symbols is not None:
+            _cache.move_to_end(key)
+            return symbols
+
+    if language == "python":
+        symbols = outline_python(content)
+    else:
+        symbols = outline_regex(content, language)
+
+    with _cache_lock:
+        _cache[key] = symbols
+        while len(_cache) > MAX_CACHED_OUTLINES:
+            _cache.popitem(last=False)
+    return symbols
+
+
+def outline_python(content: str) -> list[Symbol]:
+    """Return the classes, functions and methods of Python source code."""
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return outline_regex(content, "python")
+
+    symbols = []
+
+    def visit(node: ast.AST, depth: int, in_class: bool):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                kind = "class"
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "method" if in_class else "function"
+                if isinstance(child, ast.AsyncFunctionDef):
+                    kind = f"async {kind}"
+            else:
+                # Definitions may be nested in if/try blocks
+                visit(child, depth, in_class)
+                continue
+            start = min([child.lineno, *(d.lineno for d in child.decorator_list)])
+            symbols.append(Symbol(kind, child.name, start, child.end_lineno or start, depth))
+            visit(child, depth + 1, kind == "class")
+
+    visit(tree, 0, False)
+    return symbols
+
+
+_PYTHON_FALLBACK = re.compile(r"^(\s*)(?:async\s+)?(class|def)\s+([A-Za-z_]\w*)")
+
+
+def outline_regex(content: str, language: str) -> list[Symbol]:
+    """Return the definitions found by the regex heuristics of a language."""
+    lines = content.splitlines()
+    if language == "python":
+        return _outline_by_indentation(lines)
+    patterns = _COMPILED[language]
+
+    if language in _INDENT_LANGUAGES:
+        starts = []
+        for number, line in enumerate(lines, start=1):
+            for kind, pattern in patterns:
+                match = pattern.match(line)
+                if match:
+                    starts.append((number, kind, match.group(1), _indent(line)))
+                    break
+        return _close_by_next_sibling(starts, len(lines))
+
+    symbols = []
+    depth = 0
+    # Symbols whose body has not been closed yet: (index, depth before it opened)
+    open_symbols: list[tuple[int, int]] = []
+    # Symbols matched on a line without `{`, waiting for it on a following line
+    pending: Optional[int] = None
+    for number, line in enumerate(lines, start=1):
+        code = _strip_strings_and_comments(line)
+        if pending is None:
+            for kind, pattern in patterns:
+                match = pattern.match(line)
+                if match:
+                    symbols.append(Symbol(kind, match.group(1).strip(), number, number, len(open_symbols)))
+                    pending = len(symbols) - 1
+                    break
+        for char in code:
+            if char == "{":
+                if pending is not None:
+                    open_symbols.append((pending, depth))
+                    pending = None
+                depth += 1
+            elif char == "}":
+                depth = max(depth - 1, 0)
+                while open_symbols and depth <= open_symbols[-1][1]:
+                    index, _ = open_symbols.pop()
+                    symbols[index] = symbols[index]._replace(end_line=number)
+        if pending is not None and code.rstrip().endswith(";"):
+            # A declaration without a body
+            pending = None
+        elif pending is not None and number - symbols[pending].start_line >= 5:
+            pending = None
+    for index, _ in open_symbols:
+        symbols[index] = symbols[index]._replace(end_line=len(lines))
+    return symbols
+
+
+def format_outline(symbols: list[Symbol]) -> str:
+    """Format symbols as one indented line each, with their line ranges."""
+    width = len(str(max((symbol.end_line for symbol in symbols), default=0)))
+    return "\n".join(
+        f"{symbol.start_line:>{width}}-{symbol.end_line:<{width}} "
+        f"{'  ' * symbol.depth}{symbol.kind} {symbol.name}"
+        for symbol in symbols
+    )
+
+
+def _outline_by_indentation(lines: list[str]) -> list[Symbol]:
+    starts = []
+    for number, line in enumerate(lines, start=1):
+        match = _PYTHON_FALLBACK.match(line)
+        if match:
+            kind = "class" if match.group(2) == "class" else "function"
+            starts.append((number, kind, match.group(3), len(match.group(1))))
+    return _close_by_next_sibling(starts, len(lines))
+
+
+def _close_by_next_sibling(
+    starts: list[tuple[int, str, str, int]], line_count: int
+) -> list[Symbol]:
+    """End each definition before the next one at the same or a lower indentation."""
+    symbols = []
+    stack: list[int] = []
+    for index, (number, kind, name, indent) in enumerate(starts):
+        while stack and starts[stack[-1]][3] >= indent:
+            stack.pop()
+        end = line_count
+        for following in starts[index + 1 :]:
+            if following[3] <= indent:
+                end = following[0] - 1
+                break
+        symbols.append(Symbol(kind, name, number, max(end, number), len(stack)))
+        stack.append(index)
+    return symbols
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+_STRINGS_AND_COMMENTS = re.compile(
+    r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`|//.*$|/\*.*?\*/'
+)
+
+
+def _strip_strings_and_comments(line: str) -> str:
+    return _STRINGS_AND_COMMENTS.sub("", line)
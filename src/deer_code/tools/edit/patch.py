@@ -0,0 +1,304 @@
+"""
+Parse unified diffs and apply their hunks to file contents.
+
+Hunks are matched like GNU patch does: at the line the hunk header names
+first, then at growing offsets from it, and finally with up to `max_fuzz`
+context lines ignored at the start and end of the hunk.
+"""
+
+import re
+from typing import NamedTuple, Optional
+
+DEV_NULL = "/dev/null"
+
+# Number of context lines that may be ignored at each end of a hunk
+DEFAULT_MAX_FUZZ = 2
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """Raised when a patch cannot be parsed."""
+
+
+class PatchWriteError(ValueError):
+    """Raised when the files of a patch cannot all be written."""
+
+    def __init__(self, message: str, changed: list[str]):
+        super().__init__(message)
+        # Every file written before the failure, whether restored or not
+        self.changed = changed
+
+
+class Hunk(NamedTuple):
+    """A hunk of a unified diff, with lines prefixed by " ", "-" or "+"."""
+
+    old_start: int
+    old_length: int
+    new_start: int
+    new_length: int
+    lines: list[str]
+    # Whether the last old or new line has no newline at the end of the file
+    old_missing_newline: bool = False
+    new_missing_newline: bool = False
+
+
+class FilePatch(NamedTuple):
+    """The hunks of a unified diff that apply to one file."""
+
+    old_path: str
+    new_path: str
+    hunks: list[Hunk]
+
+    @property
+    def is_creation(self) -> bool:
+        return self.old_path == DEV_NULL
+
+    @property
+    def is_deletion(self) -> bool:
+        return self.new_path == DEV_NULL
+
+    @property
+    def path(self) -> str:
+        """The path of the file after the patch, or before it for a deletion."""
+        return self.old_path if self.is_deletion else self.new_path
+
+
+class HunkResult(NamedTuple):
+    """The outcome of applying one hunk."""
+
+    number: int
+    applied: bool
+    # Line the hunk was applied at, or expected at if it failed (1-indexed)
+    line: int
+    offset: int = 0
+    fuzz: int = 0
+
+    def describe(self) -> str:
+        if not self.applied:
+            return f"hunk {self.number} FAILED: no match near line {self.line}"
+        details = []
+        if self.offset:
+            details.append(f"offset {self.offset:+d}")
+        if self.fuzz:
+            details.append(f"fuzz {self.fuzz}")
+        suffix = f" ({', '.join(details)})" if details else ""
+        return f"hunk {self.number} applied at line {self.line}{suffix}"
+
+
+class FilePatchResult(NamedTuple):
+    """The outcome of applying the patch of one file."""
+
+    path: str
+    # One of "created", "modified", "deleted" or "renamed"
+    action: str
+    hunks: list[HunkResult]
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and all(hunk.applied for hunk in self.hunks)
+
+    def describe(self) -> str:
+        if self.error:
+            return f"{self.path}: {self.error}"
+        return f"{self.path} ({self.action}): " + ", ".join(
+            hunk.describe() for hunk in self.hunks
+        )
+
+
+def parse_patch(text: str) -> list[FilePatch]:
+    """
+    Parse a unified diff that may span several files.
+
+    Args:
+        text: The unified diff, as produced by `diff -u` or `git diff`.
+
+    Returns:
+        The patches of each file, in the order they appear.
+
+    Raises:
+        PatchError: If the diff is malformed or contains no file.
+    """
+    lines = text.splitlines()
+    patches = []
+    index = 0
+    while index < len(lines):
+        if not lines[index].startswith("--- ") or index + 1 >= len(lines):
+            index += 1
+            continue
+        if not lines[index + 1].startswith("+++ "):
+            raise PatchError(f"Expected `+++` after `{lines[index]}`")
+        old_path, new_path = _strip_prefixes(
+            _header_path(lines[index]), _header_path(lines[index + 1])
+        )
+        index += 2
+
+        hunks = []
+        while index < len(lines) and lines[index].startswith("@@"):
+            hunk, index = _parse_hunk(lines, index)
+            hunks.append(hunk)
+        if not hunks:
+            raise PatchError(f"No hunks for {new_path}")
+        patches.append(FilePatch(old_path, new_path, hunks))
+
+    if not patches:
+        raise PatchError("No file changes found. Expected a unified diff with `---`/`+++` headers.")
+    return patches
+
+
+def apply_hunks(
+    content: str, hunks: list[Hunk], max_fuzz: int = DEFAULT_MAX_FUZZ
+) -> tuple[Optional[str], list[HunkResult]]:
+    """
+    Apply hunks to the content of a file.
+
+    Args:
+        content: The content of the file.
+        hunks: The hunks to apply, in order.
+        max_fuzz: Number of context lines that may be ignored at each end of a hunk.
+
+    Returns:
+        The new content, or None if any hunk failed, and the result of each hunk.
+    """
+    # Lines added to an empty file end with a newline unless marked otherwise
+    has_newline = content.endswith("\n") or not content
+    lines = (content[:-1] if has_newline else content).split("\n") if content else []
+
+    results = []
+    # Lines are shifted by the hunks already applied
+    delta = 0
+    # Hunks may not match before the end of the previous one
+    floor = 0
+    for number, hunk in enumerate(hunks, start=1):
+        expected = max(hunk.old_start - 1 if hunk.old_length else hunk.old_start, 0) + delta
+        match = _locate(lines, hunk, expected, floor, max_fuzz)
+        if match is None:
+            results.append(HunkResult(number, False, expected + 1))
+            continue
+        position, fuzz, trimmed, old_block, new_block = match
+        lines[position : position + len(old_block)] = new_block
+        delta += len(new_block) - len(old_block)
+        floor = position + len(new_block)
+        start = position - trimmed
+        results.append(HunkResult(number, True, start + 1, start - expected, fuzz))
+
+        # Only a hunk reaching the end of the file says how the file ends
+        if position + len(new_block) == len(lines):
+            if hunk.new_missing_newline:
+                has_newline = False
+            elif hunk.old_missing_newline:
+                has_newline = True
+
+    if not all(result.applied for result in results):
+        return None, results
+    if not lines:
+        return "", results
+    return "\n".join(lines) + ("\n" if has_newline else ""), results
+
+
+def _locate(lines: list[str], hunk: Hunk, expected: int, floor: int, max_fuzz: int):
+    leading = _count_context(hunk.lines)
+    trailing = _count_context(reversed(hunk.lines))
+    for fuzz in range(max_fuzz + 1):
+        top = min(fuzz, leading)
+        bottom = min(fuzz, trailing)
+        if fuzz and top == 0 and bottom == 0:
+            break
+        body = hunk.lines[top : len(hunk.lines) - bottom]
+        old_block = [line[1:] for line in body if line[0] in " -"]
+        new_block = [line[1:] for line in body if line[0] in " +"]
+        position = _search(lines, old_block, expected + top, floor)
+        if position is not None:
+            return position, fuzz, top, old_block, new_block
+    return None
+
+
+def _search(lines: list[str], block: list[str], expected: int, floor: int) -> Optional[int]:
+    """Find block in lines, starting at expected and moving outwards."""
+    last = len(lines) - len(block)
+    if last < floor:
+        return None
+    expected = min(max(expected, floor), last)
+    for distance in range(max(expected - floor, last - expected) + 1):
+        for position in (expected - distance, expected + distance):
+            if floor <= position <= last and lines[position : position + len(block)] == block:
+                return position
+    return None
+
+
+def _count_context(lines) -> int:
+    count = 0
+    for line in lines:
+        if line[0] != " ":
+            break
+        count += 1
+    return count
+
+
+def _parse_hunk(lines: list[str], index: int) -> tuple[Hunk, int]:
+    header = _HUNK_HEADER.match(lines[index])
+    if not header:
+        raise PatchError(f"Invalid hunk header: {lines[index]}")
+    old_start, old_length, new_start, new_length = (
+        int(value) if value is not None else 1 for value in header.groups()
+    )
+    index += 1
+
+    body = []
+    old_seen = new_seen = 0
+    old_missing_newline = new_missing_newline = False
+    while index < len(lines):
+        line = lines[index]
+        if line.startswith("\\"):
+            # "\ No newline at end of file" applies to the line before it
+            if body:
+                old_missing_newline |= body[-1][0] in " -"
+                new_missing_newline |= body[-1][0] in " +"
+            index += 1
+            continue
+        if old_seen >= old_length and new_seen >= new_length:
+            break
+        # Some tools strip the trailing space of empty context lines
+        prefix, text = (line[0], line[1:]) if line else (" ", "")
+        if prefix not in " -+":
+            raise PatchError(f"Invalid line in hunk at line {index + 1}: {line}")
+        body.append(prefix + text)
+        old_seen += prefix in " -"
+        new_seen += prefix in " +"
+        index += 1
+
+    if old_seen != old_length or new_seen != new_length:
+        raise PatchError(f"Hunk is shorter than its header says: {header.group(0)}")
+    return (
+        Hunk(
+            old_start,
+            old_length,
+            new_start,
+            new_length,
+            body,
+            old_missing_newline,
+            new_missing_newline,
+        ),
+        index,
+    )
+
+
+def _header_path(line: str) -> str:
+    # Drop the timestamp that `diff -u` appends after a tab
+    path = line[4:].split("\t", 1)[0].strip()
+    if path.startswith('"') and path.endswith('"'):
+        path = path[1:-1]
+    return path
+
+
+def _strip_prefixes(old_path: str, new_path: str) -> tuple[str, str]:
+    """Drop the `a/` and `b/` prefixes that git puts on both paths."""
+    old_prefixed = old_path == DEV_NULL or old_path.startswith("a/")
+    new_prefixed = new_path == DEV_NULL or new_path.startswith("b/")
+    if old_prefixed and new_prefixed and not old_path == new_path == DEV_NULL:
+        if old_path != DEV_NULL:
+            old_path = old_path[2:]
+        if new_path != DEV_NULL:
+            new_path = new_path[2:]
+    return old_path, new_path
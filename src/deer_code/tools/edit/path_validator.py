@@ -3,10 +3,23 @@ Path validator for text editor to prevent path traversal attacks.
 
 This module implements security controls for file path validation, protecting
 against directory traversal attacks while maintaining legitimate file access.
+
+Resolving a path walks and lstat()s every component of it, which adds up on
+deep or symlink-heavy trees. Validators therefore cache the resolved form of
+parent directories. A cached directory is only trusted while both the path it
+was looked up by and its resolved path still stat to the same inode, so
+replacing a directory or a symlink in the chain is noticed.
 """
 
+import os
+import stat
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
+
+# Number of resolved directories cached per validator
+MAX_CACHED_DIRECTORIES = 4096
 
 
 class PathValidationError(Exception):
@@ -46,6 +59,9 @@ class PathValidator:
 
         # Resolve to canonical path to handle symlinks
         self.project_root = project_root.resolve()
+        # Maps a directory as given to its resolved path and (st_dev, st_ino)
+        self._directories: OrderedDict[str, tuple[Path, tuple[int, int]]] = OrderedDict()
+        self._lock = threading.Lock()
 
     def validate(self, path: Path, *, allow_nonexistent: bool = False) -> Path:
         """
@@ -71,6 +87,126 @@ class PathValidator:
                 f"Path must be absolute (start with /), got: {path}"
             )
 
+        resolved_path = self._resolve_cached(path, allow_nonexistent)
+        if resolved_path is None:
+            resolved_path = self._resolve(path, allow_nonexistent)
+
+        # Check if path is within project root
+        try:
+            resolved_path.relative_to(self.project_root)
+        except ValueError:
+            raise PathValidationError(
+                f"Path is outside project root. "
+                f"Path: {resolved_path}, "
+                f"Project root: {self.project_root}"
+            )
+
+        return resolved_path
+
+    def validate_many(
+        self, paths: Iterable[Path], *, allow_nonexistent: bool = False
+    ) -> list[Path]:
+        """
+        Validate several paths, resolving each parent directory only once.
+
+        Args:
+            paths: The file paths to validate
+            allow_nonexistent: If True, allows paths that don't exist yet
+
+        Returns:
+            The resolved absolute paths, in the same order
+
+        Raises:
+            PathValidationError: If any path fails security validation. The
+                message lists every failing path.
+        """
+        resolved_paths = []
+        errors = []
+        for path in paths:
+            try:
+                resolved_paths.append(
+                    self.validate(path, allow_nonexistent=allow_nonexistent)
+                )
+            except PathValidationError as e:
+                errors.append(str(e))
+        if errors:
+            raise PathValidationError("\n".join(errors))
+        return resolved_paths
+
+    def invalidate(self, paths: Optional[Iterable[str]] = None) -> None:
+        """
+        Forget cached directories.
+
+        Args:
+            paths: Changed paths. Directories equal to or under any of them are
+                forgotten. If None, the whole cache is cleared.
+        """
+        with self._lock:
+            if paths is None:
+                self._directories.clear()
+                return
+            prefixes = [os.path.normpath(path) for path in paths]
+            for key, (resolved, _) in list(self._directories.items()):
+                if any(
+                    _is_within(candidate, prefix)
+                    for prefix in prefixes
+                    for candidate in (key, str(resolved))
+                ):
+                    del self._directories[key]
+
+    def _resolve_cached(self, path: Path, allow_nonexistent: bool) -> Optional[Path]:
+        """Resolve a path from its cached parent, or return None to resolve it fully."""
+        if path.name in ("", ".", ".."):
+            return None
+        parent = self._resolve_directory(path.parent)
+        if parent is None:
+            return None
+
+        candidate = parent / path.name
+        try:
+            mode = os.lstat(candidate).st_mode
+        except FileNotFoundError:
+            if not allow_nonexistent:
+                raise PathValidationError(f"Path does not exist: {path}")
+            return candidate
+        except OSError:
+            return None
+        # A symlink as last component may point anywhere, resolve it fully
+        return None if stat.S_ISLNK(mode) else candidate
+
+    def _resolve_directory(self, directory: Path) -> Optional[Path]:
+        """Return the resolved form of an existing directory, using the cache."""
+        key = str(directory)
+        try:
+            identity = _identity(os.stat(key))
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._directories.get(key)
+            if cached is not None:
+                self._directories.move_to_end(key)
+        if cached is not None and cached[1] == identity:
+            # The directory may have been moved while its old path now leads to it
+            try:
+                if _identity(os.stat(cached[0])) == identity:
+                    return cached[0]
+            except OSError:
+                pass
+
+        try:
+            resolved = directory.resolve(strict=True)
+        except (OSError, RuntimeError):
+            return None
+        with self._lock:
+            self._directories[key] = (resolved, identity)
+            self._directories.move_to_end(key)
+            while len(self._directories) > MAX_CACHED_DIRECTORIES:
+                self._directories.popitem(last=False)
+        return resolved
+
+    def _resolve(self, path: Path, allow_nonexistent: bool) -> Path:
+        """Resolve a path without the cache."""
         # Resolve to canonical path (this handles ../ and symlinks)
         # If path doesn't exist and allow_nonexistent is True, find an existing ancestor
         if not path.exists() and allow_nonexistent:
@@ -110,16 +246,6 @@ class PathValidator:
                 # This shouldn't happen, but handle it anyway
                 raise PathValidationError(f"Error resolving path: {path}") from e
 
-        # Check if path is within project root
-        try:
-            resolved_path.relative_to(self.project_root)
-        except ValueError:
-            raise PathValidationError(
-                f"Path is outside project root. "
-                f"Path: {resolved_path}, "
-                f"Project root: {self.project_root}"
-            )
-
         return resolved_path
 
     def is_safe(
@@ -140,3 +266,51 @@ class PathValidator:
             return (True, None)
         except PathValidationError as e:
             return (False, str(e))
+
+
+_validators: dict[str, PathValidator] = {}
+_validators_lock = threading.Lock()
+
+
+def get_path_validator(project_root: Optional[Path] = None) -> PathValidator:
+    """
+    Return the validator shared by every tool for a project root.
+
+    Args:
+        project_root: The root directory for file operations.
+                     If None, uses `project.root_dir`.
+
+    Returns:
+        The shared PathValidator, whose directory cache is reused across calls.
+    """
+    if project_root is None:
+        from deer_code.project import project
+
+        project_root = Path(project.root_dir)
+    key = os.path.realpath(project_root)
+    with _validators_lock:
+        validator = _validators.get(key)
+        if validator is None:
+            validator = _validators[key] = PathValidator(project_root=Path(key))
+        return validator
+
+
+def invalidate_path_validators(paths: Optional[Iterable[str]] = None) -> None:
+    """
+    Forget the cached directories of every shared validator.
+
+    Args:
+        paths: Changed paths. If None, every cached directory is forgotten.
+    """
+    with _validators_lock:
+        validators = list(_validators.values())
+    for validator in validators:
+        validator.invalidate(paths)
+
+
+def _identity(file_stat: os.stat_result) -> tuple[int, int]:
+    return file_stat.st_dev, file_stat.st_ino
+
+
+def _is_within(path: str, prefix: str) -> bool:
+    return path == prefix or path.startswith(prefix.rstrip(os.sep) + os.sep)
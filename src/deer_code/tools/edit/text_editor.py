@@ -1,15 +1,73 @@
+import hashlib
+import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Literal, Optional
-
+from typing import Literal, NamedTuple, Optional
+
+from deer_code.tools.fs.ignore import get_ignore_matcher
+
+from .content_cache import FileContentCache
+from .content_cache import content_cache as shared_content_cache
+from .file_io import (
+    EditConflictError,
+    atomic_write_text,
+    current_signature,
+    file_lock,
+    file_signature,
+    fsync_directories,
+)
+from .journal import EditJournal
+from .line_index import LARGE_FILE_SIZE, get_line_index
+from .outline import format_outline, get_outline
+from .patch import FilePatchResult, PatchWriteError, apply_hunks, parse_patch
 from .path_validator import PathValidator, PathValidationError
+from .whitespace_match import find_ignoring_whitespace
 
 TextEditorCommand = Literal[
     "view",
+    "view_many",
+    "outline",
     "create",
     "str_replace",
     "insert",
+    "multi_edit",
+    "patch",
+    "undo_edit",
 ]
 
+# Number of lines shown when viewing a large file without a range
+VIEW_PAGE_LINES = 2000
+
+# Total number of characters returned by one `view_many` call
+VIEW_MANY_BUDGET_CHARS = 60_000
+
+# Number of files shown by one `view_many` call
+VIEW_MANY_MAX_FILES = 50
+
+# Number of files read at the same time by `view_many`
+VIEW_MANY_WORKERS = 8
+
+# Number of files written at the same time when applying a patch
+PATCH_WRITE_WORKERS = 8
+
+# Stands for a previous content that is not known, as opposed to no file
+_UNKNOWN = object()
+
+_GLOB_CHARACTERS = frozenset("*?[")
+
+
+class _ViewSection(NamedTuple):
+    """The numbered lines of one file viewed by `view_many`, or why it failed."""
+
+    path: Path
+    init_line: int
+    lines: list[str]
+    n_lines_file: int
+    partial: bool = False
+    error: Optional[str] = None
+
 
 class TextEditor:
     """A standalone text editor tool for AI agents to interact with files.
@@ -18,15 +76,32 @@ class TextEditor:
     security validation, and suggestions to help AI agents learn from mistakes.
     """
 
-    def __init__(self, path_validator: Optional[PathValidator] = None):
+    def __init__(
+        self,
+        path_validator: Optional[PathValidator] = None,
+        content_cache: Optional[FileContentCache] = None,
+        journal: Optional[EditJournal] = None,
+        fsync: bool = False,
+    ):
         """
         Initialize TextEditor.
 
         Args:
             path_validator: PathValidator instance for security validation.
                            If None, creates a default validator with current directory as root.
+            content_cache: FileContentCache used for reads and updated on writes.
+                           If None, uses the cache shared by the whole process.
+            journal: EditJournal recording every write so that it can be undone.
+                           If None, creates an in-memory journal for this editor.
+            fsync: If True, flushes written files and their directories to disk.
         """
         self.path_validator = path_validator or PathValidator()
+        self.content_cache = content_cache or shared_content_cache
+        self.journal = journal if journal is not None else EditJournal()
+        self.fsync = fsync
+        # Signature and content hash of the version of each file last seen
+        self._versions: dict[str, tuple[tuple[int, int, int], Optional[str]]] = {}
+        self._versions_lock = threading.Lock()
 
     def validate_path(
         self, command: TextEditorCommand, path: Path, *, allow_nonexistent: bool = False
@@ -74,95 +149,543 @@ class TextEditor:
         """
         # Validate path for security
         validated_path = self.validate_path("view", path)
+        file_stat = self._stat_validated(validated_path)
 
-        if not validated_path.exists():
-            raise ValueError(f"File does not exist: {validated_path}")
-
-        if not validated_path.is_file():
-            raise ValueError(f"Path is not a file: {validated_path}")
+        # Huge files are served from a line index instead of being split whole
+        if file_stat.st_size >= LARGE_FILE_SIZE:
+            self._remember_version(validated_path, file_signature(file_stat), None)
+            return self._view_large(validated_path, file_stat, view_range)
 
-        file_content = self.read_file(validated_path)
+        file_content = self._read_validated(validated_path, file_stat)
+        self._remember_version(validated_path, file_signature(file_stat), file_content)
         init_line = 1
         if view_range:
-            if len(view_range) != 2 or not all(isinstance(i, int) for i in view_range):
-                raise ValueError(
-                    "Invalid `view_range`. It should be a list of two integers."
-                )
             file_lines = file_content.split("\n")
-            n_lines_file = len(file_lines)
-            init_line, final_line = view_range
+            init_line, final_line = self._check_view_range(view_range, len(file_lines))
+
+            # Slice the file content based on the view range
+            file_content = "\n".join(file_lines[init_line - 1 : final_line])
 
-            # Validate the start line
-            if init_line < 1 or init_line > n_lines_file:
+        return self._content_with_line_numbers(file_content, init_line=init_line)
+
+    def _view_large(
+        self, path: Path, file_stat: os.stat_result, view_range: list[int] | None
+    ):
+        """View a range of a large file, or its first page if no range is given."""
+        try:
+            index = get_line_index(path, file_stat)
+        except OSError as e:
+            raise ValueError(f"Error reading {path}: {e}")
+
+        n_lines_file = index.line_count
+        if view_range:
+            init_line, final_line = self._check_view_range(view_range, n_lines_file)
+        else:
+            init_line, final_line = 1, min(n_lines_file, VIEW_PAGE_LINES)
+
+        content = self._content_with_line_numbers(
+            index.read_lines(init_line, final_line), init_line=init_line
+        )
+        if not view_range and final_line < n_lines_file:
+            next_page = [final_line + 1, min(n_lines_file, final_line + VIEW_PAGE_LINES)]
+            content += (
+                f"\n\n[The file has {n_lines_file} lines, showing lines {init_line}-{final_line}. "
+                f"Use `view_range` {next_page} to view the next page.]"
+            )
+        return content
+
+    def _check_view_range(self, view_range: list[int], n_lines_file: int):
+        """Validate a view range and return its first and last line, inclusive."""
+        if len(view_range) != 2 or not all(isinstance(i, int) for i in view_range):
+            raise ValueError(
+                "Invalid `view_range`. It should be a list of two integers."
+            )
+        init_line, final_line = view_range
+
+        # Validate the start line
+        if init_line < 1 or init_line > n_lines_file:
+            raise ValueError(
+                f"Invalid `view_range`: {view_range}. The start line `{init_line}` should be within the range of lines in the file: {[1, n_lines_file]}"
+            )
+
+        # Validate the end line
+        if final_line != -1 and (
+            final_line < init_line or final_line > n_lines_file
+        ):
+            if final_line > n_lines_file:
+                final_line = n_lines_file
+            else:
                 raise ValueError(
-                    f"Invalid `view_range`: {view_range}. The start line `{init_line}` should be within the range of lines in the file: {[1, n_lines_file]}"
+                    f"Invalid `view_range`: {view_range}. The end line `{final_line}` should be -1 or "
+                    f"within the range of lines in the file: {[init_line, n_lines_file]}"
                 )
 
-            # Validate the end line
-            if final_line != -1 and (
-                final_line < init_line or final_line > n_lines_file
-            ):
-                if final_line > n_lines_file:
-                    final_line = n_lines_file
-                else:
-                    raise ValueError(
-                        f"Invalid `view_range`: {view_range}. The end line `{final_line}` should be -1 or "
-                        f"within the range of lines in the file: {[init_line, n_lines_file]}"
-                    )
+        if final_line == -1:
+            final_line = n_lines_file
+        return init_line, final_line
 
-            # Slice the file content based on the view range
-            if final_line == -1:
-                file_content = "\n".join(file_lines[init_line - 1 :])
+    def view_many(
+        self,
+        targets: list[tuple[Path, Optional[list[int]]]],
+        budget: int = VIEW_MANY_BUDGET_CHARS,
+    ):
+        """View several files at once, within a total budget of characters.
+
+        Files are read concurrently. Files that fit in an equal share of the
+        budget are shown whole; the rest of the budget is split between the
+        larger files in proportion to their size, and each of them is cut with
+        a note of the omitted lines.
+
+        Args:
+            targets: A list of (path, view_range) pairs. A path may be a glob
+                such as `/project/src/**/*.py`, which matches files that are not
+                ignored. `view_range` is the same as for `view`, or None.
+            budget: The maximum number of characters of file content returned.
+
+        Returns:
+            str: The numbered content of each file, under a `==> path <==` header.
+
+        Raises:
+            ValueError: If no target is given, or a glob matches no file.
+            PathValidationError: If a path fails security validation.
+        """
+        if not targets:
+            raise ValueError("No files to view.")
+
+        entries = list(dict.fromkeys(
+            (path, tuple(view_range) if view_range else None)
+            for path, view_range in self._expand_targets(targets)
+        ))
+        omitted_files = len(entries) - VIEW_MANY_MAX_FILES
+        entries = entries[:VIEW_MANY_MAX_FILES]
+
+        with ThreadPoolExecutor(
+            max_workers=min(VIEW_MANY_WORKERS, len(entries))
+        ) as executor:
+            sections = list(
+                executor.map(lambda entry: self._view_section(*entry), entries)
+            )
+
+        sizes = [sum(len(line) + 1 for line in section.lines) for section in sections]
+        outputs = []
+        for section, allowance in zip(sections, _allocate_budget(sizes, budget)):
+            if section.error:
+                outputs.append(f"==> {section.path} <==\nError: {section.error}")
+                continue
+
+            shown = []
+            used = 0
+            for line in section.lines:
+                if used + len(line) + 1 > allowance:
+                    break
+                shown.append(line)
+                used += len(line) + 1
+
+            final_line = section.init_line + len(shown) - 1
+            header = f"==> {section.path} <=="
+            if section.partial or len(shown) < len(section.lines):
+                header = (
+                    f"==> {section.path} (lines {section.init_line}-{final_line} "
+                    f"of {section.n_lines_file}) <=="
+                )
+            output = "\n".join([header, *shown])
+            omitted = section.lines[len(shown) :]
+            if omitted:
+                next_range = [final_line + 1, section.init_line + len(section.lines) - 1]
+                output += (
+                    f"\n[{len(omitted)} more lines ({sum(map(len, omitted))} characters) omitted. "
+                    f"Use `view` with `view_range` {next_range} to see them.]"
+                )
+            outputs.append(output)
+
+        if omitted_files > 0:
+            outputs.append(
+                f"[{omitted_files} more files omitted. View at most {VIEW_MANY_MAX_FILES} files at once.]"
+            )
+        return "\n\n".join(outputs)
+
+    def _expand_targets(
+        self, targets: list[tuple[Path, Optional[list[int]]]]
+    ) -> list[tuple[Path, Optional[list[int]]]]:
+        """Validate the paths of `view_many` targets and expand their globs."""
+        explicit = [
+            path for path, _ in targets if not _GLOB_CHARACTERS.intersection(str(path))
+        ]
+        for path in explicit:
+            if not path.is_absolute():
+                # Raises the same error as the other commands
+                self.validate_path("view_many", path)
+        # Missing files are reported in the result instead of failing every file
+        validated = iter(
+            self.path_validator.validate_many(explicit, allow_nonexistent=True)
+        )
+
+        ignore_matcher = get_ignore_matcher()
+        entries = []
+        for path, view_range in targets:
+            if not _GLOB_CHARACTERS.intersection(str(path)):
+                entries.append((next(validated), view_range))
+                continue
+
+            parts = path.parts
+            first_glob = next(
+                index for index, part in enumerate(parts) if _GLOB_CHARACTERS.intersection(part)
+            )
+            base = self.validate_path("view_many", Path(*parts[:first_glob]))
+            matches = []
+            for match in sorted(base.glob("/".join(parts[first_glob:]))):
+                relative = match.relative_to(base).parts
+                if any(
+                    ignore_matcher.is_ignored(part, is_dir=True) for part in relative[:-1]
+                ) or ignore_matcher.is_ignored(match.name):
+                    continue
+                if not match.is_file():
+                    continue
+                try:
+                    matches.append(self.path_validator.validate(match))
+                except PathValidationError:
+                    # Skip symlinks that lead out of the project
+                    continue
+            if not matches:
+                raise ValueError(f"No files match {path}")
+            entries.extend((match, view_range) for match in matches)
+        return entries
+
+    def _view_section(self, path: Path, view_range: Optional[tuple[int, int]]):
+        """Read the numbered lines of one file of `view_many`."""
+        try:
+            file_stat = self._stat_validated(path)
+            if file_stat.st_size >= LARGE_FILE_SIZE:
+                self._remember_version(path, file_signature(file_stat), None)
+                index = get_line_index(path, file_stat)
+                n_lines_file = index.line_count
+                if view_range:
+                    init_line, final_line = self._check_view_range(list(view_range), n_lines_file)
+                else:
+                    init_line, final_line = 1, min(n_lines_file, VIEW_PAGE_LINES)
+                content = index.read_lines(init_line, final_line)
             else:
-                file_content = "\n".join(file_lines[init_line - 1 : final_line])
+                file_content = self._read_validated(path, file_stat)
+                self._remember_version(path, file_signature(file_stat), file_content)
+                # Count lines the way they are numbered, without a last empty line
+                n_lines_file = len(file_content.splitlines())
+                content = file_content
+                init_line = 1
+                if view_range:
+                    file_lines = file_content.split("\n")
+                    init_line, final_line = self._check_view_range(list(view_range), len(file_lines))
+                    content = "\n".join(file_lines[init_line - 1 : final_line])
+        except (ValueError, OSError) as e:
+            return _ViewSection(path, 1, [], 0, error=str(e))
+
+        numbered = self._content_with_line_numbers(content, init_line=init_line)
+        lines = numbered.split("\n") if numbered else []
+        partial = init_line > 1 or init_line + len(lines) - 1 < n_lines_file
+        return _ViewSection(path, init_line, lines, n_lines_file, partial)
+
+    def outline(self, path: Path):
+        """List the classes, functions and methods of a file with their line ranges.
 
-        return self._content_with_line_numbers(file_content, init_line=init_line)
+        Args:
+            path: The absolute path to the file.
+
+        Returns:
+            str: One line per symbol, indented by nesting depth, or a note if
+                no symbol was found.
+
+        Raises:
+            ValueError: If file doesn't exist, is not a file, or its language
+                is not supported.
+            PathValidationError: If path fails security validation.
+        """
+        validated_path = self.validate_path("outline", path)
+        file_content = self._read_validated(validated_path)
+
+        symbols = get_outline(file_content, validated_path.suffix)
+        if symbols is None:
+            raise ValueError(
+                f"Outlines are not supported for `{validated_path.suffix or validated_path.name}` files. "
+                "Use `view` instead."
+            )
+        if not symbols:
+            return f"No classes or functions found in {validated_path}."
+        return format_outline(symbols)
 
-    def str_replace(self, path: Path, old_str: str, new_str: str | None):
+    def str_replace(
+        self,
+        path: Path,
+        old_str: str,
+        new_str: str | None,
+        ignore_whitespace: bool = False,
+    ):
         """Replace all occurrences of old_str with new_str in the file.
 
         Args:
             path: The path to the file.
             old_str: The string to be replaced. The edit will FAIL if `old_str` is not unique in the file. Provide a larger string with more surrounding context to make it unique.
             new_str: The replacement string. If None, old_str will be removed.
+            ignore_whitespace: If True and old_str is not found exactly, replace the
+                one place of the file that matches it when differences in
+                indentation and whitespace are ignored.
 
         Returns:
             int: The count of replacements.
 
         Raises:
-            ValueError: If file doesn't exist, is not a file, or old_str not found.
+            ValueError: If file doesn't exist, is not a file, or old_str not found,
+                or it matches several places when whitespace is ignored.
             PathValidationError: If path fails security validation.
         """
         # Validate path for security
         validated_path = self.validate_path("str_replace", path)
-
-        if not validated_path.exists():
-            raise ValueError(f"File does not exist: {validated_path}")
-
-        if not validated_path.is_file():
-            raise ValueError(f"Path is not a file: {validated_path}")
-
         # Read the file content
-        file_content = self.read_file(validated_path)
-
-        # Check if old_str exists in the file
-        if old_str not in file_content:
-            raise ValueError(f"String not found in file: {validated_path}")
+        file_content, signature = self._read_for_edit(validated_path)
 
         # Perform the replacement
         if new_str is None:
             new_str = ""
 
-        new_content = file_content.replace(old_str, new_str)
-
-        # Count occurrences for the result message
-        occurrences = file_content.count(old_str)
+        # Split once to both find and count the occurrences of old_str
+        parts = file_content.split(old_str)
+        occurrences = len(parts) - 1
+        if occurrences > 0:
+            new_content = new_str.join(parts)
+        elif ignore_whitespace:
+            matches = find_ignoring_whitespace(file_content, old_str)
+            if not matches:
+                raise ValueError(
+                    f"String not found in file, even ignoring whitespace: {validated_path}"
+                )
+            if len(matches) > 1:
+                lines = ", ".join(f"{match.start_line}-{match.end_line}" for match in matches)
+                raise ValueError(
+                    f"String is not unique in file when whitespace is ignored: {validated_path}. "
+                    f"It matches lines {lines}. Provide a larger string with more surrounding context to make it unique."
+                )
+            (match,) = matches
+            new_content = file_content[: match.start] + new_str + file_content[match.end :]
+            occurrences = 1
+        else:
+            raise ValueError(f"String not found in file: {validated_path}")
 
         # Write the modified content back to the file
-        self.write_file(validated_path, new_content)
+        self._write_validated(
+            validated_path, new_content, previous=file_content, expected=signature
+        )
 
         return occurrences
 
+    def multi_edit(self, path: Path, edits: list[tuple[str, str | None]]):
+        """Apply several replacements to a file in one read and one write.
+
+        Every `old_str` is matched against the original content of the file, so
+        the edits are independent of each other. Either all edits are applied
+        or, if any of them is invalid, none is.
+
+        Args:
+            path: The path to the file.
+            edits: A list of (old_str, new_str) pairs. Each `old_str` must appear
+                exactly once in the file, and the edits must not overlap. If
+                `new_str` is None, `old_str` will be removed.
+
+        Returns:
+            int: The count of applied edits.
+
+        Raises:
+            ValueError: If file doesn't exist, is not a file, or an edit is not
+                found, not unique, or overlaps another edit.
+            PathValidationError: If path fails security validation.
+        """
+        if not edits:
+            raise ValueError("No edits to apply.")
+
+        # Validate path for security
+        validated_path = self.validate_path("multi_edit", path)
+        file_content, signature = self._read_for_edit(validated_path)
+
+        # Locate every edit before changing anything
+        spans = []
+        for number, (old_str, new_str) in enumerate(edits, start=1):
+            if not old_str:
+                raise ValueError(f"Edit {number}: `old_str` must not be empty.")
+            start = file_content.find(old_str)
+            if start == -1:
+                raise ValueError(
+                    f"Edit {number}: String not found in file: {validated_path}"
+                )
+            if file_content.find(old_str, start + 1) != -1:
+                raise ValueError(
+                    f"Edit {number}: String is not unique in file: {validated_path}. "
+                    "Provide a larger string with more surrounding context to make it unique."
+                )
+            spans.append((start, start + len(old_str), new_str or "", number))
+
+        spans.sort()
+        for previous, current in zip(spans, spans[1:]):
+            if current[0] < previous[1]:
+                raise ValueError(
+                    f"Edits {previous[3]} and {current[3]} overlap in file: {validated_path}"
+                )
+
+        # Rebuild the content in a single pass
+        chunks = []
+        position = 0
+        for start, end, new_str, _ in spans:
+            chunks.append(file_content[position:start])
+            chunks.append(new_str)
+            position = end
+        chunks.append(file_content[position:])
+
+        self._write_validated(
+            validated_path, "".join(chunks), previous=file_content, expected=signature
+        )
+
+        return len(spans)
+
+    def apply_patch(self, patch: str, base_dir: Path):
+        """Apply a unified diff that may change several files.
+
+        Every target is validated and every hunk is applied in memory first.
+        Files are only written if all hunks apply, in which case they are
+        written in parallel. If a write fails, the files already written are
+        restored.
+
+        Args:
+            patch: The unified diff. Paths may be absolute or relative to `base_dir`.
+            base_dir: The directory relative paths are resolved against.
+
+        Returns:
+            tuple[bool, list[FilePatchResult]]: Whether the patch was applied,
+                and the result of each file and hunk.
+
+        Raises:
+            ValueError: If the patch cannot be parsed.
+            PatchWriteError: If a file cannot be written.
+            PathValidationError: If a path fails security validation.
+        """
+        file_patches = parse_patch(patch)
+        # Report every path outside the project at once, and warm the cache
+        self.path_validator.validate_many(
+            [base_dir / file_patch.path for file_patch in file_patches],
+            allow_nonexistent=True,
+        )
+
+        results = []
+        # Content of every touched file before and after the patch, None if missing
+        originals: dict[Path, Optional[str]] = {}
+        contents: dict[Path, Optional[str]] = {}
+        # Signature each file must still have when it is written
+        signatures: dict[Path, Optional[tuple[int, int, int]]] = {}
+        for file_patch in file_patches:
+            action = "modified"
+            if file_patch.is_creation:
+                action = "created"
+            elif file_patch.is_deletion:
+                action = "deleted"
+            elif file_patch.old_path != file_patch.new_path:
+                action = "renamed"
+
+            target = self.validate_path(
+                "patch",
+                base_dir / file_patch.path,
+                allow_nonexistent=action in ("created", "renamed"),
+            )
+            source = target
+            if action == "renamed":
+                source = self.validate_path("patch", base_dir / file_patch.old_path)
+
+            error = None
+            if source in contents:
+                # An earlier part of the patch changed this file already
+                old_content = contents[source]
+                if old_content is None:
+                    error = "the file is deleted earlier in the patch"
+            elif file_patch.is_creation:
+                old_content = ""
+                if target.exists():
+                    error = "the file to create already exists"
+            else:
+                old_content, signatures[source] = self._read_for_edit(source)
+            if error:
+                results.append(FilePatchResult(str(target), action, [], error))
+                continue
+
+            new_content, hunk_results = apply_hunks(old_content, file_patch.hunks)
+            results.append(FilePatchResult(str(target), action, hunk_results))
+            if new_content is None:
+                continue
+            originals.setdefault(source, None if file_patch.is_creation else old_content)
+            originals.setdefault(target, None)
+            signatures.setdefault(target, None)
+            if action == "renamed":
+                contents[source] = None
+            contents[target] = None if file_patch.is_deletion else new_content
+
+        if not all(result.ok for result in results):
+            return False, results
+
+        # Signature of each file after it was written, None once deleted
+        written: dict[Path, Optional[tuple[int, int, int]]] = {}
+
+        def write(item: tuple[Path, Optional[str]]):
+            path, content = item
+            if content is not None:
+                written[path] = self._write_validated(
+                    path,
+                    content,
+                    previous=originals[path],
+                    expected=signatures[path],
+                    sync_directory=False,
+                )
+            else:
+                self._delete_validated(
+                    path,
+                    previous=originals[path],
+                    expected=signatures[path],
+                    sync_directory=False,
+                )
+                written[path] = None
+
+        workers = max(1, min(PATCH_WRITE_WORKERS, len(contents)))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(write, contents.items()))
+        except Exception as e:
+            # The pool waits for every write, so `written` is complete here
+            not_restored = self._restore_files(written, originals)
+            if not_restored:
+                outcome = "These files were changed and could not be restored: " + ", ".join(
+                    str(path) for path in not_restored
+                )
+            else:
+                outcome = "No file was changed."
+            raise PatchWriteError(
+                f"the patch was not applied: {e}\n{outcome}",
+                [str(path) for path in written],
+            ) from e
+        if self.fsync:
+            # One fsync per directory makes all renames and deletions durable
+            fsync_directories(path.parent for path in contents)
+        return True, results
+
+    def _restore_files(
+        self,
+        written: dict[Path, Optional[tuple[int, int, int]]],
+        originals: dict[Path, Optional[str]],
+    ) -> list[Path]:
+        """Undo the writes of a patch that failed, and return the files that could not be restored."""
+        not_restored = []
+        for path, signature in written.items():
+            self.journal.pop(path)
+            try:
+                if originals[path] is None:
+                    self._delete_validated(path, record=False, expected=signature)
+                else:
+                    self._write_validated(path, originals[path], record=False, expected=signature)
+            except ValueError:
+                not_restored.append(path)
+        return not_restored
+
     def insert(self, path: Path, insert_line: int, new_str: str):
         """Insert text at a specific line in the file.
 
@@ -177,15 +700,8 @@ class TextEditor:
         """
         # Validate path for security
         validated_path = self.validate_path("insert", path)
-
-        if not validated_path.exists():
-            raise ValueError(f"File does not exist: {validated_path}")
-
-        if not validated_path.is_file():
-            raise ValueError(f"Path is not a file: {validated_path}")
-
         # Read the file content
-        file_content = self.read_file(validated_path)
+        file_content, signature = self._read_for_edit(validated_path)
         lines = file_content.splitlines()
 
         # Validate insert_line
@@ -211,7 +727,41 @@ class TextEditor:
         new_content = "\n".join(lines)
 
         # Write the modified content back to the file
-        self.write_file(validated_path, new_content)
+        self._write_validated(
+            validated_path, new_content, previous=file_content, expected=signature
+        )
+
+    def undo_edit(self, path: Path):
+        """Revert the last edit made to a file through this editor.
+
+        Args:
+            path: The path to the file.
+
+        Raises:
+            ValueError: If no edit of the file is recorded, or the file was
+                changed by something else after the edit.
+            PathValidationError: If path fails security validation.
+        """
+        # The edit to undo may have deleted the file
+        validated_path = self.validate_path("undo_edit", path, allow_nonexistent=True)
+
+        entry = self.journal.pop(validated_path)
+        if entry is None:
+            raise ValueError(f"No edit to undo for {validated_path}")
+
+        try:
+            signature = current_signature(validated_path)
+            current = self._read_validated(validated_path) if signature else None
+            previous = self.journal.undo(entry, current)
+            if previous is None:
+                self._delete_validated(validated_path, record=False, expected=signature)
+            else:
+                self._write_validated(
+                    validated_path, previous, record=False, expected=signature
+                )
+        except ValueError:
+            self.journal.push(entry)
+            raise
 
     def read_file(self, path: Path):
         """Read the content of a file.
@@ -226,7 +776,7 @@ class TextEditor:
             ValueError: If file cannot be read.
         """
         try:
-            return path.read_text()
+            return self.content_cache.read(path.resolve())
         except Exception as e:
             raise ValueError(f"Error reading {path}: {e}")
 
@@ -243,12 +793,173 @@ class TextEditor:
         """
         # Validate path for security (allow nonexistent for file creation)
         validated_path = self.validate_path("create", path, allow_nonexistent=True)
+        self._write_validated(validated_path, content)
 
+    def _stat_validated(self, path: Path) -> os.stat_result:
+        """Stat a file whose path has already been validated and resolved."""
         try:
-            validated_path.parent.mkdir(parents=True, exist_ok=True)
-            validated_path.write_text(content)
+            file_stat = os.stat(path)
+        except FileNotFoundError:
+            raise ValueError(f"File does not exist: {path}")
+        except OSError as e:
+            raise ValueError(f"Error reading {path}: {e}")
+
+        if not stat.S_ISREG(file_stat.st_mode):
+            raise ValueError(f"Path is not a file: {path}")
+        return file_stat
+
+    def _read_validated(
+        self, path: Path, file_stat: Optional[os.stat_result] = None
+    ) -> str:
+        """Read a file whose path has already been validated and resolved."""
+        if file_stat is None:
+            file_stat = self._stat_validated(path)
+
+        try:
+            return self.content_cache.read(path, file_stat)
         except Exception as e:
-            raise ValueError(f"Error writing to {validated_path}: {e}")
+            raise ValueError(f"Error reading {path}: {e}")
+
+    def _read_for_edit(self, path: Path) -> tuple[str, tuple[int, int, int]]:
+        """Read a file to edit it, failing if it changed since it was last seen.
+
+        Returns:
+            The content of the file and the signature of that version.
+
+        Raises:
+            EditConflictError: If the file changed after it was last viewed or
+                edited through this editor.
+        """
+        file_stat = self._stat_validated(path)
+        content = self._read_validated(path, file_stat)
+        signature = file_signature(file_stat)
+
+        with self._versions_lock:
+            seen = self._versions.get(str(path))
+        if seen is not None and seen[0] != signature:
+            # A touched but unchanged file is not a conflict
+            if seen[1] is None or seen[1] != _content_hash(content):
+                raise EditConflictError(
+                    f"{path} was modified after you last viewed or edited it. "
+                    "View it again before editing it."
+                )
+        return content, signature
+
+    def _remember_version(
+        self, path: Path, signature: tuple[int, int, int], content: Optional[str]
+    ):
+        """Remember the version of a file that was last seen."""
+        content_hash = _content_hash(content) if content is not None else None
+        with self._versions_lock:
+            self._versions[str(path)] = (signature, content_hash)
+
+    def _check_unchanged(self, path: Path, expected):
+        """Fail if a file no longer has the signature an edit was based on."""
+        if expected is not _UNKNOWN and current_signature(path) != expected:
+            raise EditConflictError(
+                f"{path} was modified while it was being edited. "
+                "View it again before editing it."
+            )
+
+    def _write_validated(
+        self,
+        path: Path,
+        content: str,
+        *,
+        previous=_UNKNOWN,
+        record: bool = True,
+        expected=_UNKNOWN,
+        sync_directory: bool = True,
+    ):
+        """Write a file whose path has already been validated and resolved.
+
+        Args:
+            path: The resolved path to the file.
+            content: The content to write.
+            previous: The content of the file before the write, or None if it
+                does not exist. Read from the file if not given.
+            record: Whether to record the write in the journal.
+            expected: The signature the file must still have, or None if it
+                must not exist. Not checked if not given.
+            sync_directory: Whether to fsync the directory when `fsync` is on.
+                Callers writing many files fsync each directory once instead.
+
+        Returns:
+            The signature of the written file.
+
+        Raises:
+            EditConflictError: If the file does not have the expected signature.
+            ValueError: If the file cannot be written.
+        """
+        if record and previous is _UNKNOWN:
+            previous = self._read_previous(path)
+
+        with file_lock(path):
+            self._check_unchanged(path, expected)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                atomic_write_text(path, content, fsync=self.fsync)
+                file_stat = os.stat(path)
+            except Exception as e:
+                self.content_cache.invalidate(path)
+                raise ValueError(f"Error writing to {path}: {e}")
+            if self.fsync and sync_directory:
+                fsync_directories([path.parent])
+
+        # Reading in text mode translates "\r" line endings, so such content
+        # would not match what a later read returns
+        if "\r" in content:
+            self.content_cache.invalidate(path)
+        else:
+            self.content_cache.put(path, content, file_stat)
+        signature = file_signature(file_stat)
+        self._remember_version(path, signature, content)
+
+        if record and previous is not _UNKNOWN:
+            self.journal.record(path, previous, content)
+        return signature
+
+    def _delete_validated(
+        self,
+        path: Path,
+        *,
+        previous=_UNKNOWN,
+        record: bool = True,
+        expected=_UNKNOWN,
+        sync_directory: bool = True,
+    ):
+        """Delete a file whose path has already been validated and resolved."""
+        if record and previous is _UNKNOWN:
+            previous = self._read_previous(path)
+
+        with file_lock(path):
+            self._check_unchanged(path, expected)
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                raise ValueError(f"Error deleting {path}: {e}")
+            finally:
+                self.content_cache.invalidate(path)
+            if self.fsync and sync_directory:
+                fsync_directories([path.parent])
+
+        with self._versions_lock:
+            self._versions.pop(str(path), None)
+
+        if record and previous is not _UNKNOWN:
+            self.journal.record(path, previous, None)
+
+    def _read_previous(self, path: Path):
+        """Read the content of a file about to be overwritten, for the journal."""
+        if not path.exists():
+            return None
+        try:
+            return self._read_validated(path)
+        except ValueError:
+            # The write can go ahead, it just cannot be undone
+            return _UNKNOWN
 
     def _content_with_line_numbers(
         self,
@@ -259,3 +970,33 @@ class TextEditor:
         lines = [f"{i + init_line:>3} {line}" for i, line in enumerate(lines)]
         file_content = "\n".join(lines)
         return file_content
+
+
+def _allocate_budget(sizes: list[int], budget: int) -> list[int]:
+    """Split a budget between items, keeping small items whole.
+
+    Items that fit in an equal share of what is left are given their size; the
+    rest of the budget is then split between the larger items in proportion to
+    their size.
+    """
+    allowances = [0] * len(sizes)
+    remaining = set(range(len(sizes)))
+    left = budget
+    while remaining:
+        share = left / len(remaining)
+        small = [index for index in remaining if sizes[index] <= share]
+        if not small:
+            break
+        for index in small:
+            allowances[index] = sizes[index]
+            left -= sizes[index]
+            remaining.discard(index)
+
+    total = sum(sizes[index] for index in remaining)
+    for index in remaining:
+        allowances[index] = left * sizes[index] // total
+    return allowances
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.blake2b(content.encode(errors="surrogatepass"), digest_size=16).hexdigest()
@@ -1,11 +1,46 @@
+import asyncio
+import atexit
+import os
+import tempfile
 from pathlib import Path
 from typing import Optional
 
 from langchain.tools import ToolRuntime, tool
 
+from deer_code.project import project
+from deer_code.tools.fs.cache import fs_cache
+from deer_code.tools.fs.index import note_file_changes
 from deer_code.tools.reminders import generate_reminders
+from deer_code.tools.side_effects import SideEffect, tag_side_effect
 
+from .journal import EditJournal
+from .patch import PatchWriteError
+from .path_validator import get_path_validator
 from .text_editor import TextEditor
+from .types import Edit, ViewTarget
+
+_editor: Optional[TextEditor] = None
+
+# Edits of this session, kept across editors so that they can always be undone
+_journal = EditJournal(
+    spill_dir=Path(tempfile.gettempdir()) / f"deer-code-undo-{os.getpid()}"
+)
+atexit.register(_journal.clear)
+
+
+def _note_written(paths: list[str]) -> None:
+    """Drop the cached fs results and index entries the written files outdated."""
+    fs_cache.invalidate_paths(paths)
+    note_file_changes(paths)
+
+
+def _get_editor() -> TextEditor:
+    """Return the editor shared by every call, bound to the project root."""
+    global _editor
+    path_validator = get_path_validator()
+    if _editor is None or _editor.path_validator is not path_validator:
+        _editor = TextEditor(path_validator=path_validator, journal=_journal)
+    return _editor
 
 
 @tool("text_editor", parse_docstring=True)
@@ -18,17 +53,26 @@ def text_editor_tool(
     old_str: Optional[str] = None,
     new_str: Optional[str] = None,
     insert_line: Optional[int] = None,
+    edits: Optional[list[Edit]] = None,
+    ignore_whitespace: Optional[bool] = None,
+    files: Optional[list[ViewTarget]] = None,
 ):
     """
-    A text editor tool supports view, create, str_replace, insert.
+    A text editor tool supports view, view_many, outline, create, str_replace, insert, multi_edit, undo_edit.
 
     - `view` again when you fail to perform `str_replace` or `insert`.
+    - `view` shows large files one page at a time. Use `view_range` to read other pages.
+    - `view_many` views several files, ranges or globs in one call, within a total size budget. Prefer it to several `view` calls when exploring.
+    - `outline` lists the classes, functions and methods of a source file with their line ranges. Use it to find what to `view` in a large file.
     - `create` can also be used to overwrite an existing file.
     - `str_replace` can also be used to delete text in the file.
+    - `str_replace` with `ignore_whitespace` tolerates indentation and whitespace differences in `old_str`. Prefer it to viewing the file again after a "String not found" error caused by whitespace.
+    - `multi_edit` applies several replacements to one file at once, instead of one `str_replace` per change.
+    - `undo_edit` reverts the last edit of a file, and can be repeated to revert earlier ones.
 
     Args:
-        command: One of "view", "create", "str_replace", "insert".
-        path: The absolute path to the file. Only absolute paths are supported. Automatically create the directories if it doesn't exist.
+        command: One of "view", "view_many", "outline", "create", "str_replace", "insert", "multi_edit", "undo_edit".
+        path: The absolute path to the file. Only absolute paths are supported. Automatically create the directories if it doesn't exist. For "view_many", the directory that relative `files` are resolved against.
         file_text: Only applies for the "create" command. The text to write to the file.
         view_range:
             Only applies for the "view" command.
@@ -37,26 +81,125 @@ def text_editor_tool(
         old_str: Only applies for the "str_replace" command. The text to replace (must match exactly, including whitespace and indentation).
         new_str: Only applies for the "str_replace" and "insert" commands. The new text to insert in place of the old text.
         insert_line: Only applies for the "insert" command. The line number after which to insert the text (0 for beginning of file).
+        edits: Only applies for the "multi_edit" command. A list of edits, each with an `old_str` and a `new_str`. Every `old_str` must match exactly once in the original file and edits must not overlap. Either all edits are applied or none.
+        files: Only applies for the "view_many" command. A list of files to view, each with a `path` and an optional `view_range`. A path may be a glob such as `src/**/*.py`. Large files are cut to fit the budget, with a note of the omitted lines.
+        ignore_whitespace: Only applies for the "str_replace" command. If true and `old_str` is not found exactly, replace the one place in the file that matches it when differences in indentation and whitespace are ignored. Fails if several places match.
     """
     _path = Path(path)
     reminders = generate_reminders(runtime)
     try:
-        editor = TextEditor()
-        editor.validate_path(command, _path)
+        editor = _get_editor()
         if command == "view":
             return f"Here's the result of running `cat -n` on {_path}:\n\n```\n{editor.view(_path, view_range)}\n```{reminders}"
+        elif command == "view_many" and files:
+            targets = [
+                (_path / target.path, target.view_range)
+                for target in map(ViewTarget.model_validate, files)
+            ]
+            return f"Here's the result of running `cat -n` on the files:\n\n```\n{editor.view_many(targets)}\n```{reminders}"
+        elif command == "outline":
+            return f"Here's the outline of {_path}:\n\n```\n{editor.outline(_path)}\n```{reminders}"
         elif command == "str_replace" and old_str is not None and new_str is not None:
-            occurrences = editor.str_replace(_path, old_str, new_str)
+            occurrences = editor.str_replace(
+                _path, old_str, new_str, ignore_whitespace=bool(ignore_whitespace)
+            )
+            _note_written([str(_path)])
             return f"Successfully replaced {occurrences} occurrences in {_path}.{reminders}"
         elif command == "insert" and insert_line is not None and new_str is not None:
             editor.insert(_path, insert_line, new_str)
+            _note_written([str(_path)])
             return f"Successfully inserted text at line {insert_line} in {path}.{reminders}"
+        elif command == "multi_edit" and edits:
+            applied = editor.multi_edit(
+                _path,
+                [(edit.old_str, edit.new_str) for edit in map(Edit.model_validate, edits)],
+            )
+            _note_written([str(_path)])
+            return f"Successfully applied {applied} edits to {_path}.{reminders}"
+        elif command == "undo_edit":
+            editor.undo_edit(_path)
+            _note_written([str(_path)])
+            return f"Successfully reverted the last edit of {_path}.{reminders}"
         elif command == "create":
             if _path.is_dir():
                 return f"Error: the path {_path} is a directory. Please provide a valid file path.{reminders}"
             editor.write_file(_path, file_text if file_text is not None else "")
+            _note_written([str(_path)])
             return f"File successfully created at {_path}.{reminders}"
         else:
             return f"Error: invalid command: {command}"
     except Exception as e:
         return f"Error: {e}"
+
+
+async def _atext_editor(
+    runtime: ToolRuntime,
+    command: str,
+    path: str,
+    file_text: Optional[str] = None,
+    view_range: Optional[list[int]] = None,
+    old_str: Optional[str] = None,
+    new_str: Optional[str] = None,
+    insert_line: Optional[int] = None,
+    edits: Optional[list[Edit]] = None,
+    ignore_whitespace: Optional[bool] = None,
+    files: Optional[list[ViewTarget]] = None,
+):
+    """Async variant of text_editor_tool that does the file I/O off the event loop."""
+    return await asyncio.to_thread(
+        text_editor_tool.func,
+        runtime,
+        command,
+        path,
+        file_text,
+        view_range,
+        old_str,
+        new_str,
+        insert_line,
+        edits,
+        ignore_whitespace,
+        files,
+    )
+
+
+text_editor_tool.coroutine = _atext_editor
+tag_side_effect(text_editor_tool, SideEffect.mutating, read_only_commands=["view", "view_many", "outline"])
+
+
+@tool("patch", parse_docstring=True)
+def patch_tool(runtime: ToolRuntime, patch: str):
+    """
+    Apply a unified diff that may create, change and delete several files at once.
+
+    - Prefer one `patch` over many `text_editor` calls when a change spans several files.
+    - Paths may be absolute or relative to the project root. The `a/` and `b/` prefixes of `git diff` are accepted.
+    - Use `/dev/null` as the old path to create a file, and as the new path to delete one.
+    - Hunks still apply when their lines moved or a few context lines changed. If any hunk fails, no file is changed.
+
+    Args:
+        patch: The unified diff to apply, in the format of `diff -u` or `git diff`.
+    """
+    reminders = generate_reminders(runtime)
+    try:
+        applied, results = _get_editor().apply_patch(patch, Path(project.root_dir))
+    except PatchWriteError as e:
+        # Restored files were still rewritten, so their cached results are stale
+        _note_written(e.changed)
+        return f"Error: {e}"
+    except Exception as e:
+        return f"Error: {e}"
+
+    report = "\n".join(f"- {result.describe()}" for result in results)
+    if not applied:
+        return f"Error: the patch was not applied and no file was changed.\n{report}"
+    _note_written([result.path for result in results])
+    return f"Successfully patched {len(results)} files:\n{report}{reminders}"
+
+
+async def _apatch(runtime: ToolRuntime, patch: str):
+    """Async variant of patch_tool that does the file I/O off the event loop."""
+    return await asyncio.to_thread(patch_tool.func, runtime, patch)
+
+
+patch_tool.coroutine = _apatch
+tag_side_effect(patch_tool, SideEffect.mutating)
@@ -0,0 +1,17 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class Edit(BaseModel):
+    """A single replacement applied by the `multi_edit` command."""
+
+    old_str: str = Field(..., min_length=1)
+    new_str: str = Field(default="")
+
+
+class ViewTarget(BaseModel):
+    """A file, or a glob of files, viewed by the `view_many` command."""
+
+    path: str = Field(..., min_length=1)
+    view_range: Optional[list[int]] = Field(default=None)
@@ -0,0 +1,150 @@
+"""
+Find text in a file while ignoring differences in whitespace.
+
+Both the file and the searched text are compared line by line after
+stripping each line and collapsing runs of whitespace to a single space. The
+first searched line may match the end of a line of the file and the last one
+the start of a line, like an exact match could. Lines in between must match
+whole lines; they are located with a rolling hash over the hashes of the
+normalized lines, so the search is linear in the size of the file.
+
+Matches are returned as spans of the original content, so that the text of
+the file outside of the span is never changed.
+"""
+
+import re
+from typing import NamedTuple
+
+_WHITESPACE = re.compile(r"\s+")
+
+_MOD = (1 << 61) - 1
+_BASE = 1_000_003
+
+
+class WhitespaceMatch(NamedTuple):
+    """A span of the original content (offsets) and the lines it covers (1-indexed)."""
+
+    start: int
+    end: int
+    start_line: int
+    end_line: int
+
+
+def find_ignoring_whitespace(content: str, text: str) -> list[WhitespaceMatch]:
+    """
+    Find every place where `text` matches `content` if whitespace is ignored.
+
+    Args:
+        content: The content to search.
+        text: The text to find. Text made only of whitespace never matches.
+
+    Returns:
+        The matches in the order they appear.
+    """
+    needle_lines = text.split("\n")
+    needle = [_normalize(line) for line in needle_lines]
+    if not any(needle):
+        return []
+
+    lines = content.split("\n")
+    normalized = [_normalize(line) for line in lines]
+    line_starts = [0]
+    for line in lines[:-1]:
+        line_starts.append(line_starts[-1] + len(line) + 1)
+
+    matches = []
+    if len(needle) == 1:
+        (first,) = needle
+        for number, line in enumerate(normalized):
+            position = line.find(first)
+            while position != -1:
+                start = _start_offset(lines[number], line, position, needle_lines[0])
+                end = _end_offset(lines[number], position + len(first))
+                matches.append(
+                    WhitespaceMatch(
+                        line_starts[number] + start, line_starts[number] + end, number + 1, number + 1
+                    )
+                )
+                position = line.find(first, position + 1)
+        return matches
+
+    first, interior, last = needle[0], needle[1:-1], needle[-1]
+    for number in _interior_candidates(normalized, interior, len(needle)):
+        end_number = number + len(needle) - 1
+        if not normalized[number].endswith(first):
+            continue
+        if not normalized[end_number].startswith(last):
+            continue
+        if normalized[number + 1 : end_number] != interior:
+            # A hash collision
+            continue
+        start = _start_offset(
+            lines[number], normalized[number], len(normalized[number]) - len(first), needle_lines[0]
+        )
+        end = _end_offset(lines[end_number], len(last))
+        matches.append(
+            WhitespaceMatch(
+                line_starts[number] + start, line_starts[end_number] + end, number + 1, end_number + 1
+            )
+        )
+    return matches
+
+
+def _normalize(line: str) -> str:
+    return _WHITESPACE.sub(" ", line.strip())
+
+
+def _interior_candidates(normalized: list[str], interior: list[str], length: int):
+    """Yield the first line of every window whose interior lines may match."""
+    count = len(normalized) - length + 1
+    if count <= 0:
+        return
+    if not interior:
+        yield from range(count)
+        return
+
+    size = len(interior)
+    target = 0
+    for line in interior:
+        target = (target * _BASE + hash(line)) % _MOD
+    # Weight of the line that leaves the window
+    leaving = pow(_BASE, size - 1, _MOD)
+
+    hashes = [hash(line) for line in normalized]
+    rolling = 0
+    for line_hash in hashes[1 : 1 + size]:
+        rolling = (rolling * _BASE + line_hash) % _MOD
+    for number in range(count):
+        if rolling == target:
+            yield number
+        if number + 1 < count:
+            rolling = (rolling - hashes[number + 1] * leaving) % _MOD
+            rolling = (rolling * _BASE + hashes[number + 1 + size]) % _MOD
+
+
+def _offsets(line: str) -> list[int]:
+    """Map each character of the normalized line to its index in the original line."""
+    offsets = []
+    for match in re.finditer(r"\S+", line):
+        if offsets:
+            # The single space that replaced a run of whitespace
+            offsets.append(match.start() - 1)
+        offsets.extend(range(match.start(), match.end()))
+    return offsets
+
+
+def _start_offset(line: str, normalized: str, position: int, needle_line: str) -> int:
+    """Return where a match starting at `position` of the normalized line starts."""
+    if position == 0 and needle_line[:1].isspace():
+        # The text includes indentation, so the match replaces the indentation of the file
+        return 0
+    if position >= len(normalized):
+        return len(line)
+    return _offsets(line)[position]
+
+
+def _end_offset(line: str, length: int) -> int:
+    """Return where a match ending after `length` characters of the normalized line ends."""
+    if length == 0:
+        return 0
+    return _offsets(line)[length - 1] + 1
@@ -0,0 +1,181 @@
+"""
+Session-scoped cache for the results of the read-only filesystem tools.
+
+The agent often repeats `ls`, `tree` and `grep` calls with identical
+arguments. Results are cached by tool name and normalized arguments, and an
+entry is only served while:
+- the change generation is unchanged. Tools that mutate the tree (`text_editor`,
+  `bash`) bump it through `invalidate()`.
+- the mtimes of the directories the entry depends on are unchanged, which
+  catches entries being added to or removed from a listed directory.
+When the project watcher is running, `invalidate_paths()` drops only the
+entries whose scope contains a changed path instead of the whole cache.
+`grep` results depend on file contents and `tree` results on directories
+below the listed one, so they are only cached while the project watcher
+covers their path.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, Iterable, NamedTuple, Optional
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+class _CacheEntry(NamedTuple):
+    value: str
+    generation: int
+    # (path, st_mtime_ns) of the directories the result depends on
+    watched: tuple[tuple[str, Optional[int]], ...]
+    # The file or directory tree the result was computed from, if known
+    scope: Optional[str]
+
+
+def _mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class FsResultCache:
+    """A bounded LRU cache of tool results validated by a change generation."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize FsResultCache.
+
+        Args:
+            max_entries: Maximum number of results kept. The least recently
+                used result is evicted first.
+        """
+        self.max_entries = max_entries
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, _CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """
+        Return the cached result for `key`, or None if missing or outdated.
+
+        Args:
+            key: The tool name and normalized arguments.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_valid(entry):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        key: Hashable,
+        value: str,
+        watch: Iterable[str] = (),
+        scope: Optional[str] = None,
+    ) -> None:
+        """
+        Store a tool result.
+
+        Args:
+            key: The tool name and normalized arguments.
+            value: The tool result.
+            watch: Directories whose mtime must stay unchanged for the result to be valid.
+            scope: The file or directory tree the result was computed from.
+                Results without a scope are dropped by any `invalidate_paths()`.
+        """
+        watched = tuple((os.fspath(path), _mtime_ns(os.fspath(path))) for path in watch)
+        if scope is not None:
+            scope = os.path.realpath(scope)
+        with self._lock:
+            self._entries[key] = _CacheEntry(value, self.generation, watched, scope)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Invalidate every cached result, e.g. after the tree was mutated."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def invalidate_paths(self, paths: Iterable[str]) -> int:
+        """
+        Invalidate the results whose scope contains, or is inside, a changed path.
+
+        Args:
+            paths: The files and directories that changed.
+
+        Returns:
+            The number of results dropped.
+        """
+        changed = [os.path.realpath(path) for path in paths]
+        if not changed:
+            return 0
+        with self._lock:
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if entry.scope is None
+                or any(_overlaps(entry.scope, path) for path in changed)
+            ]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def invalidate_outside(self, root: str) -> int:
+        """
+        Invalidate the results whose scope isn't inside `root`.
+
+        Args:
+            root: The directory whose changes are tracked by other means.
+
+        Returns:
+            The number of results dropped.
+        """
+        root = os.path.realpath(root)
+        with self._lock:
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if entry.scope is None or not _is_within(entry.scope, root)
+            ]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def stats(self) -> dict:
+        """Return the hit and miss counters and the number of cached results."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "generation": self.generation,
+            }
+
+    def _is_valid(self, entry: _CacheEntry) -> bool:
+        if entry.generation != self.generation:
+            return False
+        return all(_mtime_ns(path) == mtime_ns for path, mtime_ns in entry.watched)
+
+
+def _is_within(path: str, directory: str) -> bool:
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+def _overlaps(scope: str, changed: str) -> bool:
+    """Check whether a change to `changed` can affect a result scoped to `scope`."""
+    return _is_within(changed, scope) or _is_within(scope, changed)
+
+
+# The cache shared by the fs tools for the current session
+fs_cache = FsResultCache()
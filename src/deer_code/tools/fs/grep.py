@@ -1,13 +1,33 @@
+import asyncio
+import fnmatch
+import os
+import shutil
 import subprocess
+import threading
 from pathlib import Path
 from typing import Literal, Optional
 
 from langchain.tools import ToolRuntime, tool
 
+from deer_code.project import project
 from deer_code.tools.reminders import generate_reminders
-from deer_code.tools.edit.path_validator import PathValidator, PathValidationError
+from deer_code.tools.side_effects import SideEffect, tag_side_effect
+from deer_code.tools.edit.path_validator import PathValidationError, get_path_validator
+from deer_code.watcher import get_project_watcher
 
-from .ignore import DEFAULT_IGNORE_PATTERNS
+from .cache import fs_cache
+from .ignore import get_ignore_matcher
+from .index import get_project_index, update_in_background
+from .pysearch import search as python_search
+
+# Default maximum age of the trigram index before grep stops trusting it
+DEFAULT_INDEX_MAX_AGE = 300
+
+# Longest output line read from an asyncio ripgrep subprocess
+RIPGREP_LINE_LIMIT = 16 * 1024 * 1024
+
+# Above this many candidates the index no longer narrows the search usefully
+MAX_INDEX_CANDIDATES = 5000
 
 
 def _validate_grep_pattern(pattern: str) -> None:
@@ -31,6 +51,154 @@ def _validate_grep_pattern(pattern: str) -> None:
         raise ValueError("Pattern cannot contain null bytes")
 
 
+def _cache_key(search_path: str, pattern: str, options: tuple) -> Optional[tuple]:
+    """
+    Return the cache key of a search, or None if its result can't be cached.
+
+    A search reads every file under its path, so its result is only kept
+    while the project watcher reports the changes made to them, including
+    those made outside the agent.
+    """
+    watcher = get_project_watcher()
+    if watcher is None or not watcher.covers(search_path):
+        return None
+    return ("grep", os.path.abspath(search_path), pattern, options)
+
+
+def _narrow_with_index(
+    pattern: str, search_path: str, glob: Optional[str], type: Optional[str]
+) -> Optional[list[str]]:
+    """
+    Use the project's trigram index to find the files that may match.
+
+    The index is only consulted when enabled under `tools.grep.index` in
+    `config.yaml`. A missing or stale index triggers a background update and
+    the search falls back to a plain ripgrep scan.
+
+    Returns:
+        The candidate file paths, written the way ripgrep prints the files it
+        finds under `search_path`, or None to search `search_path` with ripgrep.
+    """
+    # Imported lazily so the fs tools don't require `config.yaml` at import time
+    from deer_code.config import get_config_section
+
+    settings = get_config_section(["tools", "grep"]) or {}
+    if not settings.get("index") or type or not os.path.isdir(search_path):
+        return None
+    if glob and any(char in glob for char in "{!/"):
+        # File types, brace, negated and path globs are resolved by ripgrep
+        # itself, which ignores globs for the files it is given explicitly
+        return None
+
+    index = get_project_index(project.root_dir)
+    max_age = settings.get("index_max_age", DEFAULT_INDEX_MAX_AGE)
+    candidates = index.candidates(pattern, Path(search_path), max_age=max_age)
+    if candidates is None:
+        if not index.exists() or index.stale or (index.age() or 0) > max_age:
+            update_in_background(index)
+        return None
+
+    if glob:
+        # Globs without a slash match the file name, like ripgrep's
+        candidates = [
+            candidate for candidate in candidates if fnmatch.fnmatchcase(candidate.name, glob)
+        ]
+    if len(candidates) > MAX_INDEX_CANDIDATES:
+        return None
+    # The index holds resolved paths
+    top = os.path.realpath(search_path)
+    return [
+        os.path.join(search_path, os.path.relpath(candidate, top)) for candidate in candidates
+    ]
+
+
+def _stream_ripgrep(
+    cmd: list[str], head_limit: Optional[int] = None
+) -> tuple[list[str], str, Optional[int]]:
+    """
+    Run ripgrep and collect its output line by line.
+
+    ripgrep is stopped as soon as `head_limit` lines have been collected, so the
+    cost depends on the requested output size rather than on the repository size.
+
+    Args:
+        cmd: The ripgrep command line
+        head_limit: Maximum number of output lines to collect
+
+    Returns:
+        Tuple of (output lines, stderr, return code). The return code is None
+        when ripgrep was stopped early.
+    """
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+    )
+
+    # Drain stderr concurrently so a chatty ripgrep can't block on a full pipe
+    stderr_chunks: list[str] = []
+    stderr_reader = threading.Thread(
+        target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True
+    )
+    stderr_reader.start()
+
+    lines: list[str] = []
+    stopped_early = False
+    try:
+        for line in process.stdout:
+            lines.append(line.rstrip("\n"))
+            if head_limit and len(lines) >= head_limit:
+                stopped_early = True
+                break
+    finally:
+        if stopped_early:
+            process.kill()
+        process.stdout.close()
+        returncode = process.wait()
+        stderr_reader.join()
+        process.stderr.close()
+
+    if stopped_early:
+        # Errors reported after the limit was reached don't affect the result
+        return lines, "", None
+    return lines, "".join(stderr_chunks), returncode
+
+
+async def _astream_ripgrep(
+    cmd: list[str], head_limit: Optional[int] = None
+) -> tuple[list[str], str, Optional[int]]:
+    """Async variant of `_stream_ripgrep` using an asyncio subprocess."""
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        # Minified files can produce very long lines
+        limit=RIPGREP_LINE_LIMIT,
+    )
+    stderr_task = asyncio.ensure_future(process.stderr.read())
+
+    lines: list[str] = []
+    stopped_early = False
+    try:
+        async for line in process.stdout:
+            lines.append(line.decode("utf-8", errors="replace").rstrip("\n"))
+            if head_limit and len(lines) >= head_limit:
+                stopped_early = True
+                break
+    finally:
+        if stopped_early:
+            process.kill()
+        returncode = await process.wait()
+        stderr = (await stderr_task).decode("utf-8", errors="replace")
+
+    if stopped_early:
+        # Errors reported after the limit was reached don't affect the result
+        return lines, "", None
+    return lines, stderr, returncode
+
+
 @tool("grep", parse_docstring=True)
 def grep_tool(
     runtime: ToolRuntime,
@@ -47,6 +215,7 @@ def grep_tool(
     i: Optional[bool] = None,
     type: Optional[str] = None,
     head_limit: Optional[int] = None,
+    max_count: Optional[int] = None,
     multiline: Optional[bool] = False,
 ) -> str:
     """A powerful search tool built on ripgrep for searching file contents with regex patterns.
@@ -71,6 +240,7 @@ def grep_tool(
         type: File type to search (e.g., "js", "py", "rust", "go", "java").
              More efficient than glob for standard file types.
         head_limit: Limit output to first N lines/entries. Works across all output modes.
+        max_count: Limit the number of matching lines reported per file.
         multiline: Enable multiline mode where patterns can span lines and . matches newlines.
                   Default is False (single-line matching only).
 
@@ -84,25 +254,192 @@ def grep_tool(
     # Validate pattern for security
     _validate_grep_pattern(pattern)
 
+    search_path = _resolve_search_path(path)
+
+    # Serve repeated searches from the session cache
+    options = (glob, output_mode, B, A, C, n, i, type, head_limit, max_count, multiline)
+    key = _cache_key(search_path, pattern, options)
+    output = fs_cache.get(key) if key is not None else None
+    if output is None:
+        try:
+            if _ripgrep_available():
+                cmd = _build_command(pattern, search_path, *options)
+                output = _collect_output(*_stream_ripgrep(cmd, head_limit)) if cmd else ""
+            else:
+                output = "\n".join(_search_without_ripgrep(pattern, search_path, *options))
+        except Exception as e:
+            return f"Error: {str(e)}"
+        if key is not None:
+            fs_cache.put(key, output, scope=search_path)
+
+    return _format_result(runtime, search_path, output)
+
+
+async def _agrep(
+    runtime: ToolRuntime,
+    pattern: str,
+    path: Optional[str] = None,
+    glob: Optional[str] = None,
+    output_mode: Literal[
+        "content", "files_with_matches", "count"
+    ] = "files_with_matches",
+    B: Optional[int] = None,
+    A: Optional[int] = None,
+    C: Optional[int] = None,
+    n: Optional[bool] = None,
+    i: Optional[bool] = None,
+    type: Optional[str] = None,
+    head_limit: Optional[int] = None,
+    max_count: Optional[int] = None,
+    multiline: Optional[bool] = False,
+) -> str:
+    """Async variant of grep_tool that runs ripgrep as an asyncio subprocess."""
+    _validate_grep_pattern(pattern)
+    search_path = _resolve_search_path(path)
+
+    options = (glob, output_mode, B, A, C, n, i, type, head_limit, max_count, multiline)
+    key = _cache_key(search_path, pattern, options)
+    output = fs_cache.get(key) if key is not None else None
+    if output is None:
+        try:
+            if _ripgrep_available():
+                # Loading the trigram index reads from disk, so keep it off the event loop
+                cmd = await asyncio.to_thread(
+                    _build_command, pattern, search_path, *options
+                )
+                if cmd:
+                    output = _collect_output(*await _astream_ripgrep(cmd, head_limit))
+                else:
+                    output = ""
+            else:
+                lines = await asyncio.to_thread(
+                    _search_without_ripgrep, pattern, search_path, *options
+                )
+                output = "\n".join(lines)
+        except Exception as e:
+            return f"Error: {str(e)}"
+        if key is not None:
+            fs_cache.put(key, output, scope=search_path)
+
+    return _format_result(runtime, search_path, output)
+
+
+grep_tool.coroutine = _agrep
+tag_side_effect(grep_tool, SideEffect.read_only)
+
+
+def _resolve_search_path(path: Optional[str]) -> str:
+    """
+    Validate the search path and return it in the form passed to ripgrep.
+
+    Raises:
+        PathValidationError: If path is outside project root
+    """
     # Validate path for security if provided
     if path:
         path_obj = Path(path)
         # Only validate if it's an absolute path (relative paths are relative to cwd which is safe)
         if path_obj.is_absolute():
-            validator = PathValidator()
+            validator = get_path_validator()
             try:
                 # Validate that path is within project root
                 # Allow nonexistent paths since we're searching
                 validated_path = validator.validate(path_obj, allow_nonexistent=True)
-                search_path = str(validated_path)
+                return str(validated_path)
             except PathValidationError:
                 # If validation fails, don't allow the search
                 raise
         else:
             # Relative path - use as-is (relative to cwd)
-            search_path = path
+            return path
     else:
-        search_path = "."
+        return "."
+
+
+def _format_result(runtime: ToolRuntime, search_path: str, output: str) -> str:
+    reminders = generate_reminders(runtime)
+    if output:
+        return f"Here's the result in {search_path}:\n\n```\n{output}\n```{reminders}"
+    else:
+        return f"No matches found.{reminders}"
+
+
+def _collect_output(lines: list[str], stderr: str, returncode: Optional[int]) -> str:
+    """
+    Join ripgrep's output lines.
+
+    Raises:
+        RuntimeError: If ripgrep reports an error
+    """
+    # Check for errors (exit code 2 indicates error, 1 means no matches)
+    if returncode == 2 or stderr:
+        raise RuntimeError(stderr.strip())
+    return "\n".join(lines)
+
+
+def _ripgrep_available() -> bool:
+    return shutil.which("rg") is not None
+
+
+def _search_without_ripgrep(
+    pattern: str,
+    search_path: str,
+    glob: Optional[str],
+    output_mode: str,
+    B: Optional[int],
+    A: Optional[int],
+    C: Optional[int],
+    n: Optional[bool],
+    i: Optional[bool],
+    type: Optional[str],
+    head_limit: Optional[int],
+    max_count: Optional[int],
+    multiline: Optional[bool],
+) -> list[str]:
+    """Search with the built-in engine, for systems where ripgrep is not installed."""
+    candidate_files = _narrow_with_index(pattern, search_path, glob, type)
+    if candidate_files is not None and not candidate_files:
+        return []
+    return python_search(
+        pattern,
+        search_path,
+        files=candidate_files,
+        # The index already applied the glob to the candidates
+        glob=glob if candidate_files is None else None,
+        output_mode=output_mode,
+        B=B,
+        A=A,
+        C=C,
+        n=n,
+        i=i,
+        type=type,
+        head_limit=head_limit,
+        max_count=max_count,
+        multiline=multiline,
+        root=project.root_dir,
+    )
+
+
+def _build_command(
+    pattern: str,
+    search_path: str,
+    glob: Optional[str],
+    output_mode: str,
+    B: Optional[int],
+    A: Optional[int],
+    C: Optional[int],
+    n: Optional[bool],
+    i: Optional[bool],
+    type: Optional[str],
+    head_limit: Optional[int],
+    max_count: Optional[int],
+    multiline: Optional[bool],
+) -> Optional[list[str]]:
+    """Build the ripgrep command line, or return None if nothing can match."""
+    # Narrow the files to search with the trigram index when available
+    candidate_files = _narrow_with_index(pattern, search_path, glob, type)
+    if candidate_files is not None and not candidate_files:
+        return None
 
     # Build ripgrep command
     cmd = ["rg"]
@@ -110,8 +447,12 @@ def grep_tool(
     # Add pattern
     cmd.append(pattern)
 
-    # Add path
-    cmd.append(search_path)
+    # Add path, or the candidate files found by the index
+    if candidate_files is not None:
+        cmd.append("--with-filename")
+        cmd.extend(candidate_files)
+    else:
+        cmd.append(search_path)
 
     # Add output mode flags
     if output_mode == "files_with_matches":
@@ -144,42 +485,18 @@ def grep_tool(
     if glob:
         cmd.extend(["--glob", glob])
 
-    # Apply default ignore patterns
-    for ignore_pattern in DEFAULT_IGNORE_PATTERNS:
-        cmd.extend(["--glob", f"!{ignore_pattern}"])
+    # Apply default ignore patterns (ripgrep applies .gitignore files itself)
+    cmd.extend(["--ignore-file", get_ignore_matcher().ripgrep_ignore_file()])
 
     # Add multiline mode
     if multiline:
         cmd.extend(["-U", "--multiline-dotall"])
 
-    # Execute ripgrep
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=False,  # Don't raise on non-zero exit (no matches found)
-        )
-
-        # Check for errors (exit code 2 indicates error, 1 means no matches)
-        if result.returncode == 2 or result.stderr:
-            return f"Error: {result.stderr.strip()}"
-
-        output = result.stdout
-
-        # Apply head limit if specified
-        if head_limit and output:
-            lines = output.splitlines()
-            output = "\n".join(lines[:head_limit])
-
-        # Format the result
-        reminders = generate_reminders(runtime)
-        if output:
-            return (
-                f"Here's the result in {search_path}:\n\n```\n{output}\n```{reminders}"
-            )
-        else:
-            return f"No matches found.{reminders}"
+    # Push the per-file match cap down into ripgrep. In content mode every match
+    # prints at least one line, so a file never needs more than head_limit matches.
+    if output_mode == "content" and head_limit:
+        max_count = min(max_count, head_limit) if max_count else head_limit
+    if max_count and output_mode != "files_with_matches":
+        cmd.extend(["--max-count", str(max_count)])
 
-    except Exception as e:
-        return f"Error: {str(e)}"
+    return cmd
@@ -1,3 +1,24 @@
+"""
+Ignore rules shared by the ls, tree and grep tools.
+
+Consecutive patterns of the same kind are compiled once into a single regular
+expression, so checking an entry costs a few regex matches regardless of the
+number of patterns. The project's `.gitignore` files can be layered on top of
+the defaults while walking the tree.
+"""
+
+import atexit
+import hashlib
+import os
+import re
+import shutil
+import stat
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
 DEFAULT_IGNORE_PATTERNS = [
     # Version Control
     ".git/**",
@@ -75,3 +96,326 @@ DEFAULT_IGNORE_PATTERNS = [
     "Thumbs.db",
     "desktop.ini",
 ]
+
+
+GITIGNORE_FILENAME = ".gitignore"
+
+
+def _strip_directory_suffix(pattern: str) -> str:
+    """Turn a `name/**` or `name/*` directory pattern into a plain name pattern."""
+    for suffix in ("/**", "/*"):
+        if pattern.endswith(suffix):
+            return pattern[: -len(suffix)]
+    return pattern
+
+
+def glob_to_regex(glob: str) -> str:
+    """Translate a gitignore-style glob into a regex (without anchors)."""
+    parts = []
+    i = 0
+    length = len(glob)
+    while i < length:
+        char = glob[i]
+        if char == "*":
+            if glob.startswith("**", i):
+                i += 2
+                if i < length and glob[i] == "/":
+                    # `**/` matches zero or more leading directories
+                    parts.append("(?:.*/)?")
+                    i += 1
+                else:
+                    parts.append(".*")
+                continue
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = glob.find("]", i + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = glob[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = end
+        elif char == "\\" and i + 1 < length:
+            i += 1
+            parts.append(re.escape(glob[i]))
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+
+def _compile(alternatives: list[str]) -> Optional[re.Pattern]:
+    if not alternatives:
+        return None
+    return re.compile("(?:" + "|".join(alternatives) + ")")
+
+
+class _Rules(NamedTuple):
+    """Consecutive patterns of one kind, compiled together."""
+
+    regex: re.Pattern
+    # Whether the patterns are negated `!` patterns that re-include entries
+    negated: bool
+    # Whether the patterns end with `/` and only apply to directories
+    dir_only: bool
+
+
+class _Layer(NamedTuple):
+    """The compiled rules of one set of patterns."""
+
+    # Directory the patterns are relative to, or None to match names anywhere
+    base: Optional[str]
+    # The rules in pattern order; the last one that matches decides
+    rules: tuple[_Rules, ...]
+
+
+def _compile_gitignore(base: str, lines: Iterable[str]) -> Optional[_Layer]:
+    """Compile the lines of a .gitignore file located in `base`."""
+    rules: list[_Rules] = []
+    alternatives: list[str] = []
+    kind: Optional[tuple[bool, bool]] = None
+    for line in lines:
+        line = line.rstrip("\n").rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # A slash at the start or in the middle anchors the pattern to `base`
+        anchored = "/" in line
+        line = line.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+        if kind != (negated, dir_only):
+            if alternatives:
+                rules.append(_Rules(_compile(alternatives), *kind))
+            alternatives = []
+            kind = (negated, dir_only)
+        alternatives.append(prefix + glob_to_regex(line))
+    if alternatives:
+        rules.append(_Rules(_compile(alternatives), *kind))
+    if not rules:
+        return None
+    return _Layer(base, tuple(rules))
+
+
+class IgnoreMatcher:
+    """
+    Decides whether a file or directory should be skipped.
+
+    The first layer holds name patterns such as DEFAULT_IGNORE_PATTERNS, which
+    match an entry's name at any depth. Layers added with `with_gitignore`
+    follow .gitignore semantics relative to the directory that contains the
+    file; deeper layers take precedence over shallower ones.
+
+    Matchers are immutable: layering returns a new matcher that shares the
+    compiled layers of its parent.
+    """
+
+    def __init__(self, patterns: Iterable[str] = DEFAULT_IGNORE_PATTERNS):
+        """
+        Initialize IgnoreMatcher.
+
+        Args:
+            patterns: Glob patterns matched against entry names. A `/**` or
+                `/*` suffix marks a directory whose whole content is ignored.
+        """
+        self.patterns = tuple(dict.fromkeys(patterns))
+        names = [_strip_directory_suffix(pattern) for pattern in self.patterns]
+        regex = _compile([glob_to_regex(name) for name in names if name])
+        rules = (_Rules(regex, False, False),) if regex is not None else ()
+        self._layers: tuple[_Layer, ...] = (_Layer(None, rules),)
+
+    def is_ignored(self, path: str | Path, is_dir: bool = False) -> bool:
+        """
+        Check whether a path is ignored.
+
+        Args:
+            path: The path to check. Absolute paths are required for
+                .gitignore layers to apply.
+            is_dir: Whether the path is a directory.
+        """
+        path = os.fspath(path)
+        for layer in reversed(self._layers):
+            if layer.base is None:
+                subject = path.rsplit("/", 1)[-1]
+            elif path.startswith(layer.base + "/"):
+                subject = path[len(layer.base) + 1 :]
+            else:
+                continue
+            for rules in reversed(layer.rules):
+                if rules.dir_only and not is_dir:
+                    continue
+                if rules.regex.fullmatch(subject):
+                    return not rules.negated
+        return False
+
+    def with_gitignore(
+        self, directory: str | Path, has_gitignore: Optional[bool] = None
+    ) -> "IgnoreMatcher":
+        """
+        Return a matcher that also applies `directory/.gitignore`.
+
+        Args:
+            directory: Absolute path of the directory being entered.
+            has_gitignore: Whether the directory contains a .gitignore file, if
+                already known from a directory listing. Saves a stat call.
+
+        Returns:
+            The layered matcher, or this matcher when there is no .gitignore.
+        """
+        if has_gitignore is False:
+            return self
+        layer = _load_gitignore(os.fspath(directory))
+        if layer is None:
+            return self
+        matcher = object.__new__(IgnoreMatcher)
+        matcher.patterns = self.patterns
+        matcher._layers = self._layers + (layer,)
+        return matcher
+
+    def with_gitignores(
+        self, directory: str | Path, root: Optional[str | Path] = None
+    ) -> "IgnoreMatcher":
+        """
+        Return a matcher layered with every .gitignore from `root` down to `directory`.
+
+        Args:
+            directory: Absolute path of the directory being listed.
+            root: The project root. When `directory` is not inside it, only the
+                directory's own .gitignore is applied.
+        """
+        matcher = self
+        for path in gitignore_directories(directory, root):
+            matcher = matcher.with_gitignore(path)
+        return matcher
+
+    def ripgrep_ignore_file(self) -> str:
+        """
+        Write the name patterns to an ignore file for ripgrep's `--ignore-file`.
+
+        The file is written once per pattern set to a directory only this
+        process's user can access, and reused afterwards as long as it still
+        belongs to the user and holds the patterns.
+
+        Returns:
+            The path of the ignore file.
+        """
+        names = [_strip_directory_suffix(pattern) for pattern in self.patterns]
+        content = "\n".join(name for name in names if name) + "\n"
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+        with _ripgrep_ignore_lock:
+            directory = _ripgrep_ignore_dir()
+            path = os.path.join(directory, f"{digest}.ignore")
+            if not _is_own_file(path, content):
+                fd, tmp_path = tempfile.mkstemp(dir=directory)
+                with os.fdopen(fd, "w") as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+        return path
+
+
+# Private directory of the ripgrep ignore files, created on first use
+_ripgrep_ignore_path: Optional[str] = None
+_ripgrep_ignore_lock = threading.Lock()
+
+
+def _ripgrep_ignore_dir() -> str:
+    """Return the private directory of the ripgrep ignore files, creating it if needed."""
+    global _ripgrep_ignore_path
+    if _ripgrep_ignore_path is not None:
+        try:
+            info = os.lstat(_ripgrep_ignore_path)
+        except OSError:
+            info = None
+        # Recreated elsewhere if it was removed, e.g. by a temp directory cleaner
+        if (
+            info is not None
+            and stat.S_ISDIR(info.st_mode)
+            and info.st_uid == os.getuid()
+            and not info.st_mode & 0o077
+        ):
+            return _ripgrep_ignore_path
+    _ripgrep_ignore_path = tempfile.mkdtemp(prefix="deer-code-rgignore-")
+    atexit.register(shutil.rmtree, _ripgrep_ignore_path, ignore_errors=True)
+    return _ripgrep_ignore_path
+
+
+def _is_own_file(path: str, content: str) -> bool:
+    """Check that a file is a regular file of the current user holding the content."""
+    try:
+        info = os.lstat(path)
+        if not stat.S_ISREG(info.st_mode) or info.st_uid != os.getuid():
+            return False
+        with open(path, "r") as f:
+            return f.read() == content
+    except OSError:
+        return False
+
+
+def gitignore_directories(
+    directory: str | Path, root: Optional[str | Path] = None
+) -> list[Path]:
+    """
+    Return the directories whose .gitignore applies to the entries of `directory`.
+
+    Args:
+        directory: Absolute path of the directory being listed.
+        root: The project root. When `directory` is not inside it, only the
+            directory itself is returned.
+    """
+    directory = Path(directory)
+    if root is None:
+        return [directory]
+    root = Path(root)
+    try:
+        relative = directory.relative_to(root)
+    except ValueError:
+        return [directory]
+    chain = [root]
+    current = root
+    for part in relative.parts:
+        current = current / part
+        chain.append(current)
+    return chain
+
+
+@lru_cache(maxsize=256)
+def _load_gitignore_cached(path: str, mtime_ns: int) -> Optional[_Layer]:
+    # Stored without a trailing slash so that "/" becomes ""
+    base = os.path.dirname(path).rstrip("/")
+    try:
+        with open(path, "r", errors="replace") as f:
+            return _compile_gitignore(base, f.readlines())
+    except OSError:
+        return None
+
+
+def _load_gitignore(directory: str) -> Optional[_Layer]:
+    """Load the compiled .gitignore of a directory, cached until it changes."""
+    path = os.path.join(directory, GITIGNORE_FILENAME)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    return _load_gitignore_cached(path, mtime_ns)
+
+
+@lru_cache(maxsize=64)
+def get_ignore_matcher(patterns: tuple[str, ...] = ()) -> IgnoreMatcher:
+    """
+    Return a cached matcher for DEFAULT_IGNORE_PATTERNS plus extra patterns.
+
+    Args:
+        patterns: Additional name patterns to ignore.
+    """
+    return IgnoreMatcher([*DEFAULT_IGNORE_PATTERNS, *patterns])
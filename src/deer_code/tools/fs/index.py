@@ -0,0 +1,504 @@
+"""
+Persistent trigram index for narrowing grep searches on large repositories.
+
+The index maps every lowercase byte trigram to the files containing it. It is
+sharded per top-level directory of the project so shards can be built in
+parallel on all cores, and it is kept current incrementally: on update, only
+shards whose files changed (by mtime and size) are rebuilt.
+
+The index is only a pre-filter. It returns a superset of the files that can
+match a pattern, and the real regex still runs on those files. Files reported
+changed by the project watcher or written by the edit tools are searched
+directly until the next update.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .ignore import IgnoreMatcher, get_ignore_matcher
+from .literals import extract_literals
+
+INDEX_VERSION = 1
+
+# Files larger than this are never indexed and always returned as candidates
+MAX_INDEXED_FILE_SIZE = 1024 * 1024
+
+# Name of the shard that holds the files directly under the project root
+ROOT_SHARD = "."
+
+
+def default_index_dir(root: Path) -> Path:
+    """Return the cache directory used for the index of a project root."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    digest = hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:16]
+    return Path(cache_home) / "deer-code" / "index" / digest
+
+
+class TrigramIndex:
+    """
+    On-disk trigram index of a project directory.
+
+    Layout of the index directory:
+    - `manifest.json`: version, root, build time and the list of shards
+    - `<shard-hash>.idx`: one pickled shard per top-level directory
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        index_dir: Optional[Path] = None,
+        matcher: Optional[IgnoreMatcher] = None,
+    ):
+        """
+        Initialize TrigramIndex.
+
+        Args:
+            root: The project root directory to index.
+            index_dir: Where to store the index. Defaults to the user cache directory.
+            matcher: Ignore rules for excluded files. Defaults to the default
+                ignore patterns; .gitignore files are layered on top while scanning.
+        """
+        self.root = Path(root).resolve()
+        self.index_dir = Path(index_dir) if index_dir else default_index_dir(self.root)
+        self.matcher = matcher or get_ignore_matcher()
+        self._shards: Optional[dict[str, dict]] = None
+        self._loaded_manifest_mtime: Optional[int] = None
+        self._lock = threading.Lock()
+        # Paths (relative to the root) changed since the last build or update
+        self._changed: set[str] = set()
+        # Set when changes could not be tracked, until the next build or update
+        self.stale = False
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.index_dir / "manifest.json"
+
+    def exists(self) -> bool:
+        """Check whether an index has been built for this root."""
+        return self._read_manifest() is not None
+
+    def age(self) -> Optional[float]:
+        """Return the number of seconds since the index was last built or updated."""
+        manifest = self._read_manifest()
+        if manifest is None:
+            return None
+        return time.time() - manifest["built_at"]
+
+    def build(self, workers: Optional[int] = None) -> dict:
+        """
+        Build the whole index from scratch.
+
+        Args:
+            workers: Number of worker processes. Defaults to the number of CPUs.
+
+        Returns:
+            Statistics about the build: number of shards and files indexed.
+        """
+        covered_changes = self._snapshot_changes()
+        return self._build_shards(
+            self._scan(), previous=None, workers=workers, covered_changes=covered_changes
+        )
+
+    def update(self, workers: Optional[int] = None) -> dict:
+        """
+        Bring the index up to date, rebuilding only the shards that changed.
+
+        Falls back to a full build when no compatible index exists.
+
+        Args:
+            workers: Number of worker processes. Defaults to the number of CPUs.
+
+        Returns:
+            Statistics about the update: number of shards rebuilt and files indexed.
+        """
+        manifest = self._read_manifest()
+        if manifest is None:
+            return self.build(workers=workers)
+        covered_changes = self._snapshot_changes()
+        return self._build_shards(
+            self._scan(),
+            previous=manifest,
+            workers=workers,
+            covered_changes=covered_changes,
+        )
+
+    def note_changes(self, paths: Iterable[str | Path]) -> None:
+        """
+        Record files that changed since the index was built.
+
+        Changed files are always returned as candidates (or dropped if deleted)
+        until the next build or update. A change to the root itself marks the
+        whole index stale.
+
+        Args:
+            paths: The changed files and directories.
+        """
+        with self._lock:
+            for path in paths:
+                rel_path = self._relative_prefix(Path(path))
+                if rel_path is None:
+                    continue
+                if rel_path == "":
+                    self.stale = True
+                else:
+                    self._changed.add(rel_path)
+
+    def candidates(
+        self,
+        pattern: str,
+        path: Optional[Path] = None,
+        max_age: Optional[float] = None,
+    ) -> Optional[list[Path]]:
+        """
+        Return the files that may contain a match for `pattern`.
+
+        Args:
+            pattern: The regex pattern being searched.
+            path: Restrict candidates to this file or directory. Defaults to the root.
+            max_age: Treat the index as stale when older than this many seconds.
+
+        Returns:
+            A sorted list of candidate files, or None when the index cannot narrow
+            the search (missing, stale, unusable pattern or path outside the root).
+        """
+        manifest = self._read_manifest()
+        if manifest is None:
+            return None
+        if max_age is not None and time.time() - manifest["built_at"] > max_age:
+            return None
+        if self.stale:
+            return None
+
+        literals = extract_literals(pattern)
+        trigrams = set()
+        for literal in literals or []:
+            # Shards lowercase ASCII bytes only, and other characters may match
+            # case-insensitively in other forms, so only ASCII trigrams narrow
+            trigrams.update(
+                trigram
+                for trigram in _trigrams(literal.encode("utf-8").lower())
+                if trigram.isascii()
+            )
+        if not trigrams:
+            return None
+
+        prefix = self._relative_prefix(path)
+        if prefix is None:
+            return None
+
+        results = []
+        for shard_name, shard in self._load_shards(manifest).items():
+            if prefix and not _shard_overlaps(shard_name, prefix):
+                continue
+            files = shard["files"]
+            matched = _intersect(shard["postings"], trigrams)
+            matched.update(shard["unindexed"])
+            for file_id in matched:
+                rel_path = files[file_id][0]
+                if _within(rel_path, prefix):
+                    results.append(self.root / rel_path)
+
+        with self._lock:
+            changed = [rel_path for rel_path in self._changed if _within(rel_path, prefix)]
+        if changed:
+            # Drop deleted files and search changed files regardless of the postings
+            results = [result for result in results if result.is_file()]
+            for rel_path in changed:
+                changed_path = self.root / rel_path
+                if changed_path.is_file() and not self.matcher.is_ignored(changed_path):
+                    results.append(changed_path)
+            results = list(set(results))
+        results.sort()
+        return results
+
+    def _relative_prefix(self, path: Optional[Path]) -> Optional[str]:
+        """Return `path` relative to the root ("" for the root), or None if outside."""
+        if path is None:
+            return ""
+        try:
+            rel = Path(path).resolve().relative_to(self.root)
+        except ValueError:
+            return None
+        rel_str = rel.as_posix()
+        return "" if rel_str == "." else rel_str
+
+    def _snapshot_changes(self) -> set[str]:
+        """Return the changes the upcoming scan covers and clear the stale flag."""
+        with self._lock:
+            self.stale = False
+            return set(self._changed)
+
+    def _scan(self) -> dict[str, list[tuple[str, int, int]]]:
+        """Stat every non-ignored file, grouped by shard."""
+        shards: dict[str, list[tuple[str, int, int]]] = {}
+        root = str(self.root)
+        stack = [(root, self.matcher.with_gitignore(root))]
+        while stack:
+            directory, matcher = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if matcher.is_ignored(entry.path, is_dir):
+                        continue
+                    if is_dir:
+                        stack.append((entry.path, matcher.with_gitignore(entry.path)))
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                rel_path = entry.path[len(root) + 1 :]
+                shard_name = rel_path.split("/", 1)[0] if "/" in rel_path else ROOT_SHARD
+                shards.setdefault(shard_name, []).append(
+                    (rel_path, stat.st_mtime_ns, stat.st_size)
+                )
+        for files in shards.values():
+            files.sort()
+        return shards
+
+    def _build_shards(
+        self,
+        scanned: dict[str, list[tuple[str, int, int]]],
+        previous: Optional[dict],
+        workers: Optional[int],
+        covered_changes: Iterable[str] = (),
+    ) -> dict:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        previous_shards = (previous or {}).get("shards", {})
+
+        to_build = []
+        shard_entries = {}
+        for shard_name, files in scanned.items():
+            signature = _signature(files)
+            shard_file = _shard_filename(shard_name)
+            old = previous_shards.get(shard_name)
+            if (
+                old is not None
+                and old["signature"] == signature
+                and (self.index_dir / shard_file).exists()
+            ):
+                shard_entries[shard_name] = old
+                continue
+            to_build.append((shard_name, files))
+            shard_entries[shard_name] = {"file": shard_file, "signature": signature}
+
+        if to_build:
+            max_workers = min(workers or os.cpu_count() or 1, len(to_build))
+            if max_workers > 1:
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    built = executor.map(
+                        _build_shard,
+                        [str(self.root)] * len(to_build),
+                        [files for _, files in to_build],
+                    )
+                    self._write_shards(to_build, built)
+            else:
+                built = (_build_shard(str(self.root), files) for _, files in to_build)
+                self._write_shards(to_build, built)
+
+        # Remove shards for top-level directories that no longer exist
+        for shard_name, entry in previous_shards.items():
+            if shard_name not in shard_entries:
+                (self.index_dir / entry["file"]).unlink(missing_ok=True)
+
+        manifest = {
+            "version": INDEX_VERSION,
+            "root": str(self.root),
+            "built_at": time.time(),
+            "shards": shard_entries,
+        }
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(manifest))
+        os.replace(tmp_path, self.manifest_path)
+        with self._lock:
+            self._changed.difference_update(covered_changes)
+
+        return {
+            "shards": len(shard_entries),
+            "rebuilt_shards": len(to_build),
+            "files": sum(len(files) for files in scanned.values()),
+        }
+
+    def _write_shards(self, to_build, built) -> None:
+        for (shard_name, _), data in zip(to_build, built):
+            shard_path = self.index_dir / _shard_filename(shard_name)
+            tmp_path = shard_path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, shard_path)
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            manifest = json.loads(self.manifest_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != INDEX_VERSION or manifest.get("root") != str(
+            self.root
+        ):
+            return None
+        return manifest
+
+    def _load_shards(self, manifest: dict) -> dict[str, dict]:
+        """Load all shards into memory, reloading when the manifest changed."""
+        with self._lock:
+            try:
+                manifest_mtime = self.manifest_path.stat().st_mtime_ns
+            except OSError:
+                manifest_mtime = None
+            if self._shards is None or manifest_mtime != self._loaded_manifest_mtime:
+                shards = {}
+                for shard_name, entry in manifest["shards"].items():
+                    try:
+                        data = (self.index_dir / entry["file"]).read_bytes()
+                    except OSError:
+                        continue
+                    shards[shard_name] = pickle.loads(data)
+                self._shards = shards
+                self._loaded_manifest_mtime = manifest_mtime
+            return self._shards
+
+
+def _build_shard(root: str, files: list[tuple[str, int, int]]) -> bytes:
+    """Index the given files of one shard. Runs in a worker process."""
+    postings: dict[bytes, array] = {}
+    unindexed = []
+    for file_id, (rel_path, _, size) in enumerate(files):
+        if size > MAX_INDEXED_FILE_SIZE:
+            unindexed.append(file_id)
+            continue
+        try:
+            with open(os.path.join(root, rel_path), "rb") as f:
+                data = f.read()
+        except OSError:
+            # Keep unreadable files as candidates so the regex decides
+            unindexed.append(file_id)
+            continue
+        # Skip binary files, like ripgrep does by default
+        if b"\0" in data[:8192]:
+            continue
+        for trigram in _trigrams(data.lower()):
+            posting = postings.get(trigram)
+            if posting is None:
+                postings[trigram] = posting = array("I")
+            posting.append(file_id)
+    shard = {"files": files, "postings": postings, "unindexed": unindexed}
+    return pickle.dumps(shard, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _trigrams(data: bytes) -> set[bytes]:
+    return {data[i : i + 3] for i in range(len(data) - 2)}
+
+
+def _intersect(postings: dict[bytes, array], trigrams: set[bytes]) -> set[int]:
+    """Return the ids of the files containing every trigram."""
+    lists = []
+    for trigram in trigrams:
+        posting = postings.get(trigram)
+        if posting is None:
+            return set()
+        lists.append(posting)
+    lists.sort(key=len)
+    result = set(lists[0])
+    for posting in lists[1:]:
+        result.intersection_update(posting)
+        if not result:
+            break
+    return result
+
+
+def _signature(files: list[tuple[str, int, int]]) -> str:
+    digest = hashlib.sha1()
+    for rel_path, mtime_ns, size in files:
+        digest.update(f"{rel_path}\0{mtime_ns}\0{size}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _shard_filename(shard_name: str) -> str:
+    return hashlib.sha1(shard_name.encode("utf-8")).hexdigest()[:16] + ".idx"
+
+
+def _shard_overlaps(shard_name: str, prefix: str) -> bool:
+    top = prefix.split("/", 1)[0]
+    if shard_name == ROOT_SHARD:
+        return "/" not in prefix
+    return shard_name == top
+
+
+def _within(rel_path: str, prefix: str) -> bool:
+    return not prefix or rel_path == prefix or rel_path.startswith(prefix + "/")
+
+
+_indexes: dict[str, TrigramIndex] = {}
+_updating: set[str] = set()
+_indexes_lock = threading.Lock()
+
+
+def get_project_index(root: str | Path) -> TrigramIndex:
+    """Return the shared TrigramIndex instance for a project root."""
+    key = str(Path(root).resolve())
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = TrigramIndex(Path(key))
+        return index
+
+
+def note_file_changes(paths: Iterable[str | Path]) -> None:
+    """Record changed files in every loaded index, e.g. after the agent wrote them."""
+    paths = list(paths)
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.note_changes(paths)
+
+
+def mark_indexes_stale() -> None:
+    """Stop narrowing searches with any loaded index until its next update."""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        # A change to the root marks the whole index stale
+        index.note_changes([index.root])
+
+
+def update_in_background(index: TrigramIndex) -> None:
+    """Start an incremental update of the index unless one is already running."""
+    key = str(index.root)
+    with _indexes_lock:
+        if key in _updating:
+            return
+        _updating.add(key)
+
+    def run():
+        try:
+            index.update()
+        except Exception:
+            pass
+        finally:
+            with _indexes_lock:
+                _updating.discard(key)
+
+    threading.Thread(target=run, name="deer-code-index", daemon=True).start()
+
+
+if __name__ == "__main__":
+    import sys
+
+    target = Path(sys.argv[1] if len(sys.argv) > 1 else ".")
+    started = time.time()
+    stats = get_project_index(target).update()
+    print(f"Indexed {stats} in {time.time() - started:.1f}s")
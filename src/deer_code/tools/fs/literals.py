@@ -0,0 +1,185 @@
+"""
+Literal extraction for regex patterns.
+
+Extracts substrings that every match of a ripgrep-style regex must contain.
+Search backends use them to skip files cheaply before running the real regex.
+The extraction is conservative: when in doubt, a piece of the pattern is
+treated as unknown, so the result never excludes a file that could match.
+"""
+
+from typing import Optional
+
+# Escapes that stand for a single literal character
+_LITERAL_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "f": "\f", "v": "\v"}
+
+# Escapes followed by a code point in hex, with its maximal number of digits
+_HEX_ESCAPE_DIGITS = {"x": 2, "u": 4, "U": 8}
+
+# Quantifiers that make the preceding atom optional
+_OPTIONAL_QUANTIFIERS = ("*", "?", "{")
+
+
+def extract_literals(pattern: str) -> Optional[list[str]]:
+    """
+    Extract literal substrings required by every match of a regex.
+
+    Args:
+        pattern: The regex pattern (ripgrep / Python `re` syntax)
+
+    Returns:
+        A list of literals that must all appear in a matching text, or None if
+        the pattern has a top-level alternation and no literal is guaranteed.
+        An empty list means the pattern is valid but has no usable literal.
+    """
+    if _has_alternation(pattern):
+        return None
+
+    literals: list[str] = []
+    current: list[str] = []
+
+    def flush():
+        if current:
+            literals.append("".join(current))
+            current.clear()
+
+    i = 0
+    length = len(pattern)
+    while i < length:
+        char = pattern[i]
+        atom: Optional[str] = None
+
+        if char == "\\":
+            if i + 1 >= length:
+                return literals
+            escaped = pattern[i + 1]
+            i += 2
+            if escaped in _LITERAL_ESCAPES:
+                atom = _LITERAL_ESCAPES[escaped]
+            elif not escaped.isalnum():
+                atom = escaped
+            else:
+                # Character classes (\w, \d, ...), anchors (\b), unicode (\p{..}),
+                # code points (\x41, \u{..}), octal escapes or backreferences
+                if escaped in "pPxuU" and i < length and pattern[i] == "{":
+                    i = _skip_until(pattern, i, "}")
+                elif escaped in _HEX_ESCAPE_DIGITS:
+                    i = _skip_digits(pattern, i, "0123456789abcdefABCDEF", _HEX_ESCAPE_DIGITS[escaped])
+                elif escaped.isdigit():
+                    i = _skip_digits(pattern, i, "0123456789", length)
+                flush()
+                continue
+        elif char == "[":
+            i = _skip_class(pattern, i)
+            flush()
+            continue
+        elif char == "(":
+            i = _skip_group(pattern, i)
+            flush()
+            continue
+        elif char in ".^$":
+            i += 1
+            flush()
+            continue
+        elif char in "*+?{":
+            # Stray quantifier (e.g. lazy marker or the body of {m,n})
+            if char == "{":
+                i = _skip_until(pattern, i, "}")
+            else:
+                i += 1
+            flush()
+            continue
+        else:
+            atom = char
+            i += 1
+
+        # Inspect the quantifier that follows the atom, if any
+        if i < length and pattern[i] in _OPTIONAL_QUANTIFIERS:
+            flush()
+            continue
+        current.append(atom)
+        if i < length and pattern[i] == "+":
+            flush()
+
+    flush()
+    return literals
+
+
+def _has_alternation(pattern: str) -> bool:
+    """Check whether the pattern contains `|` outside of character classes."""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            i = _skip_class(pattern, i)
+            continue
+        if char == "|":
+            return True
+        i += 1
+    return False
+
+
+def _skip_until(pattern: str, start: int, terminator: str) -> int:
+    """Return the index just past `terminator`, or the end of the pattern."""
+    end = pattern.find(terminator, start)
+    return len(pattern) if end == -1 else end + 1
+
+
+def _skip_digits(pattern: str, start: int, digits: str, limit: int) -> int:
+    """Return the index past at most `limit` characters of `digits` from `start`."""
+    i = start
+    while i < len(pattern) and i - start < limit and pattern[i] in digits:
+        i += 1
+    return i
+
+
+def _skip_class(pattern: str, start: int) -> int:
+    """Return the index just past the character class starting at `start`."""
+    i = start + 1
+    if i < len(pattern) and pattern[i] == "^":
+        i += 1
+    # A leading ] is a literal member of the class
+    if i < len(pattern) and pattern[i] == "]":
+        i += 1
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            i += 2
+            continue
+        if pattern[i] == "[":
+            # Nested class such as [[:alpha:]]
+            i = _skip_class(pattern, i)
+            continue
+        if pattern[i] == "]":
+            return i + 1
+        i += 1
+    return len(pattern)
+
+
+def _skip_group(pattern: str, start: int) -> int:
+    """Return the index just past the group starting at `start`, with its quantifier."""
+    depth = 0
+    i = start
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            i = _skip_class(pattern, i)
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                i += 1
+                break
+        i += 1
+    # Skip a trailing quantifier so it isn't attached to the next literal
+    if i < len(pattern) and pattern[i] in "*+?":
+        i += 1
+    elif i < len(pattern) and pattern[i] == "{":
+        i = _skip_until(pattern, i, "}")
+    return i
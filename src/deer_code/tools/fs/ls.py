@@ -1,12 +1,16 @@
+import asyncio
 import fnmatch
 from pathlib import Path
 from typing import Optional
 
 from langchain.tools import ToolRuntime, tool
 
+from deer_code.project import project
 from deer_code.tools.reminders import generate_reminders
+from deer_code.tools.side_effects import SideEffect, tag_side_effect
 
-from .ignore import DEFAULT_IGNORE_PATTERNS
+from .cache import fs_cache
+from .ignore import GITIGNORE_FILENAME, get_ignore_matcher, gitignore_directories
 
 
 @tool("ls", parse_docstring=True)
@@ -32,11 +36,43 @@ def ls_tool(
     if not _path.is_dir():
         return f"Error: the path {path} is not a directory. Please provide a valid directory path."
 
+    key = ("ls", str(_path), tuple(match or ()), tuple(ignore or ()))
+    output = fs_cache.get(key)
+    if output is None:
+        try:
+            output = _list_items(_path, path, match, ignore)
+        except PermissionError:
+            return f"Error: permission denied to access the path {path}."
+        # Editing a .gitignore file doesn't change the mtime of its directory
+        gitignores = [
+            directory / GITIGNORE_FILENAME
+            for directory in gitignore_directories(_path, project.root_dir)
+        ]
+        fs_cache.put(key, output, watch=[_path, *gitignores], scope=str(_path))
+
+    return output + generate_reminders(runtime)
+
+
+async def _als(
+    runtime: ToolRuntime,
+    path: str,
+    match: Optional[list[str]] = None,
+    ignore: Optional[list[str]] = None,
+):
+    """Async variant of ls_tool that lists the directory off the event loop."""
+    return await asyncio.to_thread(ls_tool.func, runtime, path, match, ignore)
+
+
+ls_tool.coroutine = _als
+tag_side_effect(ls_tool, SideEffect.read_only)
+
+
+def _list_items(
+    _path: Path, path: str, match: Optional[list[str]], ignore: Optional[list[str]]
+) -> str:
+    """List a directory and format the result, without reminders."""
     # Get all items in the directory
-    try:
-        items = list(_path.iterdir())
-    except PermissionError:
-        return f"Error: permission denied to access the path {path}."
+    items = list(_path.iterdir())
 
     # Sort items: directories first, then files, both alphabetically
     items.sort(key=lambda x: (x.is_file(), x.name.lower()))
@@ -51,23 +87,14 @@ def ls_tool(
                     break
         items = filtered_items
 
-    ignore = (ignore or []) + DEFAULT_IGNORE_PATTERNS
-    filtered_items = []
-    for item in items:
-        should_ignore = False
-        for pattern in ignore:
-            if fnmatch.fnmatch(item.name, pattern):
-                should_ignore = True
-                break
-        if not should_ignore:
-            filtered_items.append(item)
-    items = filtered_items
-
-    reminders = generate_reminders(runtime)
+    matcher = get_ignore_matcher(tuple(ignore or ())).with_gitignores(
+        _path, project.root_dir
+    )
+    items = [item for item in items if not matcher.is_ignored(item, item.is_dir())]
 
     # Format the output
     if not items:
-        return f"No items found in {path}.{reminders}"
+        return f"No items found in {path}."
 
     result_lines = []
     for item in items:
@@ -79,7 +106,7 @@ def ls_tool(
     return (
         f"Here's the result in {path}: \n```\n"
         + "\n".join(result_lines)
-        + f"\n```{reminders}"
+        + "\n```"
     )
 
 
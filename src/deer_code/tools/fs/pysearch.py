@@ -0,0 +1,508 @@
+"""
+Pure-Python search engine used by grep when ripgrep is not installed.
+
+It mirrors the subset of ripgrep used by the grep tool: the same output modes
+(`content`, `files_with_matches`, `count`), context lines, line numbers, case
+insensitivity, file globs and types, per-file match caps and multiline mode,
+and it prints results in ripgrep's format. Like ripgrep, it skips hidden,
+ignored and binary files.
+
+Files are memory-mapped and pre-filtered with the literals every match must
+contain (see `literals.py`), so most files are rejected without running the
+regex or decoding any text. Large file lists are split across a process pool.
+"""
+
+import mmap
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Optional
+
+from .ignore import IgnoreMatcher, get_ignore_matcher, glob_to_regex
+from .literals import extract_literals
+
+# File types accepted by `type`, by ripgrep type name
+FILE_TYPES = {
+    "c": ["*.c", "*.h"],
+    "cpp": ["*.cpp", "*.cc", "*.cxx", "*.hpp", "*.hh", "*.hxx", "*.h"],
+    "css": ["*.css", "*.scss", "*.sass", "*.less"],
+    "go": ["*.go"],
+    "html": ["*.html", "*.htm"],
+    "java": ["*.java"],
+    "js": ["*.js", "*.jsx", "*.mjs", "*.cjs", "*.vue"],
+    "json": ["*.json"],
+    "kotlin": ["*.kt", "*.kts"],
+    "md": ["*.md", "*.markdown", "*.mdx"],
+    "py": ["*.py", "*.pyi"],
+    "rb": ["*.rb"],
+    "rust": ["*.rs"],
+    "sh": ["*.sh", "*.bash", "*.zsh"],
+    "sql": ["*.sql"],
+    "swift": ["*.swift"],
+    "toml": ["*.toml"],
+    "ts": ["*.ts", "*.tsx", "*.mts", "*.cts"],
+    "txt": ["*.txt"],
+    "yaml": ["*.yaml", "*.yml"],
+}
+
+# Below this many files, searching in-process beats starting worker processes
+PARALLEL_MIN_FILES = 256
+
+# Number of leading bytes checked for NUL to detect binary files
+BINARY_SNIFF_SIZE = 8192
+
+
+class SearchOptions(NamedTuple):
+    """The options of a search, sent to worker processes."""
+
+    pattern: str
+    output_mode: str
+    before: int
+    after: int
+    line_numbers: bool
+    ignore_case: bool
+    max_count: Optional[int]
+    multiline: bool
+    with_filename: bool
+
+
+def search(
+    pattern: str,
+    search_path: str,
+    files: Optional[list[str]] = None,
+    glob: Optional[str] = None,
+    output_mode: str = "files_with_matches",
+    B: Optional[int] = None,
+    A: Optional[int] = None,
+    C: Optional[int] = None,
+    n: Optional[bool] = None,
+    i: Optional[bool] = None,
+    type: Optional[str] = None,
+    head_limit: Optional[int] = None,
+    max_count: Optional[int] = None,
+    multiline: Optional[bool] = False,
+    workers: Optional[int] = None,
+    root: Optional[str] = None,
+) -> list[str]:
+    """
+    Search files for a regex, with ripgrep's options and output format.
+
+    Args:
+        pattern: The regex pattern (Python `re` syntax, close to ripgrep's)
+        search_path: The file or directory to search
+        files: Search exactly these files instead of walking `search_path`
+        glob: Only search files matching this glob (e.g. "*.{ts,tsx}", "!*.min.js")
+        output_mode: "content", "files_with_matches" or "count"
+        B: Number of lines to show before each match (content mode)
+        A: Number of lines to show after each match (content mode)
+        C: Number of lines to show before and after each match (content mode)
+        n: Prefix matching lines with their line number (content mode)
+        i: Search case insensitively
+        type: Only search files of this type (e.g. "py")
+        head_limit: Stop after this many output lines
+        max_count: Maximum number of matching lines per file
+        multiline: Allow matches to span lines, with `.` matching newlines
+        workers: Number of worker processes. Defaults to the number of CPUs.
+        root: The project root, whose .gitignore files down to `search_path` apply.
+
+    Returns:
+        The output lines, as ripgrep would print them.
+
+    Raises:
+        ValueError: If the pattern or the file type is invalid, or the path doesn't exist
+    """
+    try:
+        _compile(pattern, bool(i), bool(multiline))
+    except re.error as e:
+        raise ValueError(f"regex parse error: {e}")
+    if type and type not in FILE_TYPES:
+        raise ValueError(f"unrecognized file type: {type}")
+
+    if files is None:
+        if not os.path.exists(search_path):
+            raise ValueError(f"{search_path}: No such file or directory (os error 2)")
+        with_filename = os.path.isdir(search_path)
+        files = list(iter_files(search_path, glob, type, root=root))
+    else:
+        with_filename = True
+
+    options = SearchOptions(
+        pattern=pattern,
+        output_mode=output_mode,
+        before=(C if C is not None else B) or 0,
+        after=(C if C is not None else A) or 0,
+        line_numbers=bool(n),
+        ignore_case=bool(i),
+        max_count=max_count or None,
+        multiline=bool(multiline),
+        with_filename=with_filename,
+    )
+
+    has_context = output_mode == "content" and (options.before or options.after)
+    lines: list[str] = []
+    for file_lines in _search_all(files, options, workers):
+        if has_context and lines and file_lines:
+            lines.append("--")
+        lines.extend(file_lines)
+        if head_limit and len(lines) >= head_limit:
+            return lines[:head_limit]
+    return lines
+
+
+def iter_files(
+    search_path: str,
+    glob: Optional[str] = None,
+    type: Optional[str] = None,
+    matcher: Optional[IgnoreMatcher] = None,
+    root: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Yield the files under `search_path` that ripgrep would search, in sorted order.
+
+    Hidden and ignored entries are skipped, .gitignore files are honored and
+    symbolic links are not followed. Paths are yielded relative to `search_path`
+    the way it was given, e.g. "./src/app.py" for ".".
+
+    Args:
+        search_path: The file or directory to walk.
+        glob: Only yield files matching this glob.
+        type: Only yield files of this type.
+        matcher: Ignore rules. Defaults to the default ignore patterns.
+        root: The project root, whose .gitignore files down to `search_path` apply.
+    """
+    includes, excludes = _parse_globs(glob)
+    if type:
+        type_globs = FILE_TYPES[type]
+    else:
+        type_globs = None
+
+    if not os.path.isdir(search_path):
+        yield search_path
+        return
+
+    top = os.path.abspath(search_path)
+    matcher = (matcher or get_ignore_matcher()).with_gitignores(top, root)
+    stack = [(top, matcher)]
+    while stack:
+        directory, matcher = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        subdirectories = []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if matcher.is_ignored(entry.path, is_dir):
+                    continue
+                if is_dir:
+                    subdirectories.append(entry.path)
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+            except OSError:
+                continue
+            rel_path = entry.path[len(top.rstrip(os.sep)) + 1 :]
+            if type_globs and not _matches_any(entry.name, rel_path, type_globs):
+                continue
+            if includes and not _matches_any(entry.name, rel_path, includes):
+                continue
+            if excludes and _matches_any(entry.name, rel_path, excludes):
+                continue
+            yield os.path.join(search_path, rel_path)
+        # Push in reverse so directories are visited in sorted order
+        for subdirectory in reversed(subdirectories):
+            stack.append((subdirectory, matcher.with_gitignore(subdirectory)))
+
+
+def _search_all(
+    files: list[str], options: SearchOptions, workers: Optional[int]
+) -> Iterator[list[str]]:
+    """Yield the output lines of each file, in file order."""
+    max_workers = workers or os.cpu_count() or 1
+    if max_workers <= 1 or len(files) < PARALLEL_MIN_FILES:
+        for path in files:
+            yield _search_file(path, options)
+        return
+
+    # Several small batches per worker keep the load balanced across workers
+    batch_size = max(16, len(files) // (max_workers * 8))
+    batches = [files[start : start + batch_size] for start in range(0, len(files), batch_size)]
+    executor = _get_executor(max_workers)
+    futures = [executor.submit(_search_batch, batch, options) for batch in batches]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        # Stop the remaining batches once the caller has enough output
+        for future in futures:
+            future.cancel()
+
+
+_executors: dict[int, Executor] = {}
+
+
+def _get_executor(max_workers: int) -> Executor:
+    """Return a process pool kept alive across searches."""
+    executor = _executors.get(max_workers)
+    if executor is None:
+        # Fork from a clean server process: the agent runs several threads
+        methods = multiprocessing.get_all_start_methods()
+        method = "forkserver" if "forkserver" in methods else None
+        executor = _executors[max_workers] = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context(method),
+        )
+    return executor
+
+
+def shutdown_workers() -> None:
+    """Stop the worker processes kept alive across searches."""
+    while _executors:
+        _, executor = _executors.popitem()
+        executor.shutdown(cancel_futures=True)
+
+
+def _search_batch(paths: list[str], options: SearchOptions) -> list[list[str]]:
+    return [_search_file(path, options) for path in paths]
+
+
+@lru_cache(maxsize=32)
+def _compile(pattern: str, ignore_case: bool, multiline: bool) -> re.Pattern:
+    flags = re.MULTILINE
+    if ignore_case:
+        flags |= re.IGNORECASE
+        pattern = _spell_out_cases(pattern)
+    if multiline:
+        flags |= re.DOTALL
+    return re.compile(pattern.encode("utf-8"), flags)
+
+
+def _spell_out_cases(pattern: str) -> str:
+    """
+    Replace the non-ASCII characters of a pattern with a group of their case
+    variants, since bytes regexes only fold the case of ASCII letters.
+
+    Characters inside character classes are left as they are.
+    """
+    if pattern.isascii():
+        return pattern
+    parts = []
+    i = 0
+    in_class = False
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            parts.append(pattern[i : i + 2])
+            i += 2
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            # A leading ] is a literal member of the class
+            end = i + 1
+            if pattern.startswith("^", end):
+                end += 1
+            if pattern.startswith("]", end):
+                end += 1
+            parts.append(pattern[i:end])
+            i = end
+            in_class = True
+            continue
+        elif not char.isascii():
+            variants = {char, char.lower(), char.upper(), char.casefold()}
+            variants = sorted(variant for variant in variants if len(variant) == 1)
+            if len(variants) > 1:
+                char = f"(?:{'|'.join(variants)})"
+        parts.append(char)
+        i += 1
+    return "".join(parts)
+
+
+@lru_cache(maxsize=32)
+def _prefilter(pattern: str, ignore_case: bool) -> tuple[bytes, ...]:
+    """Return the literals every match must contain, as bytes."""
+    if ignore_case or "(?" in pattern:
+        # Case folding and inline flags change what the literals match
+        return ()
+    return tuple(literal.encode("utf-8") for literal in extract_literals(pattern) or [])
+
+
+def _search_file(path: str, options: SearchOptions) -> list[str]:
+    """Search one file and return its output lines."""
+    try:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _search_data(path, data, options)
+    except (OSError, ValueError):
+        return []
+
+
+def _search_data(path: str, data: mmap.mmap, options: SearchOptions) -> list[str]:
+    if data.find(b"\0", 0, BINARY_SNIFF_SIZE) != -1:
+        return []
+    for literal in _prefilter(options.pattern, options.ignore_case):
+        if data.find(literal) == -1:
+            return []
+
+    regex = _compile(options.pattern, options.ignore_case, options.multiline)
+    match = regex.search(data)
+    if match is None:
+        return []
+    if options.output_mode == "files_with_matches":
+        return [path]
+
+    spans = _matching_spans(regex, data, match, options)
+    if options.output_mode == "count":
+        count = sum(last - first + 1 for first, last, _, _ in spans)
+        return [f"{path}:{count}" if options.with_filename else str(count)]
+    return _format_content(path, data, spans, options)
+
+
+def _matching_spans(
+    regex: re.Pattern, data: mmap.mmap, match: re.Match, options: SearchOptions
+) -> list[tuple[int, int, int, int]]:
+    """
+    Find the lines covered by matches.
+
+    Returns:
+        A list of (first line, last line, start offset, end offset) with 0-based
+        line numbers, where the offsets delimit the lines without the final newline.
+    """
+    spans = []
+    size = len(data)
+    position = 0
+    line = 0
+    matched_lines = 0
+    while match is not None:
+        start = match.start()
+        if not options.multiline and data.find(b"\n", start, match.end()) != -1:
+            # Without multiline mode a match must fit on one line, like in ripgrep
+            line_end = data.find(b"\n", start)
+            match = regex.search(data, start, line_end)
+            if match is None:
+                match = regex.search(data, line_end + 1)
+                continue
+        line += _count_newlines(data, position, start)
+        line_start = data.rfind(b"\n", 0, start) + 1
+        # Without multiline mode a match never extends past its first line
+        span_end = max(match.end() - 1, start) if options.multiline else start
+        last_line = line + _count_newlines(data, start, span_end)
+        line_end = data.find(b"\n", span_end)
+        if line_end == -1:
+            line_end = size
+        spans.append((line, last_line, line_start, line_end))
+
+        matched_lines += last_line - line + 1
+        if options.max_count and matched_lines >= options.max_count:
+            break
+        if line_end >= size - 1:
+            break
+        position = line_end + 1
+        line = last_line + 1
+        match = regex.search(data, position)
+    return spans
+
+
+def _count_newlines(data: mmap.mmap, start: int, end: int) -> int:
+    return data[start:end].count(b"\n") if end > start else 0
+
+
+def _format_content(
+    path: str,
+    data: mmap.mmap,
+    spans: list[tuple[int, int, int, int]],
+    options: SearchOptions,
+) -> list[str]:
+    """Format matching lines and their context like ripgrep."""
+    # line number -> (is match, text), in line order
+    selected: dict[int, tuple[bool, bytes]] = {}
+    for first, last, start, end in spans:
+        for offset, text in enumerate(data[start:end].split(b"\n")):
+            selected[first + offset] = (True, text)
+        # Context before the match
+        line, cursor = first, start
+        for _ in range(options.before):
+            if cursor == 0:
+                break
+            previous_start = data.rfind(b"\n", 0, cursor - 1) + 1
+            line -= 1
+            selected.setdefault(line, (False, data[previous_start : cursor - 1]))
+            cursor = previous_start
+        # Context after the match
+        line, cursor = last, end
+        for _ in range(options.after):
+            if cursor >= len(data) - 1:
+                break
+            next_end = data.find(b"\n", cursor + 1)
+            if next_end == -1:
+                next_end = len(data)
+            line += 1
+            selected.setdefault(line, (False, data[cursor + 1 : next_end]))
+            cursor = next_end
+
+    output = []
+    has_context = options.before or options.after
+    previous = None
+    for line in sorted(selected):
+        if has_context and previous is not None and line > previous + 1:
+            output.append("--")
+        previous = line
+        is_match, text = selected[line]
+        separator = ":" if is_match else "-"
+        prefix = ""
+        if options.with_filename:
+            prefix += f"{path}{separator}"
+        if options.line_numbers:
+            prefix += f"{line + 1}{separator}"
+        output.append(prefix + text.decode("utf-8", errors="replace"))
+    return output
+
+
+def _parse_globs(glob: Optional[str]) -> tuple[list[str], list[str]]:
+    """Split a glob into the patterns to include and the `!` patterns to exclude."""
+    if not glob:
+        return [], []
+    includes, excludes = [], []
+    for pattern in _expand_braces(glob):
+        if pattern.startswith("!"):
+            excludes.append(pattern[1:])
+        else:
+            includes.append(pattern)
+    return includes, excludes
+
+
+def _expand_braces(glob: str) -> list[str]:
+    """Expand `{a,b}` alternatives, e.g. "*.{ts,tsx}" -> ["*.ts", "*.tsx"]."""
+    start = glob.find("{")
+    end = glob.find("}", start)
+    if start == -1 or end == -1:
+        return [glob]
+    expanded = []
+    for alternative in glob[start + 1 : end].split(","):
+        expanded.extend(_expand_braces(glob[:start] + alternative + glob[end + 1 :]))
+    return expanded
+
+
+def _matches_any(name: str, rel_path: str, patterns: list[str]) -> bool:
+    """Match globs with a slash against the relative path, others against the name."""
+    rel_path = rel_path.replace(os.sep, "/")
+    for pattern in patterns:
+        if "/" in pattern:
+            if _compile_glob(pattern.lstrip("/")).fullmatch(rel_path):
+                return True
+        elif _compile_glob(pattern).fullmatch(name):
+            return True
+    return False
+
+
+@lru_cache(maxsize=256)
+def _compile_glob(glob: str) -> re.Pattern:
+    """Compile a glob the way ripgrep reads it: only `**` matches across `/`."""
+    return re.compile(glob_to_regex(glob))
@@ -1,28 +1,190 @@
-import fnmatch
+import asyncio
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Optional
+from typing import NamedTuple, Optional
 
 from langchain.tools import ToolRuntime, tool
 
+from deer_code.project import project
 from deer_code.tools.reminders import generate_reminders
+from deer_code.tools.side_effects import SideEffect, tag_side_effect
+from deer_code.watcher import get_project_watcher
 
-from .ignore import DEFAULT_IGNORE_PATTERNS
+from .cache import fs_cache
+from .ignore import GITIGNORE_FILENAME, IgnoreMatcher, get_ignore_matcher
+
+
+# Extensions listed first when a directory has more entries than it can show
+SOURCE_EXTENSIONS = {
+    ".c", ".cc", ".cpp", ".cs", ".css", ".go", ".h", ".hpp", ".html", ".java",
+    ".js", ".jsx", ".kt", ".lua", ".m", ".md", ".php", ".py", ".rb", ".rs",
+    ".scala", ".scss", ".sh", ".sql", ".svelte", ".swift", ".toml", ".ts",
+    ".tsx", ".vue", ".yaml", ".yml",
+}
+
+# Extensions listed last: generated data, assets and archives
+DATA_EXTENSIONS = {
+    ".bin", ".csv", ".dat", ".db", ".gif", ".gz", ".ico", ".jpeg", ".jpg",
+    ".json", ".jsonl", ".lock", ".map", ".npy", ".parquet", ".pdf", ".pkl",
+    ".png", ".snap", ".sqlite", ".svg", ".tar", ".tsv", ".webp", ".xml", ".zip",
+}
+
+
+@lru_cache(maxsize=64)
+def _compile_patterns(ignore_patterns: tuple[str, ...]) -> IgnoreMatcher:
+    return IgnoreMatcher(ignore_patterns)
 
 
 def should_ignore(path: Path, ignore_patterns: list[str]) -> bool:
     """Check if a path should be ignored based on ignore patterns."""
-    path_str = str(path)
-    name = path.name
+    return _compile_patterns(tuple(ignore_patterns)).is_ignored(path)
+
+
+class TreeEntry(NamedTuple):
+    """A directory entry collected while walking the tree."""
+
+    name: str
+    path: str
+    is_dir: bool
+    # (st_dev, st_ino) of directories, used to detect symlink loops
+    inode: Optional[tuple[int, int]] = None
+    # File size in bytes, only collected for budgeted output
+    size: Optional[int] = None
+
+
+class DirectoryListing(NamedTuple):
+    """The sorted, filtered entries of one directory."""
 
-    for pattern in ignore_patterns:
-        # Remove /** or /* suffix for matching
-        clean_pattern = pattern.rstrip("/**").rstrip("/*")
+    entries: Optional[list[TreeEntry]]  # None when permission was denied
+    matcher: IgnoreMatcher
 
-        # Match against the name or full path
-        if fnmatch.fnmatch(name, clean_pattern) or fnmatch.fnmatch(path_str, pattern):
-            return True
 
-    return False
+def list_directory(
+    path: str,
+    matcher: IgnoreMatcher,
+    layer_gitignore: bool = True,
+    collect_sizes: bool = False,
+) -> DirectoryListing:
+    """
+    List a directory with a single scandir call.
+
+    The entry types come from the cached scandir results, so files cost no extra
+    stat call. Directories are stat'ed once to get their inode.
+
+    Args:
+        path: The directory to list.
+        matcher: The ignore rules inherited from the parent directory.
+        layer_gitignore: Whether to layer the directory's own .gitignore file.
+        collect_sizes: Whether to stat files to record their size.
+
+    Returns:
+        The listing, sorted with directories first and then by lowercase name.
+    """
+    try:
+        with os.scandir(path) as iterator:
+            raw_entries = list(iterator)
+    except PermissionError:
+        return DirectoryListing(None, matcher)
+    except OSError:
+        return DirectoryListing([], matcher)
+
+    if layer_gitignore:
+        has_gitignore = any(e.name == GITIGNORE_FILENAME for e in raw_entries)
+        matcher = matcher.with_gitignore(path, has_gitignore=has_gitignore)
+
+    entries = []
+    for raw_entry in raw_entries:
+        try:
+            is_dir = raw_entry.is_dir()
+        except OSError:
+            is_dir = False
+        if matcher.is_ignored(raw_entry.path, is_dir):
+            continue
+        inode = None
+        size = None
+        if is_dir or collect_sizes:
+            try:
+                stat = raw_entry.stat()
+                if is_dir:
+                    inode = (stat.st_dev, stat.st_ino)
+                else:
+                    size = stat.st_size
+            except OSError:
+                pass
+        entries.append(TreeEntry(raw_entry.name, raw_entry.path, is_dir, inode, size))
+    entries.sort(key=lambda e: (not e.is_dir, e.name.lower()))
+    return DirectoryListing(entries, matcher)
+
+
+def walk_tree(
+    directory: Path,
+    max_depth: Optional[int],
+    matcher: IgnoreMatcher,
+    workers: Optional[int] = None,
+    collect_sizes: bool = False,
+) -> dict[str, DirectoryListing]:
+    """
+    List every directory that the tree will display, level by level.
+
+    Sibling directories of the same level are listed concurrently on a thread
+    pool. Each directory is entered at most once, based on its inode, which
+    protects against symlink loops.
+
+    Args:
+        directory: The root of the tree.
+        max_depth: Number of levels to list, or None for no limit.
+        matcher: The ignore rules for the root directory.
+        workers: Maximum number of listing threads.
+        collect_sizes: Whether to record file sizes for aggregate summaries.
+
+    Returns:
+        The listings keyed by directory path.
+    """
+    if max_depth is not None and max_depth <= 0:
+        return {}
+
+    root = os.fspath(directory)
+    list_child = partial(list_directory, collect_sizes=collect_sizes)
+    listings = {
+        root: list_directory(
+            root, matcher, layer_gitignore=False, collect_sizes=collect_sizes
+        )
+    }
+    if max_depth is not None and max_depth <= 1:
+        return listings
+
+    try:
+        root_stat = os.stat(root)
+        visited = {(root_stat.st_dev, root_stat.st_ino)}
+    except OSError:
+        visited = set()
+
+    level = [root]
+    depth = 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while level and (max_depth is None or depth < max_depth):
+            children = []
+            for parent in level:
+                listing = listings[parent]
+                for entry in listing.entries or []:
+                    if not entry.is_dir or entry.inode is None:
+                        continue
+                    if entry.inode in visited:
+                        continue
+                    visited.add(entry.inode)
+                    children.append((entry.path, listing.matcher))
+            if len(children) > 1:
+                results = executor.map(lambda child: list_child(*child), children)
+            else:
+                results = [list_child(*child) for child in children]
+            for (child_path, _), listing in zip(children, results):
+                listings[child_path] = listing
+            level = [child_path for child_path, _ in children]
+            depth += 1
+    return listings
 
 
 def generate_tree(
@@ -31,57 +193,188 @@ def generate_tree(
     max_depth: Optional[int] = None,
     current_depth: int = 0,
     ignore_patterns: list[str] = None,
+    matcher: Optional[IgnoreMatcher] = None,
+    workers: Optional[int] = None,
+    max_entries_per_dir: Optional[int] = None,
+    max_chars: Optional[int] = None,
 ) -> list[str]:
-    """Recursively generate tree structure."""
-    if ignore_patterns is None:
-        ignore_patterns = []
+    """Generate tree structure.
+
+    Entries are filtered with `matcher` when given, otherwise with a matcher
+    compiled from `ignore_patterns`. The .gitignore file of every
+    subdirectory is layered on top while descending.
 
-    lines = []
+    See `render_tree` for `max_entries_per_dir` and `max_chars`.
+    """
+    if matcher is None:
+        matcher = _compile_patterns(tuple(ignore_patterns or []))
 
     # Check depth limit
     if max_depth is not None and current_depth >= max_depth:
-        return lines
+        return []
 
-    try:
-        # Get all entries and sort them (directories first, then files)
-        entries = sorted(
-            directory.iterdir(), key=lambda x: (not x.is_dir(), x.name.lower())
-        )
+    levels = None if max_depth is None else max_depth - current_depth
+    budgeted = max_entries_per_dir is not None or max_chars is not None
+    listings = walk_tree(directory, levels, matcher, workers, collect_sizes=budgeted)
+    return render_tree(directory, listings, prefix, max_entries_per_dir, max_chars)
 
-        # Filter out ignored entries
-        entries = [e for e in entries if not should_ignore(e, ignore_patterns)]
 
-        for index, entry in enumerate(entries):
-            is_last = index == len(entries) - 1
+def render_tree(
+    directory: Path,
+    listings: dict[str, DirectoryListing],
+    prefix: str = "",
+    max_entries_per_dir: Optional[int] = None,
+    max_chars: Optional[int] = None,
+) -> list[str]:
+    """
+    Render the listings collected by `walk_tree` as tree lines.
 
-            # Determine the tree characters
-            if is_last:
-                connector = "└── "
-                extension = "    "
-            else:
-                connector = "├── "
-                extension = "│   "
-
-            # Add the entry
-            if entry.is_dir():
-                lines.append(f"{prefix}{connector}{entry.name}/")
-                # Recurse into subdirectory
-                if max_depth is None or current_depth + 1 < max_depth:
-                    sub_lines = generate_tree(
-                        entry,
-                        prefix + extension,
-                        max_depth,
-                        current_depth + 1,
-                        ignore_patterns,
-                    )
-                    lines.extend(sub_lines)
-            else:
-                lines.append(f"{prefix}{connector}{entry.name}")
+    Args:
+        directory: The root of the tree.
+        listings: The directory listings.
+        prefix: Prefix prepended to every line.
+        max_entries_per_dir: Show at most this many entries per directory and
+            summarize the rest in one line per kind. Directories and source
+            files are shown before data files.
+        max_chars: Character budget for the whole output. The per-directory cap
+            is lowered until the output fits, and the output is cut as a last resort.
 
-    except PermissionError:
-        lines.append(f"{prefix}[Permission Denied]")
+    Returns:
+        The tree lines.
+    """
+    root = os.fspath(directory)
+    if max_chars is None:
+        lines = []
+        _render_tree(root, prefix, listings, lines, max_entries_per_dir)
+        return lines
 
-    return lines
+    caps: list[Optional[int]] = []
+    cap = max_entries_per_dir
+    if cap is None:
+        caps.append(None)
+        cap = 100
+    while cap >= 1:
+        caps.append(cap)
+        cap //= 2
+
+    for cap in caps:
+        lines = []
+        _render_tree(root, prefix, listings, lines, cap)
+        if sum(len(line) + 1 for line in lines) <= max_chars:
+            return lines
+
+    # Even one entry per directory doesn't fit: cut the output
+    note = f"{prefix}… output truncated to fit {max_chars:,} characters"
+    kept, used = [], len(note)
+    for line in lines:
+        used += len(line) + 1
+        if used > max_chars:
+            break
+        kept.append(line)
+    kept.append(note)
+    return kept
+
+
+def count_entries(listings: dict[str, DirectoryListing]) -> tuple[int, int]:
+    """Return the number of (directories, files) found by `walk_tree`."""
+    dir_count = file_count = 0
+    for listing in listings.values():
+        for entry in listing.entries or []:
+            if entry.is_dir:
+                dir_count += 1
+            else:
+                file_count += 1
+    return dir_count, file_count
+
+
+def _file_priority(entry: TreeEntry) -> int:
+    if entry.is_dir:
+        return 0
+    extension = os.path.splitext(entry.name)[1].lower()
+    if extension in SOURCE_EXTENSIONS:
+        return 1
+    if extension in DATA_EXTENSIONS:
+        return 3
+    return 2
+
+
+def _format_size(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{int(value)} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+
+def _summarize_hidden(hidden: list[TreeEntry]) -> list[str]:
+    """Describe entries left out by the per-directory cap."""
+    summaries = []
+    dirs = [entry for entry in hidden if entry.is_dir]
+    files = [entry for entry in hidden if not entry.is_dir]
+    if dirs:
+        summaries.append(
+            f"… {len(dirs):,} more director{'y' if len(dirs) == 1 else 'ies'}"
+        )
+    if files:
+        details = [_format_size(sum(entry.size or 0 for entry in files))]
+        extensions = Counter(
+            os.path.splitext(entry.name)[1].lower() for entry in files
+        )
+        extension, count = extensions.most_common(1)[0]
+        if extension and count * 2 > len(files):
+            details.append(f"mostly {extension}")
+        summaries.append(
+            f"… {len(files):,} more file{'' if len(files) == 1 else 's'} ({', '.join(details)})"
+        )
+    return summaries
+
+
+def _render_tree(
+    directory: str,
+    prefix: str,
+    listings: dict[str, DirectoryListing],
+    lines: list[str],
+    max_entries: Optional[int] = None,
+) -> None:
+    if directory not in listings:
+        return
+    entries = listings[directory].entries
+    if entries is None:
+        lines.append(f"{prefix}[Permission Denied]")
+        return
+
+    items: list[TreeEntry | str] = entries
+    if max_entries is not None and len(entries) > max_entries:
+        ranked = sorted(entries, key=lambda e: (_file_priority(e), e.name.lower()))
+        shown = {entry.path for entry in ranked[:max_entries]}
+        hidden = [entry for entry in entries if entry.path not in shown]
+        items = [entry for entry in entries if entry.path in shown]
+        items.extend(_summarize_hidden(hidden))
+
+    for index, entry in enumerate(items):
+        is_last = index == len(items) - 1
+
+        # Determine the tree characters
+        if is_last:
+            connector = "└── "
+            extension = "    "
+        else:
+            connector = "├── "
+            extension = "│   "
+
+        # Add the entry
+        if isinstance(entry, str):
+            lines.append(f"{prefix}{connector}{entry}")
+        elif entry.is_dir:
+            lines.append(f"{prefix}{connector}{entry.name}/")
+            # Directories beyond max_depth or already visited were not listed
+            if entry.path in listings:
+                _render_tree(
+                    entry.path, prefix + extension, listings, lines, max_entries
+                )
+        else:
+            lines.append(f"{prefix}{connector}{entry.name}")
 
 
 @tool("tree", parse_docstring=True)
@@ -89,15 +382,21 @@ def tree_tool(
     runtime: ToolRuntime,
     path: Optional[str] = None,
     max_depth: Optional[int] = 3,
+    max_entries_per_dir: Optional[int] = None,
+    max_chars: Optional[int] = None,
 ) -> str:
     """Display directory structure in a tree format, similar to the 'tree' command.
 
     Shows files and directories in a hierarchical tree structure.
-    Automatically excludes common ignore patterns (version control, dependencies, build artifacts, etc.).
+    Automatically excludes common ignore patterns (version control, dependencies, build artifacts, etc.)
+    and files ignored by the project's .gitignore files.
 
     Args:
         path: Directory path to display. Defaults to current working directory if not specified.
         max_depth: Maximum depth to traverse. The max_depth should be less than or equal to 3. Defaults to 3.
+        max_entries_per_dir: Show at most this many entries per directory and summarize the rest
+            (count, total size and most common extension). Useful for directories with many files.
+        max_chars: Character budget for the tree. Entries per directory are reduced until the tree fits.
 
     Returns:
         A tree-structured view of the directory as a string.
@@ -113,24 +412,15 @@ def tree_tool(
         if not search_path.is_dir():
             return f"Error: Path '{search_path}' is not a directory."
 
-        # Generate tree
-        lines = [str(search_path.resolve()) + "/"]
-        tree_lines = generate_tree(
-            search_path,
-            max_depth=max_depth,
-            ignore_patterns=DEFAULT_IGNORE_PATTERNS,
-        )
-        lines.extend(tree_lines)
-
-        # Count directories and files
-        dir_count = sum(1 for line in tree_lines if line.rstrip().endswith("/"))
-        file_count = len(tree_lines) - dir_count
-
-        # Add summary
-        lines.append("")
-        lines.append(f"{dir_count} directories, {file_count} files")
-
-        output = "\n".join(lines)
+        resolved_path = search_path.resolve()
+        key = _cache_key(resolved_path, max_depth, max_entries_per_dir, max_chars)
+        output = fs_cache.get(key) if key is not None else None
+        if output is None:
+            output = _tree_output(
+                resolved_path, max_depth, max_entries_per_dir, max_chars
+            )
+            if key is not None:
+                fs_cache.put(key, output, scope=str(resolved_path))
 
         # Format the result
         return f"Here's the result in {search_path}:\n\n```\n{output}\n```{generate_reminders(runtime)}"
@@ -139,5 +429,76 @@ def tree_tool(
         return f"Error: {str(e)}"
 
 
+async def _atree(
+    runtime: ToolRuntime,
+    path: Optional[str] = None,
+    max_depth: Optional[int] = 3,
+    max_entries_per_dir: Optional[int] = None,
+    max_chars: Optional[int] = None,
+) -> str:
+    """Async variant of tree_tool that walks the directory off the event loop."""
+    return await asyncio.to_thread(
+        tree_tool.func, runtime, path, max_depth, max_entries_per_dir, max_chars
+    )
+
+
+tree_tool.coroutine = _atree
+tag_side_effect(tree_tool, SideEffect.read_only)
+
+
+def _cache_key(
+    resolved_path: Path,
+    max_depth: Optional[int],
+    max_entries_per_dir: Optional[int],
+    max_chars: Optional[int],
+) -> Optional[tuple]:
+    """
+    Return the cache key of a tree, or None if it can't be cached.
+
+    The mtime of the root only reflects changes to its own entries, so a tree
+    is only kept while the project watcher reports the changes made anywhere
+    below it.
+    """
+    watcher = get_project_watcher()
+    if watcher is None or not watcher.covers(resolved_path):
+        return None
+    return ("tree", str(resolved_path), max_depth, max_entries_per_dir, max_chars)
+
+
+def _tree_output(
+    resolved_path: Path,
+    max_depth: Optional[int],
+    max_entries_per_dir: Optional[int],
+    max_chars: Optional[int],
+) -> str:
+    """Generate the tree text with its summary line."""
+    # Generate tree
+    lines = [str(resolved_path) + "/"]
+    budgeted = max_entries_per_dir is not None or max_chars is not None
+    listings = walk_tree(
+        resolved_path,
+        max_depth,
+        get_ignore_matcher().with_gitignores(resolved_path, project.root_dir),
+        collect_sizes=budgeted,
+    )
+    lines.extend(
+        render_tree(
+            resolved_path,
+            listings,
+            max_entries_per_dir=max_entries_per_dir,
+            max_chars=max_chars,
+        )
+    )
+
+    # Count directories and files
+    dir_count, file_count = count_entries(listings)
+
+    # Add summary
+    lines.append("")
+    lines.append(f"{dir_count} directories, {file_count} files")
+
+    return "\n".join(lines)
+
+
 if __name__ == "__main__":
     print(tree_tool.invoke({"path": "/Users/henry/Desktop/next-js-demo"}))
@@ -5,6 +5,7 @@ import httpx
 from langchain.tools import ToolRuntime, tool
 
 from deer_code.config import get_config_section
+from deer_code.tools.side_effects import SideEffect, tag_side_effect
 
 
 @tool("perplexity_search", parse_docstring=True)
@@ -113,3 +114,6 @@ def perplexity_search_tool(
         return f"Error performing Perplexity search: Unexpected response format - missing {str(e)}"
     except Exception as e:
         return f"Error performing Perplexity search: {str(e)}"
+
+
+tag_side_effect(perplexity_search_tool, SideEffect.read_only)
@@ -5,6 +5,7 @@ from langchain.tools import ToolRuntime, tool
 from tavily import TavilyClient
 
 from deer_code.config import get_config_section
+from deer_code.tools.side_effects import SideEffect, tag_side_effect
 
 
 @tool("tavily_search", parse_docstring=True)
@@ -78,3 +79,6 @@ def tavily_search_tool(
 
     except Exception as e:
         return f"Error performing Tavily search: {str(e)}"
+
+
+tag_side_effect(tavily_search_tool, SideEffect.read_only)
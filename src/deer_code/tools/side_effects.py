@@ -0,0 +1,64 @@
+"""
+Side-effect classification of tools.
+
+Every built-in tool is tagged as either read-only or mutating so the agent can
+run independent read-only calls concurrently while keeping calls that change
+the project (or the shell session) in their original order. Tools that carry
+no tag, such as MCP tools, are treated as mutating.
+"""
+
+from enum import Enum
+from typing import Any, Iterable, Optional
+
+from langchain_core.tools import BaseTool
+
+SIDE_EFFECT_KEY = "side_effect"
+READ_ONLY_COMMANDS_KEY = "read_only_commands"
+
+
+class SideEffect(str, Enum):
+    read_only = "read_only"
+    mutating = "mutating"
+
+
+def tag_side_effect(
+    tool: BaseTool,
+    side_effect: SideEffect,
+    read_only_commands: Optional[Iterable[str]] = None,
+) -> BaseTool:
+    """
+    Tag a tool with its side-effect class.
+
+    Args:
+        tool: The tool to tag.
+        side_effect: The side-effect class of the tool.
+        read_only_commands: For multi-command tools, the values of the `command`
+            argument that are read-only even though the tool is mutating.
+
+    Returns:
+        The tagged tool.
+    """
+    metadata = dict(tool.metadata or {})
+    metadata[SIDE_EFFECT_KEY] = side_effect.value
+    if read_only_commands is not None:
+        metadata[READ_ONLY_COMMANDS_KEY] = frozenset(read_only_commands)
+    tool.metadata = metadata
+    return tool
+
+
+def is_read_only(tool: Optional[BaseTool], args: Optional[dict[str, Any]] = None) -> bool:
+    """
+    Check whether a call to a tool has no side effects.
+
+    Args:
+        tool: The tool being called, or None if it is unknown.
+        args: The arguments of the call.
+
+    Returns:
+        True if the call is read-only, False if it may mutate state.
+    """
+    metadata = (tool.metadata or {}) if tool is not None else {}
+    if metadata.get(SIDE_EFFECT_KEY) == SideEffect.read_only.value:
+        return True
+    command = (args or {}).get("command")
+    return command in metadata.get(READ_ONLY_COMMANDS_KEY, ())
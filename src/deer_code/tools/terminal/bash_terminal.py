@@ -1,15 +1,59 @@
 import os
 import re
+import secrets
+import shlex
+import time
+from typing import Callable, NamedTuple, Optional
 
 import pexpect
 
 from .command_validator import CommandValidator, CommandValidationError
+from .output_capture import MAX_OUTPUT_CHARS, OutputCapture
+
+# Seconds a command may run before execute gives up waiting for it
+COMMAND_TIMEOUT = 30
+
+# Seconds reset waits for the shell before starting a new one
+RESET_TIMEOUT = 5
+
+# Seconds between two checks of the deadline while a command prints nothing
+OUTPUT_POLL_INTERVAL = 0.1
+
+# Number of characters read from the shell at once
+READ_SIZE = 65536
+
+# Terminal control sequences, and a trailing one that is not complete yet
+_CONTROL_SEQUENCE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+_INCOMPLETE_CONTROL_SEQUENCE = re.compile(r"\x1b(?:\[[0-9;?]*)?$")
+
+# Ends the cwd in the sentinel printed before each prompt
+_SENTINEL_END = "\x1e"
+
+# Exit status of reset when the saved environment is missing
+_MISSING_ENV_STATUS = 97
+
+
+class CommandResult(NamedTuple):
+    """The result of a command run in a BashTerminal."""
+
+    output: str
+    exit_code: int
+    # The working directory of the shell after the command
+    cwd: str
+    duration_ms: int
 
 
 class BashTerminal:
     """A keep-alive terminal for executing bash commands with security controls."""
 
-    def __init__(self, cwd=None, validator=None):
+    def __init__(
+        self,
+        cwd=None,
+        validator=None,
+        max_output_chars: int = MAX_OUTPUT_CHARS,
+        spill_dir: Optional[str] = None,
+        load_rc: bool = True,
+    ):
         """
         Initialize BashTerminal
 
@@ -17,74 +61,231 @@ class BashTerminal:
             cwd: Initial working directory, defaults to current directory
             validator: CommandValidator instance for security validation.
                       If None, creates a default validator with standard security settings.
+            max_output_chars: Number of characters of output returned per command.
+                      Longer output keeps its start and end, and is saved in full to a file.
+            spill_dir: Directory of the files holding long output. If None, uses the
+                      system temp directory.
+            load_rc: Whether bash runs the user's rc files. Skipping them starts
+                      the terminal faster, without the user's aliases and functions.
         """
         self.cwd = cwd or os.getcwd()
         self.validator = validator or CommandValidator(
             allow_pipes=True, allow_redirects=True
         )
-
-        # Start bash shell
-        self.shell = pexpect.spawn("/bin/bash", encoding="utf-8", echo=False)
-
-        # Set custom prompt for easy command completion detection
-        self.prompt = "BASH_TERMINAL_PROMPT> "
-        self.shell.sendline(f'PS1="{self.prompt}"')
-        self.shell.expect(self.prompt, timeout=5)
+        self.max_output_chars = max_output_chars
+        self.spill_dir = spill_dir
+        self.load_rc = load_rc
+        self._start()
 
         # Change to specified directory
         if cwd:
             self.execute(f'cd "{self.cwd}"')
 
-    def execute(self, command):
+    def _start(self):
+        """Start the bash shell and install the prompt sentinel"""
+        # Start bash shell. Without readline, bash neither echoes the commands
+        # nor decorates the prompt with control sequences.
+        args = ["--noediting"] if self.load_rc else ["--noediting", "--noprofile", "--norc"]
+        self.shell = pexpect.spawn("/bin/bash", args, encoding="utf-8", echo=False)
+
+        # Before each prompt, bash prints a sentinel holding the exit status of
+        # the last command, a sequence number and the working directory, so a
+        # command's completion and its results are read in one pass. The initial
+        # environment is saved for reset, read-only so commands can't change it.
+        self.prompt = "BASH_TERMINAL_PROMPT> "
+        self._marker = f"__DEER_CODE_{secrets.token_hex(8)}__"
+        self._sentinel = re.compile(
+            re.escape(self._marker)
+            + rf":(\d+):(\d+):([^{_SENTINEL_END}]*){_SENTINEL_END}"
+            + re.escape(self.prompt)
+        )
+        # Sequence number of the prompt that ends the last command sent
+        self._sequence = 1
+        self._cwd = self.cwd
+        self.shell.sendline(
+            f'unset PROMPT_COMMAND; declare -r __deer_code_env="$(declare -px)"; PS1="{self.prompt}"; PS2=""; '
+            f"PROMPT_COMMAND='printf \"{self._marker}:%d:%d:%s\\036\" "
+            f'"$?" "$((__deer_code_prompts+=1))" "$PWD"\''
+        )
+        self._read_until_prompt(None, timeout=5)
+
+    def execute(self, command, on_output: Optional[Callable[[str], None]] = None):
         """
         Execute bash command and return output
 
         Args:
             command: Command to execute
+            on_output: Optional callback receiving the output in chunks while the
+                      command runs, cleaned of terminal control characters.
 
         Returns:
-            Command output result (string)
+            Command output result (string). Output longer than max_output_chars
+            keeps its start and end around a note with the total byte and line
+            counts and the path of the file holding all of it.
 
         Raises:
             CommandValidationError: If command fails security validation
         """
+        return self.run(command, on_output).output
+
+    def run(
+        self, command: str, on_output: Optional[Callable[[str], None]] = None
+    ) -> CommandResult:
+        """
+        Execute bash command and return its output, exit code and working directory
+
+        Args:
+            command: Command to execute
+            on_output: Optional callback receiving the output in chunks while the
+                      command runs, cleaned of terminal control characters.
+
+        Returns:
+            CommandResult of the command, whose output is shortened like the
+            result of execute.
+
+        Raises:
+            CommandValidationError: If command fails security validation
+            pexpect.TIMEOUT: If the command does not finish within COMMAND_TIMEOUT seconds
+        """
         # Validate command for security before execution
         self.validator.validate(command)
+        return self._run_unchecked(command, on_output)
+
+    def reset(self, cwd: Optional[str] = None) -> None:
+        """
+        Restore the environment variables the shell started with and change the
+        working directory, without starting a new shell
+
+        If the saved environment is gone, or the shell doesn't answer within
+        RESET_TIMEOUT seconds, e.g. because a command is still running or the
+        shell was replaced with `exec`, a new shell is started instead.
+
+        Args:
+            cwd: The new working directory, defaults to the initial working directory
+        """
+        cd = f"cd -- {shlex.quote(cwd or self.cwd)}"
+        if self.shell.isalive():
+            try:
+                result = self._run_unchecked(
+                    'if [ -n "${__deer_code_env+set}" ]; then '
+                    "for __deer_code_name in $(compgen -e); do unset -v $__deer_code_name; done 2>/dev/null; "
+                    f'eval "$__deer_code_env" 2>/dev/null; {cd}; '
+                    f"else (exit {_MISSING_ENV_STATUS}); fi",
+                    timeout=RESET_TIMEOUT,
+                )
+                if result.exit_code != _MISSING_ENV_STATUS:
+                    return
+            except pexpect.TIMEOUT:
+                pass
+        self.close()
+        self._start()
+        self._run_unchecked(cd)
 
-        # Send command
+    def _run_unchecked(
+        self,
+        command: str,
+        on_output: Optional[Callable[[str], None]] = None,
+        timeout: Optional[float] = None,
+    ) -> CommandResult:
+        """Run a command without validating it."""
+        started = time.monotonic()
         self.shell.sendline(command)
+        self._sequence += 1
 
-        # Wait for prompt to appear, indicating command completion
-        self.shell.expect(self.prompt, timeout=30)
+        # Wait for the sentinel of the command's prompt
+        exit_code, capture = self._read_until_prompt(on_output, timeout)
+        duration_ms = round((time.monotonic() - started) * 1000)
 
-        # Get output, removing command itself and prompt
-        output = self.shell.before
+        if not capture.truncated:
+            output = _clean_output(capture.text)
+        else:
+            output = (
+                f"{_clean_output(capture.head)}\n\n"
+                f"{capture.summary()}\n\n"
+                f"{_clean_output(capture.tail)}"
+            )
+        return CommandResult(output, exit_code, self._cwd, duration_ms)
 
-        # Clean output: remove command echo
-        lines = output.split("\n")
-        if lines and lines[0].strip() == command.strip():
-            lines = lines[1:]
+    def _read_until_prompt(
+        self,
+        on_output: Optional[Callable[[str], None]],
+        timeout: Optional[float] = None,
+    ) -> tuple[int, OutputCapture]:
+        """
+        Read the output as it arrives until the sentinel of the last command's
+        prompt appears, keeping only unhandled output in memory.
+
+        Output ended by the sentinel of an earlier prompt, left over from a
+        command that timed out, is dropped.
+
+        Returns:
+            The exit code of the command, and the closed capture holding its output.
+        """
+        if timeout is None:
+            timeout = COMMAND_TIMEOUT
+        deadline = time.monotonic() + timeout
+        capture = OutputCapture(self.max_output_chars, self.spill_dir)
+        # Output read past the last sentinel, normally empty
+        pending = self.shell.buffer
+        self.shell.buffer = ""
+        while True:
+            sentinel = self._sentinel.search(pending)
+            if sentinel:
+                end = sentinel.start()
+            else:
+                # Hold back what may still become the sentinel or a control sequence
+                marker_start = pending.find(self._marker)
+                if marker_start != -1:
+                    end = marker_start
+                else:
+                    end = len(pending) - _pending_length(pending, self._marker)
+            chunk = strip_control_sequences(pending[:end])
+            if chunk:
+                capture.write(chunk)
+                if on_output is not None:
+                    on_output(chunk)
+
+            if sentinel:
+                pending = pending[sentinel.end() :]
+                exit_code, sequence, cwd = sentinel.groups()
+                self._cwd = cwd
+                if int(sequence) >= self._sequence:
+                    self.shell.buffer = pending
+                    capture.close()
+                    return int(exit_code), capture
+                # The output so far belongs to an earlier command
+                capture.close()
+                capture = OutputCapture(self.max_output_chars, self.spill_dir)
+                continue
+            pending = pending[end:]
 
-        result = "\n".join([line.strip() for line in lines]).strip()
-        # Remove terminal control characters
-        result = re.sub(r"\x1b\[[0-9;]*m", "", result)
-        return result
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                capture.close()
+                raise pexpect.TIMEOUT(
+                    f"Timeout exceeded: the command did not finish within {timeout:g} seconds"
+                )
+            try:
+                pending += self.shell.read_nonblocking(
+                    READ_SIZE, timeout=min(OUTPUT_POLL_INTERVAL, remaining)
+                )
+            except pexpect.TIMEOUT:
+                pass
 
     def getcwd(self):
         """
         Get current working directory
 
         Returns:
-            Absolute path of current working directory
+            Absolute path of current working directory, as of the end of the last command
         """
-        result = self.execute("pwd")
-        return result.strip()
+        return self._cwd
 
     def close(self):
         """Close shell session"""
         if self.shell.isalive():
             self.shell.sendline("exit")
-            self.shell.close()
+        self.shell.close()
 
     def __del__(self):
         """Destructor, ensure shell is closed"""
@@ -97,3 +298,24 @@ class BashTerminal:
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Support with statement"""
         self.close()
+
+
+def _clean_output(output: str) -> str:
+    """Strip the lines of the output."""
+    return "\n".join([line.strip() for line in output.split("\n")]).strip()
+
+
+def strip_control_sequences(text: str) -> str:
+    """Remove terminal control sequences and carriage returns from output."""
+    return _CONTROL_SEQUENCE.sub("", text).replace("\r", "")
+
+
+def _pending_length(output: str, marker: str) -> int:
+    """Return the length of the end of the output that may still become a marker or control sequence."""
+    incomplete = _INCOMPLETE_CONTROL_SEQUENCE.search(output)
+    if incomplete:
+        return len(output) - incomplete.start()
+    for length in range(min(len(marker) - 1, len(output)), 0, -1):
+        if output.endswith(marker[:length]):
+            return length
+    return 0
@@ -0,0 +1,224 @@
+"""
+Background jobs for long-running bash commands.
+
+Each job runs `/bin/bash -c <command>` in its own pty, so dev servers, watch
+builds and long test suites neither block the agent nor hit the timeout of the
+keep-alive terminal. A reader thread drains the pty as output arrives, which
+keeps the job from stalling on a full pty buffer even if nobody polls it. Only
+the last MAX_JOB_OUTPUT_CHARS characters are kept; callers read the output
+incrementally from where they stopped.
+"""
+
+import atexit
+import itertools
+import os
+import signal
+import threading
+import time
+from typing import Optional
+
+import pexpect
+
+from .bash_terminal import strip_control_sequences
+from .command_validator import CommandValidator
+
+# Number of characters of output kept per job
+MAX_JOB_OUTPUT_CHARS = 1_000_000
+
+# Number of jobs that may exist at the same time, running or finished
+MAX_JOBS = 16
+
+# Seconds a job is given to exit after SIGTERM before it is killed
+KILL_GRACE_PERIOD = 2.0
+
+_READ_SIZE = 65536
+
+
+class Job:
+    """A bash command running in the background."""
+
+    def __init__(self, job_id: str, command: str, cwd: str):
+        """
+        Start a job.
+
+        Args:
+            job_id: The id of the job.
+            command: The command to run with `bash -c`.
+            cwd: The working directory of the command.
+        """
+        self.id = job_id
+        self.command = command
+        self.cwd = cwd
+        self.started_at = time.monotonic()
+        self.ended_at: Optional[float] = None
+        self.exit_code: Optional[int] = None
+        self.killed = False
+
+        self._output = ""
+        # Characters dropped from the start of the output, and read by the caller
+        self._dropped = 0
+        self._read_position = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+        self._process = pexpect.spawn(
+            "/bin/bash", ["-c", command], cwd=cwd, encoding="utf-8", echo=False
+        )
+        self._reader = threading.Thread(
+            target=self._read, name=f"deer-code-{job_id}", daemon=True
+        )
+        self._reader.start()
+
+    @property
+    def is_running(self) -> bool:
+        return not self._done.is_set()
+
+    @property
+    def status(self) -> str:
+        """Describe the state of the job, e.g. `running for 12s`."""
+        if self.is_running:
+            return f"running for {time.monotonic() - self.started_at:.0f}s"
+        duration = f"after {self.ended_at - self.started_at:.0f}s"
+        if self.killed:
+            return f"killed {duration}"
+        return f"exited with code {self.exit_code} {duration}"
+
+    def read_output(self) -> str:
+        """Return the output written since the last call, or since the job started."""
+        with self._lock:
+            end = self._dropped + len(self._output)
+            skipped = max(self._dropped - self._read_position, 0)
+            start = max(self._read_position, self._dropped)
+            output = self._output[start - self._dropped :]
+            self._read_position = end
+        if skipped:
+            output = f"[{skipped} characters of output were dropped]\n{output}"
+        return output
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the job to end.
+
+        Args:
+            timeout: Seconds to wait at most. None waits until the job ends.
+
+        Returns:
+            True if the job has ended.
+        """
+        return self._done.wait(timeout)
+
+    def kill(self) -> None:
+        """Stop the job and every process it started."""
+        if not self.is_running:
+            return
+        self.killed = True
+        self._signal(signal.SIGTERM)
+        if not self.wait(KILL_GRACE_PERIOD):
+            self._signal(signal.SIGKILL)
+            self.wait(KILL_GRACE_PERIOD)
+
+    def _signal(self, signum: int) -> None:
+        try:
+            # The job leads its own session, so its children share its process group
+            os.killpg(self._process.pid, signum)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def _read(self) -> None:
+        while True:
+            try:
+                chunk = self._process.read_nonblocking(_READ_SIZE, timeout=None)
+            except (pexpect.EOF, OSError, ValueError):
+                break
+            chunk = strip_control_sequences(chunk)
+            with self._lock:
+                self._output += chunk
+                excess = len(self._output) - MAX_JOB_OUTPUT_CHARS
+                if excess > 0:
+                    self._output = self._output[excess:]
+                    self._dropped += excess
+
+        self._process.close()
+        if self._process.signalstatus is not None:
+            self.exit_code = -self._process.signalstatus
+        else:
+            self.exit_code = self._process.exitstatus
+        self.ended_at = time.monotonic()
+        self._done.set()
+
+
+class JobManager:
+    """Starts background jobs and keeps track of them by id."""
+
+    def __init__(self, validator: Optional[CommandValidator] = None, max_jobs: int = MAX_JOBS):
+        """
+        Initialize JobManager.
+
+        Args:
+            validator: CommandValidator instance for security validation.
+                      If None, creates a default validator with standard security settings.
+            max_jobs: Number of jobs kept at the same time. The oldest finished
+                      jobs are forgotten to make room for new ones.
+        """
+        self.validator = validator or CommandValidator(
+            allow_pipes=True, allow_redirects=True
+        )
+        self.max_jobs = max_jobs
+        self._jobs: dict[str, Job] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self, command: str, cwd: str) -> Job:
+        """
+        Start a command in the background.
+
+        Args:
+            command: The command to run.
+            cwd: The working directory of the command.
+
+        Returns:
+            The started job.
+
+        Raises:
+            CommandValidationError: If command fails security validation.
+            ValueError: If max_jobs jobs are still running.
+        """
+        self.validator.validate(command)
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if not job.is_running]
+            while len(self._jobs) >= self.max_jobs and finished:
+                del self._jobs[finished.pop(0)]
+            if len(self._jobs) >= self.max_jobs:
+                raise ValueError(
+                    f"{self.max_jobs} jobs are already running. Kill one before starting another."
+                )
+            job = Job(f"job-{next(self._ids)}", command, cwd)
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """
+        Return a job by id.
+
+        Raises:
+            ValueError: If no job has that id.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"No job with id {job_id}")
+        return job
+
+    def list(self) -> list[Job]:
+        """Return every job, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def close(self) -> None:
+        """Kill every running job."""
+        for job in self.list():
+            job.kill()
+
+
+job_manager = JobManager()
+atexit.register(job_manager.close)
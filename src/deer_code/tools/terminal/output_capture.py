@@ -0,0 +1,116 @@
+"""
+Bounded capture of the output of a command.
+
+Output is kept whole in memory until it exceeds the limit. From then on only
+its first and last halves are kept, and the whole stream is written to a temp
+file instead, so a `cat` of a huge log neither exhausts memory nor floods the
+model's context. The returned result names the file and reports the total
+size of the output.
+"""
+
+import os
+import tempfile
+from typing import Optional
+
+# Number of characters of output returned by a command, split between its start and end
+MAX_OUTPUT_CHARS = 32_000
+
+
+class OutputCapture:
+    """Keeps the start and end of an output stream, spilling all of it to a file once it is too long."""
+
+    def __init__(self, max_chars: int = MAX_OUTPUT_CHARS, spill_dir: Optional[str] = None):
+        """
+        Initialize OutputCapture.
+
+        Args:
+            max_chars: Number of characters kept in memory, half from the start
+                      and half from the end of the output.
+            spill_dir: Directory of the file the whole output is written to once
+                      it exceeds max_chars. If None, uses the system temp directory.
+        """
+        self.head_chars = max_chars // 2
+        self.tail_chars = max_chars - self.head_chars
+        self.spill_dir = spill_dir
+        self.spill_path: Optional[str] = None
+        self.total_bytes = 0
+        self.total_lines = 0
+
+        self._chunks: list[str] = []
+        self._length = 0
+        self._head = ""
+        self._tail = ""
+        self._file = None
+
+    @property
+    def truncated(self) -> bool:
+        return self.spill_path is not None
+
+    def write(self, text: str) -> None:
+        """Add output to the capture."""
+        self.total_bytes += len(text.encode(errors="surrogateescape"))
+        self.total_lines += text.count("\n")
+
+        if self._file is not None:
+            self._file.write(text)
+            self._tail = (self._tail + text)[-self.tail_chars :]
+            return
+
+        self._chunks.append(text)
+        self._length += len(text)
+        if self._length > self.head_chars + self.tail_chars:
+            self._spill()
+
+    @property
+    def text(self) -> str:
+        """Return the whole output. Only available while the output is not truncated."""
+        if self.truncated:
+            raise ValueError("The output was truncated, read it from spill_path")
+        return "".join(self._chunks)
+
+    @property
+    def head(self) -> str:
+        """Return the start of a truncated output, cut after its last complete line."""
+        cut = self._head.rfind("\n")
+        return self._head[: cut + 1] if cut != -1 else self._head
+
+    @property
+    def tail(self) -> str:
+        """Return the end of a truncated output, starting at its first complete line."""
+        cut = self._tail.find("\n")
+        return self._tail[cut + 1 :] if cut != -1 and cut + 1 < len(self._tail) else self._tail
+
+    def summary(self) -> str:
+        """Describe what was left out of a truncated output and where to find it."""
+        omitted_lines = self.total_lines - self.head.count("\n") - self.tail.count("\n")
+        return (
+            f"[{omitted_lines} lines omitted. The command wrote {self.total_bytes} bytes "
+            f"in {self.total_lines} lines, saved in full to {self.spill_path}. "
+            "Use `grep` or `sed -n` with the bash tool to read the rest.]"
+        )
+
+    def close(self) -> None:
+        """Close the spill file. The file itself is kept."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _spill(self) -> None:
+        text = "".join(self._chunks)
+        self._chunks = []
+        self._head = text[: self.head_chars]
+        self._tail = text[-self.tail_chars :]
+
+        if self.spill_dir is not None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+        fd, self.spill_path = tempfile.mkstemp(
+            dir=self.spill_dir, prefix="output-", suffix=".log"
+        )
+        self._file = os.fdopen(fd, "w", encoding="utf-8", errors="surrogateescape")
+        self._file.write(text)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,166 @@
+"""
+A pool of pre-started bash terminals.
+
+Starting bash and running the user's rc files can take seconds, so the pool
+starts spare terminals in the background and hands them out when a
+conversation runs its first command. Each conversation keeps its own terminal,
+with its working directory and environment, until it has been idle for
+idle_timeout seconds.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from .bash_terminal import BashTerminal
+
+# Number of spare terminals kept started
+POOL_SIZE = 1
+
+# Seconds a terminal may stay unused before it is closed
+IDLE_TIMEOUT = 1800
+
+
+class _Session:
+    """A terminal handed out to a conversation."""
+
+    def __init__(self, terminal: BashTerminal):
+        self.terminal = terminal
+        # Serializes the commands of the conversation
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        # Whether the terminal has yet to be moved to the conversation's cwd
+        self.fresh = True
+
+
+class TerminalPool:
+    """Hands out a keep-alive terminal per conversation, starting spare terminals in the background."""
+
+    def __init__(
+        self,
+        factory: Callable[[], BashTerminal],
+        size: int = POOL_SIZE,
+        idle_timeout: Optional[float] = IDLE_TIMEOUT,
+    ):
+        """
+        Initialize TerminalPool.
+
+        Args:
+            factory: Starts a terminal.
+            size: Number of spare terminals kept started, ready to be handed out.
+            idle_timeout: Seconds a terminal may stay unused before it is closed.
+                      If None, terminals are kept until the pool is closed.
+        """
+        self.factory = factory
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._spares: list[BashTerminal] = []
+        self._sessions: dict[str, _Session] = {}
+        self._starting = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def spare_count(self) -> int:
+        """Number of spare terminals ready to be handed out."""
+        with self._lock:
+            return len(self._spares)
+
+    def warm(self) -> None:
+        """Start terminals in the background until `size` spares are ready or starting."""
+        with self._lock:
+            if self._closed:
+                return
+            missing = max(self.size - len(self._spares) - self._starting, 0)
+            self._starting += missing
+        for _ in range(missing):
+            threading.Thread(
+                target=self._start_spare, name="deer-code-terminal", daemon=True
+            ).start()
+
+    @contextmanager
+    def session(self, key: str, cwd: str) -> Iterator[BashTerminal]:
+        """
+        Hold the terminal of a conversation while running commands in it.
+
+        The first time a conversation asks for a terminal, it gets a spare one,
+        moved to cwd, or a new one if no spare is ready. A terminal whose shell
+        has exited is replaced.
+
+        Args:
+            key: The id of the conversation, e.g. its thread id.
+            cwd: The working directory of a terminal handed out for the first time.
+
+        Yields:
+            The terminal, held by the caller until the block ends.
+        """
+        session = self._session(key)
+        with session.lock:
+            try:
+                if session.fresh:
+                    if session.terminal.getcwd() != cwd:
+                        session.terminal.reset(cwd)
+                    session.fresh = False
+                yield session.terminal
+            finally:
+                session.last_used = time.monotonic()
+        self._evict_idle()
+        self.warm()
+
+    def close(self) -> None:
+        """Close every terminal, spare or handed out."""
+        with self._lock:
+            self._closed = True
+            terminals = self._spares + [session.terminal for session in self._sessions.values()]
+            self._spares = []
+            self._sessions = {}
+        for terminal in terminals:
+            terminal.close()
+
+    def _session(self, key: str) -> _Session:
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None and session.terminal.shell.isalive():
+                session.last_used = time.monotonic()
+                return session
+            terminal = self._spares.pop(0) if self._spares else None
+
+        if terminal is None:
+            terminal = self.factory()
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None and session.terminal.shell.isalive():
+                # Another command of the conversation got a terminal first
+                self._spares.append(terminal)
+            else:
+                session = self._sessions[key] = _Session(terminal)
+            return session
+
+    def _start_spare(self) -> None:
+        try:
+            terminal = self.factory()
+        except Exception:
+            # The error surfaces when a terminal is started on demand instead
+            terminal = None
+        with self._lock:
+            self._starting -= 1
+            if terminal is not None and not self._closed:
+                self._spares.append(terminal)
+                return
+        if terminal is not None:
+            terminal.close()
+
+    def _evict_idle(self) -> None:
+        if self.idle_timeout is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                key
+                for key, session in self._sessions.items()
+                if now - session.last_used > self.idle_timeout and not session.lock.locked()
+            ]
+            evicted = [self._sessions.pop(key) for key in idle]
+        for session in evicted:
+            session.terminal.close()
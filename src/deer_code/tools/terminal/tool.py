@@ -1,18 +1,51 @@
+import asyncio
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
 from typing import Optional
 
 from langchain.tools import ToolRuntime, tool
 
 from deer_code.project import project
+from deer_code.tools.fs.cache import fs_cache
+from deer_code.tools.fs.index import mark_indexes_stale
 from deer_code.tools.reminders import generate_reminders
+from deer_code.tools.side_effects import SideEffect, tag_side_effect
+from deer_code.watcher import get_project_watcher
 
 from .bash_terminal import BashTerminal
+from .jobs import job_manager
+from .output_capture import MAX_OUTPUT_CHARS
+from .pool import IDLE_TIMEOUT, POOL_SIZE, TerminalPool
 
-keep_alive_terminal: BashTerminal | None = None
+# Key of the output chunks written to the "custom" stream while a command runs
+BASH_OUTPUT_KEY = "bash_output"
+
+# Long output of this session's commands, removed at exit
+_OUTPUT_DIR = Path(tempfile.gettempdir()) / f"deer-code-output-{os.getpid()}"
+atexit.register(shutil.rmtree, _OUTPUT_DIR, ignore_errors=True)
+
+# Seconds the bash_job tool waits for a job at most
+MAX_JOB_WAIT = 600
+
+# Key of the terminal of commands run outside a conversation thread
+DEFAULT_SESSION = "default"
+
+_terminal_pool: TerminalPool | None = None
+_terminal_pool_lock = threading.Lock()
 
 
 @tool("bash", parse_docstring=True)
-def bash_tool(runtime: ToolRuntime, command: str, reset_cwd: Optional[bool] = False):
-    """Execute a standard bash command in a keep-alive shell, and return the output if successful or error message if failed.
+def bash_tool(
+    runtime: ToolRuntime,
+    command: str,
+    reset_cwd: Optional[bool] = False,
+    background: Optional[bool] = False,
+):
+    """Execute a standard bash command in a keep-alive shell, and return its output, exit code and working directory afterwards.
 
     Use this tool to perform:
     - Create directories
@@ -25,16 +58,167 @@ def bash_tool(runtime: ToolRuntime, command: str, reset_cwd: Optional[bool] = Fa
 
     - Use `ls`, `grep` and `tree` tools for file system operations instead of this tool.
     - Use `text_editor` tool with `create` command to create new files.
+    - Commands time out after 30 seconds. Run dev servers, watch builds and long test suites with `background`, then use the `bash_job` tool to read their output, wait for them or kill them.
 
     Args:
         command: The command to execute.
-        reset_cwd: Whether to reset the current working directory to the project root directory.
+        reset_cwd: Whether to reset the current working directory to the project root directory, and the environment variables to their initial values.
+        background: Whether to start the command as a background job in its own shell and return its job id immediately. The job starts in the current working directory but does not see variables set in the keep-alive shell.
+    """
+    with get_terminal_pool().session(_session_key(runtime), project.root_dir) as terminal:
+        if reset_cwd:
+            terminal.reset(project.root_dir)
+        reminders = generate_reminders(runtime)
+        if background:
+            job = job_manager.start(command, terminal.getcwd())
+            return (
+                f"Started {job.id} in the background: `{command}`. "
+                f"Use the `bash_job` tool to read its output, wait for it or kill it.{reminders}"
+            )
+        try:
+            result = terminal.run(command, on_output=_output_streamer(runtime))
+        finally:
+            _invalidate_fs_cache()
+    return (
+        f"```\n{result.output}\n```\n"
+        f"[exit code {result.exit_code}, cwd {result.cwd}, {result.duration_ms} ms]{reminders}"
+    )
+
+
+def get_terminal_pool() -> TerminalPool:
+    """Return the pool of bash terminals, created with the settings from the config."""
+    global _terminal_pool
+    with _terminal_pool_lock:
+        if _terminal_pool is None:
+            settings = _bash_settings()
+            _terminal_pool = TerminalPool(
+                _new_terminal,
+                size=settings.get("pool_size", POOL_SIZE),
+                idle_timeout=settings.get("idle_timeout", IDLE_TIMEOUT),
+            )
+            atexit.register(_terminal_pool.close)
+        return _terminal_pool
+
+
+def _bash_settings() -> dict:
+    # Imported lazily so the terminal doesn't require `config.yaml` at import time
+    from deer_code.config import get_config_section
+
+    return get_config_section(["tools", "bash"]) or {}
+
+
+def _new_terminal() -> BashTerminal:
+    """Start a terminal in the project root, with the settings from the config."""
+    settings = _bash_settings()
+    return BashTerminal(
+        project.root_dir,
+        max_output_chars=settings.get("max_output_chars", MAX_OUTPUT_CHARS),
+        spill_dir=str(_OUTPUT_DIR),
+        load_rc=settings.get("load_rc", True),
+    )
+
+
+def _session_key(runtime: ToolRuntime) -> str:
+    """Return the thread id of the conversation the tool is called in."""
+    config = getattr(runtime, "config", None)
+    configurable = config.get("configurable") if isinstance(config, dict) else None
+    thread_id = configurable.get("thread_id") if isinstance(configurable, dict) else None
+    return str(thread_id) if thread_id is not None else DEFAULT_SESSION
+
+
+def _output_streamer(runtime: ToolRuntime):
+    """Return a callback that streams output chunks to the agent's custom stream."""
+    stream_writer = getattr(runtime, "stream_writer", None)
+    if stream_writer is None:
+        return None
+
+    def stream(chunk: str):
+        stream_writer({BASH_OUTPUT_KEY: chunk, "tool_call_id": runtime.tool_call_id})
+
+    return stream
+
+
+def _invalidate_fs_cache():
+    """Drop the cached fs results the command may have outdated."""
+    watcher = get_project_watcher()
+    if watcher is not None and watcher.flush():
+        # Changes inside the project were published to the cache by the watcher
+        fs_cache.invalidate_outside(watcher.root)
+    else:
+        # Any command may have changed files, so cached fs results and the
+        # grep index are outdated
+        fs_cache.invalidate()
+        mark_indexes_stale()
+
+
+async def _abash(
+    runtime: ToolRuntime,
+    command: str,
+    reset_cwd: Optional[bool] = False,
+    background: Optional[bool] = False,
+):
+    """Async variant of bash_tool that waits for the command off the event loop."""
+    return await asyncio.to_thread(bash_tool.func, runtime, command, reset_cwd, background)
+
+
+bash_tool.coroutine = _abash
+tag_side_effect(bash_tool, SideEffect.mutating)
+
+
+@tool("bash_job", parse_docstring=True)
+def bash_job_tool(
+    runtime: ToolRuntime,
+    command: str,
+    job_id: Optional[str] = None,
+    timeout: Optional[int] = None,
+):
+    """Manage the background jobs started by the `bash` tool with `background`.
+
+    - `output` returns the output written since it was last read, without waiting.
+    - `wait` waits for the job to end, then returns its new output. Prefer it to polling `output`.
+    - `kill` stops the job and every process it started.
+    - `list` shows every job and its status.
+
+    Args:
+        command: One of "output", "wait", "kill", "list".
+        job_id: The id of the job, e.g. "job-1". Required for all commands but "list".
+        timeout: Only applies for the "wait" command. Seconds to wait at most, 30 by default and 600 at most.
     """
-    global keep_alive_terminal
-    if keep_alive_terminal is None:
-        keep_alive_terminal = BashTerminal(project.root_dir)
-    elif reset_cwd:
-        keep_alive_terminal.close()
-        keep_alive_terminal = BashTerminal(project.root_dir)
     reminders = generate_reminders(runtime)
-    return f"```\n{keep_alive_terminal.execute(command)}\n```{reminders}"
+    try:
+        if command == "list":
+            jobs = job_manager.list()
+            if not jobs:
+                return f"No jobs.{reminders}"
+            return "\n".join(f"- {job.id} ({job.status}): `{job.command}`" for job in jobs) + reminders
+
+        if job_id is None:
+            return f"Error: `job_id` is required for the {command} command."
+        job = job_manager.get(job_id)
+        if command == "wait":
+            job.wait(min(timeout if timeout is not None else 30, MAX_JOB_WAIT))
+        elif command == "kill":
+            job.kill()
+        elif command != "output":
+            return f"Error: invalid command: {command}"
+
+        output = job.read_output().rstrip("\n")
+        if not job.is_running:
+            _invalidate_fs_cache()
+        return f"{job.id} ({job.status}): `{job.command}`\n```\n{output}\n```{reminders}"
+    except Exception as e:
+        return f"Error: {e}"
+
+
+async def _abash_job(
+    runtime: ToolRuntime,
+    command: str,
+    job_id: Optional[str] = None,
+    timeout: Optional[int] = None,
+):
+    """Async variant of bash_job_tool that waits for the job off the event loop."""
+    return await asyncio.to_thread(bash_job_tool.func, runtime, command, job_id, timeout)
+
+
+bash_job_tool.coroutine = _abash_job
+tag_side_effect(bash_job_tool, SideEffect.mutating, read_only_commands=["list"])
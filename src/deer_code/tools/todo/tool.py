@@ -4,6 +4,8 @@ from langchain.messages import ToolMessage
 from langchain.tools import InjectedToolCallId, tool
 from langgraph.graph.state import Command
 
+from deer_code.tools.side_effects import SideEffect, tag_side_effect
+
 from .types import TodoItem, TodoStatus
 
 
@@ -40,3 +42,6 @@ def todo_write_tool(
             ],
         }
     )
+
+
+tag_side_effect(todo_write_tool, SideEffect.mutating)
@@ -0,0 +1,581 @@
+"""
+Project-wide file watcher.
+
+The watcher publishes the files that change under the project root, whether
+they were changed by the `text_editor` tool, by a `bash` command or outside
+deer-code. Components subscribe to it to invalidate exactly what changed:
+- the fs tool result cache drops the results whose scope contains a change.
+- the path validators forget the resolved directories under a change.
+- the trigram index searches changed files directly until its next update.
+- the editor tabs reload the files that are open.
+
+On Linux the watcher uses inotify through ctypes. Elsewhere, or when inotify
+is unavailable (e.g. the watch limit is reached), it falls back to polling the
+tree. Ignored files and directories (see `deer_code.tools.fs.ignore`) are not
+watched. Events are coalesced for a short delay and published in batches.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from enum import Enum
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from deer_code.tools.fs.ignore import IgnoreMatcher, get_ignore_matcher
+
+# Delay without new events before a batch of changes is published
+DEFAULT_DEBOUNCE = 0.05
+
+# Maximum delay before a batch is published even if events keep coming
+MAX_LATENCY = 0.5
+
+# Interval between two scans of the polling backend
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+class ChangeKind(str, Enum):
+    created = "created"
+    modified = "modified"
+    deleted = "deleted"
+
+
+class FileChange(NamedTuple):
+    """A change to a file or directory."""
+
+    path: str
+    kind: ChangeKind
+
+
+Subscriber = Callable[[list[FileChange]], None]
+
+
+def coalesce(previous: Optional[ChangeKind], kind: ChangeKind) -> ChangeKind:
+    """Merge two successive changes to the same path into one."""
+    if previous == ChangeKind.created and kind == ChangeKind.modified:
+        return ChangeKind.created
+    if previous == ChangeKind.deleted and kind == ChangeKind.created:
+        return ChangeKind.modified
+    return kind
+
+
+# inotify constants from <sys/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+    | _IN_ONLYDIR
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class WatcherUnavailable(Exception):
+    """Raised when a watcher backend cannot be used on this system."""
+
+
+class _InotifyBackend:
+    """Watch every non-ignored directory of the tree with inotify."""
+
+    def __init__(self, root: str, matcher: IgnoreMatcher):
+        if not sys.platform.startswith("linux"):
+            raise WatcherUnavailable("inotify is only available on Linux")
+        libc_name = ctypes.util.find_library("c")
+        try:
+            self._libc = ctypes.CDLL(libc_name or "libc.so.6", use_errno=True)
+            self._libc.inotify_init1
+        except (OSError, AttributeError) as e:
+            raise WatcherUnavailable(f"inotify is not available: {e}")
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise WatcherUnavailable(os.strerror(ctypes.get_errno()))
+        self.root = root
+        self._matcher = matcher
+        # Watch descriptor -> (directory, matcher of the directory's parent)
+        self._watches: dict[int, tuple[str, IgnoreMatcher]] = {}
+        self._lock = threading.Lock()
+        try:
+            self._add_tree(root, matcher, [])
+        except WatcherUnavailable:
+            self.close()
+            raise
+
+    def read(self, timeout: float) -> Optional[list[FileChange]]:
+        """
+        Wait up to `timeout` seconds for events.
+
+        Returns:
+            The changes read, or None if the kernel queue overflowed and events
+            were lost.
+        """
+        try:
+            ready, _, _ = select.select([self._fd], [], [], timeout)
+        except (OSError, ValueError):
+            return []
+        if not ready:
+            return []
+        with self._lock:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return []
+            except OSError:
+                return []
+            return self._parse(data)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+    def _parse(self, data: bytes) -> Optional[list[FileChange]]:
+        changes: list[FileChange] = []
+        offset = 0
+        overflow = False
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            watch = self._watches.get(wd)
+            if watch is None:
+                continue
+            directory, parent_matcher = watch
+            if mask & _IN_IGNORED:
+                del self._watches[wd]
+                continue
+            if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                changes.append(FileChange(directory, ChangeKind.deleted))
+                continue
+            if not name:
+                continue
+
+            path = os.path.join(directory, os.fsdecode(name))
+            is_dir = bool(mask & _IN_ISDIR)
+            matcher = parent_matcher.with_gitignore(directory)
+            if matcher.is_ignored(path, is_dir):
+                continue
+            if mask & (_IN_CREATE | _IN_MOVED_TO):
+                changes.append(FileChange(path, ChangeKind.created))
+                if is_dir:
+                    # Files may have been created before the watch was added
+                    try:
+                        self._add_tree(path, matcher, changes)
+                    except WatcherUnavailable:
+                        overflow = True
+            elif mask & (_IN_DELETE | _IN_MOVED_FROM):
+                changes.append(FileChange(path, ChangeKind.deleted))
+            else:
+                changes.append(FileChange(path, ChangeKind.modified))
+        return None if overflow else changes
+
+    def _add_tree(
+        self, directory: str, parent_matcher: IgnoreMatcher, changes: list[FileChange]
+    ) -> None:
+        """Watch `directory` and its subdirectories, reporting their files as created."""
+        stack = [(directory, parent_matcher)]
+        is_root = directory == self.root
+        while stack:
+            current, inherited = stack.pop()
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(current), _WATCH_MASK
+            )
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise WatcherUnavailable("the inotify watch limit was reached")
+                continue
+            self._watches[wd] = (current, inherited)
+            matcher = inherited.with_gitignore(current)
+            try:
+                entries = list(os.scandir(current))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if matcher.is_ignored(entry.path, is_dir):
+                    continue
+                if is_dir:
+                    stack.append((entry.path, matcher))
+                if not is_root:
+                    changes.append(FileChange(entry.path, ChangeKind.created))
+
+
+class _PollingBackend:
+    """Detect changes by periodically comparing snapshots of the tree."""
+
+    def __init__(
+        self,
+        root: str,
+        matcher: IgnoreMatcher,
+        interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        self.root = root
+        self._matcher = matcher
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._snapshot = self._scan()
+        self._last_scan = time.monotonic()
+
+    def read(self, timeout: float) -> Optional[list[FileChange]]:
+        """Wait up to `timeout` seconds, scanning the tree if the interval elapsed."""
+        remaining = self._last_scan + self._interval - time.monotonic()
+        if remaining > timeout:
+            self._closed.wait(timeout)
+            return []
+        if remaining > 0 and self._closed.wait(remaining):
+            return []
+        return self.poll()
+
+    def poll(self) -> list[FileChange]:
+        """Scan the tree now and return the changes since the previous scan."""
+        with self._lock:
+            snapshot = self._scan()
+            previous = self._snapshot
+            self._snapshot = snapshot
+            self._last_scan = time.monotonic()
+        changes = [
+            FileChange(path, ChangeKind.created)
+            for path in snapshot.keys() - previous.keys()
+        ]
+        changes.extend(
+            FileChange(path, ChangeKind.deleted)
+            for path in previous.keys() - snapshot.keys()
+        )
+        changes.extend(
+            FileChange(path, ChangeKind.modified)
+            for path in snapshot.keys() & previous.keys()
+            if snapshot[path] != previous[path]
+        )
+        return changes
+
+    def close(self) -> None:
+        self._closed.set()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        """Return (mtime_ns, size) of every non-ignored file and directory."""
+        snapshot = {}
+        stack = [(self.root, self._matcher)]
+        while stack:
+            directory, inherited = stack.pop()
+            matcher = inherited.with_gitignore(directory)
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    if matcher.is_ignored(entry.path, is_dir):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                # Directory sizes vary between filesystems, only their mtime matters
+                snapshot[entry.path] = (stat.st_mtime_ns, 0 if is_dir else stat.st_size)
+                if is_dir:
+                    stack.append((entry.path, matcher))
+        return snapshot
+
+
+class ProjectWatcher:
+    """Watch a directory tree and publish coalesced batches of changes to subscribers."""
+
+    def __init__(
+        self,
+        root: str,
+        matcher: Optional[IgnoreMatcher] = None,
+        backend: str = "auto",
+        debounce: float = DEFAULT_DEBOUNCE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        """
+        Initialize ProjectWatcher.
+
+        Args:
+            root: The directory to watch.
+            matcher: Ignore rules for files that aren't watched. Defaults to the
+                default ignore patterns; .gitignore files are layered on top.
+            backend: "inotify", "polling", or "auto" to use inotify when available.
+            debounce: Seconds without new events before a batch is published.
+            poll_interval: Seconds between two scans of the polling backend.
+        """
+        if backend not in ("auto", "inotify", "polling"):
+            raise ValueError(f"Unknown watcher backend: {backend}")
+        self.root = os.path.realpath(root)
+        self.matcher = matcher or get_ignore_matcher()
+        self.backend_name = backend
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._backend = None
+        self._subscribers: list[Subscriber] = []
+        self._pending: dict[str, ChangeKind] = {}
+        self._pending_since: Optional[float] = None
+        self._last_event = 0.0
+        self._lock = threading.Lock()
+        # Serializes publishing so subscribers see batches in order
+        self._publish_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def covers(self, path: str | os.PathLike) -> bool:
+        """Check whether a path is the watched root or inside it."""
+        path = os.path.realpath(path)
+        return path == self.root or path.startswith(self.root.rstrip(os.sep) + os.sep)
+
+    def start(self) -> "ProjectWatcher":
+        """Start watching in a background thread."""
+        if self.is_running:
+            return self
+        self._backend = self._create_backend()
+        self.backend_name = (
+            "inotify" if isinstance(self._backend, _InotifyBackend) else "polling"
+        )
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="deer-code-watcher", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop watching. Pending changes are published first."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._backend is not None:
+            self._backend.close()
+            self._backend = None
+        self._publish()
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """
+        Subscribe to batches of changes.
+
+        The callback is called from the watcher thread, or from the thread
+        calling `flush()`, with the list of changes of each batch.
+
+        Args:
+            callback: Function called with each batch of changes.
+
+        Returns:
+            A function that unsubscribes the callback.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def flush(self) -> bool:
+        """
+        Publish every change that happened so far without waiting for the debounce.
+
+        Tools call this after mutating the tree so subscribers are up to date
+        before the next tool call.
+
+        Returns:
+            True if the changes were published, False if the watcher isn't running.
+        """
+        backend = self._backend
+        if backend is None or not self.is_running:
+            return False
+        if isinstance(backend, _PollingBackend):
+            self._record(backend.poll())
+        else:
+            while True:
+                changes = backend.read(0)
+                self._record(changes)
+                if changes == []:
+                    break
+        self._publish()
+        return True
+
+    def _create_backend(self):
+        if self.backend_name in ("auto", "inotify"):
+            try:
+                return _InotifyBackend(self.root, self.matcher)
+            except WatcherUnavailable:
+                if self.backend_name == "inotify":
+                    raise
+        return _PollingBackend(self.root, self.matcher, self.poll_interval)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            backend = self._backend
+            if backend is None:
+                break
+            self._record(backend.read(self.debounce))
+            with self._lock:
+                since = self._pending_since
+                last = self._last_event
+            now = time.monotonic()
+            if since is not None and (
+                now - last >= self.debounce or now - since >= MAX_LATENCY
+            ):
+                self._publish()
+
+    def _record(self, changes: Optional[list[FileChange]]) -> None:
+        if changes is None:
+            # Events were lost, so anything under the root may have changed
+            changes = [FileChange(self.root, ChangeKind.modified)]
+        if not changes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for path, kind in changes:
+                self._pending[path] = coalesce(self._pending.get(path), kind)
+            if self._pending_since is None:
+                self._pending_since = now
+            self._last_event = now
+
+    def _publish(self) -> None:
+        with self._publish_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                batch = [FileChange(path, kind) for path, kind in self._pending.items()]
+                self._pending = {}
+                self._pending_since = None
+                subscribers = list(self._subscribers)
+            batch.sort()
+            for callback in subscribers:
+                try:
+                    callback(batch)
+                except Exception:
+                    # A failing subscriber must not stop the others
+                    pass
+
+
+_project_watcher: Optional[ProjectWatcher] = None
+_project_watcher_lock = threading.Lock()
+
+
+def get_project_watcher() -> Optional[ProjectWatcher]:
+    """Return the running project watcher, if any."""
+    watcher = _project_watcher
+    if watcher is not None and watcher.is_running:
+        return watcher
+    return None
+
+
+def start_project_watcher(root: Optional[str] = None, **kwargs) -> ProjectWatcher:
+    """
+    Start watching the project root, replacing the watcher of a previous root.
+
+    The fs tool result cache, the path validators and the trigram index are
+    subscribed to it.
+
+    Args:
+        root: The directory to watch. Defaults to `project.root_dir`.
+        **kwargs: Additional keyword arguments to pass to `ProjectWatcher`.
+
+    Returns:
+        The running watcher.
+    """
+    global _project_watcher
+    from deer_code.project import project
+
+    root = os.path.realpath(root or project.root_dir)
+    with _project_watcher_lock:
+        if _project_watcher is not None:
+            if _project_watcher.root == root and _project_watcher.is_running:
+                return _project_watcher
+            _project_watcher.stop()
+        watcher = ProjectWatcher(root, **kwargs)
+        watcher.subscribe(_invalidate_fs_cache)
+        watcher.subscribe(_invalidate_path_validators)
+        watcher.subscribe(_note_index_changes(root))
+        _project_watcher = watcher.start()
+        return watcher
+
+
+def stop_project_watcher() -> None:
+    """Stop the project watcher, if any."""
+    global _project_watcher
+    with _project_watcher_lock:
+        if _project_watcher is not None:
+            _project_watcher.stop()
+            _project_watcher = None
+
+
+def _paths(changes: Iterable[FileChange]) -> list[str]:
+    return [change.path for change in changes]
+
+
+def _invalidate_fs_cache(changes: list[FileChange]) -> None:
+    from deer_code.tools.fs.cache import fs_cache
+
+    fs_cache.invalidate_paths(_paths(changes))
+
+
+def _invalidate_path_validators(changes: list[FileChange]) -> None:
+    from deer_code.tools.edit.path_validator import invalidate_path_validators
+
+    invalidate_path_validators(_paths(changes))
+
+
+def _note_index_changes(root: str) -> Subscriber:
+    def note_changes(changes: list[FileChange]) -> None:
+        from deer_code.tools.fs.index import get_project_index
+
+        get_project_index(root).note_changes(_paths(changes))
+
+    return note_changes
+
+
+if __name__ == "__main__":
+    watcher = ProjectWatcher(sys.argv[1] if len(sys.argv) > 1 else ".")
+    watcher.subscribe(
+        lambda changes: print("\n".join(f"{kind.value:8} {path}" for path, kind in changes))
+    )
+    watcher.start()
+    print(f"Watching {watcher.root} with {watcher.backend_name}. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.stop()
@@ -0,0 +1,264 @@
+"""Tests for agents/scheduler.py module."""
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.tools import tool
+from langgraph.graph import END, START, MessagesState, StateGraph
+from langgraph.prebuilt import ToolNode
+
+from deer_code.agents import scheduler as scheduler_module
+from deer_code.agents.scheduler import ToolSchedulerMiddleware, plan_batches
+from deer_code.tools.side_effects import SideEffect, is_read_only, tag_side_effect
+
+
+class Recorder:
+    """Record the start and end of every tool call and the peak concurrency."""
+
+    def __init__(self):
+        self.events = []
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def start(self, name):
+        with self.lock:
+            self.events.append(("start", name))
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+
+    def end(self, name):
+        with self.lock:
+            self.events.append(("end", name))
+            self.running -= 1
+
+
+def make_tools(recorder):
+    @tool("read")
+    def read_tool(name: str) -> str:
+        """Read something."""
+        recorder.start(name)
+        time.sleep(0.05)
+        recorder.end(name)
+        return f"read {name}"
+
+    @tool("write")
+    def write_tool(name: str) -> str:
+        """Write something."""
+        recorder.start(name)
+        time.sleep(0.05)
+        recorder.end(name)
+        return f"wrote {name}"
+
+    @tool("edit")
+    def edit_tool(command: str, name: str) -> str:
+        """Edit something."""
+        recorder.start(name)
+        time.sleep(0.05)
+        recorder.end(name)
+        return f"{command} {name}"
+
+    async def aread(name: str) -> str:
+        recorder.start(name)
+        await asyncio.sleep(0.05)
+        recorder.end(name)
+        return f"read {name}"
+
+    read_tool.coroutine = aread
+    tag_side_effect(read_tool, SideEffect.read_only)
+    tag_side_effect(write_tool, SideEffect.mutating)
+    tag_side_effect(edit_tool, SideEffect.mutating, read_only_commands=["view"])
+    return [read_tool, write_tool, edit_tool]
+
+
+def make_node(tools, max_workers=4, scheduler=None):
+    """Build a graph that runs the tool calls of the last AIMessage."""
+    scheduler = scheduler or ToolSchedulerMiddleware(max_workers=max_workers)
+    node = ToolNode(
+        tools,
+        wrap_tool_call=scheduler.wrap_tool_call,
+        awrap_tool_call=scheduler.awrap_tool_call,
+    )
+    graph = StateGraph(MessagesState)
+    graph.add_node("tools", node)
+    graph.add_edge(START, "tools")
+    graph.add_edge("tools", END)
+    return graph.compile()
+
+
+def make_state(*calls):
+    tool_calls = [
+        {"name": name, "args": args, "id": f"call_{i}", "type": "tool_call"}
+        for i, (name, args) in enumerate(calls)
+    ]
+    return {"messages": [AIMessage(content="", tool_calls=tool_calls)]}
+
+
+def was_running_alone(events, name):
+    """Check that nothing else ran while `name` was running."""
+    start = events.index(("start", name))
+    return events[start + 1] == ("end", name)
+
+
+@pytest.mark.unit
+class TestSideEffects:
+    """Tests for the side-effect tags."""
+
+    def test_untagged_tool_is_mutating(self):
+        @tool("untagged")
+        def untagged(name: str) -> str:
+            """Do something."""
+            return name
+
+        assert is_read_only(untagged, {"name": "x"}) is False
+        assert is_read_only(None) is False
+
+    def test_read_only_commands(self):
+        _, _, edit_tool = make_tools(Recorder())
+
+        assert is_read_only(edit_tool, {"command": "view"}) is True
+        assert is_read_only(edit_tool, {"command": "create"}) is False
+
+    def test_builtin_tools_are_tagged(self):
+        from deer_code.tools import (
+            bash_job_tool,
+            bash_tool,
+            grep_tool,
+            ls_tool,
+            text_editor_tool,
+            tree_tool,
+        )
+
+        assert is_read_only(grep_tool, {}) is True
+        assert is_read_only(ls_tool, {}) is True
+        assert is_read_only(tree_tool, {}) is True
+        assert is_read_only(text_editor_tool, {"command": "view"}) is True
+        assert is_read_only(text_editor_tool, {"command": "str_replace"}) is False
+        assert is_read_only(bash_tool, {"command": "ls"}) is False
+        assert is_read_only(bash_job_tool, {"command": "list"}) is True
+        assert is_read_only(bash_job_tool, {"command": "kill"}) is False
+
+
+@pytest.mark.unit
+class TestPlanBatches:
+    """Tests for splitting tool calls into batches."""
+
+    def test_consecutive_reads_share_a_batch(self):
+        assert plan_batches([True, True, False, True, True]) == [0, 0, 1, 2, 2]
+
+    def test_each_write_is_its_own_batch(self):
+        assert plan_batches([False, False, True]) == [0, 1, 2]
+
+    def test_empty(self):
+        assert plan_batches([]) == []
+
+
+@pytest.mark.unit
+class TestToolSchedulerMiddleware:
+    """Tests for running tool calls through the scheduler."""
+
+    def test_invalid_max_workers(self):
+        with pytest.raises(ValueError):
+            ToolSchedulerMiddleware(max_workers=0)
+
+    def test_sync_reads_run_concurrently_and_writes_alone(self):
+        recorder = Recorder()
+        node = make_node(make_tools(recorder))
+        state = make_state(
+            ("read", {"name": "r1"}),
+            ("edit", {"command": "view", "name": "v1"}),
+            ("write", {"name": "w1"}),
+            ("read", {"name": "r2"}),
+            ("read", {"name": "r3"}),
+        )
+
+        result = node.invoke(state)
+
+        contents = [message.content for message in result["messages"][1:]]
+        assert contents == ["read r1", "view v1", "wrote w1", "read r2", "read r3"]
+        assert recorder.peak == 2
+        assert was_running_alone(recorder.events, "w1")
+        # The write starts after the first batch and before the second one
+        events = recorder.events
+        assert events.index(("start", "w1")) > events.index(("end", "r1"))
+        assert events.index(("start", "w1")) > events.index(("end", "v1"))
+        assert events.index(("end", "w1")) < events.index(("start", "r2"))
+
+    def test_async_reads_respect_worker_limit(self):
+        recorder = Recorder()
+        node = make_node(make_tools(recorder), max_workers=2)
+        state = make_state(*[("read", {"name": f"r{i}"}) for i in range(5)])
+
+        result = asyncio.run(node.ainvoke(state))
+
+        contents = [message.content for message in result["messages"][1:]]
+        assert contents == [f"read r{i}" for i in range(5)]
+        assert recorder.peak == 2
+
+    def test_async_writes_run_in_order(self):
+        recorder = Recorder()
+        node = make_node(make_tools(recorder))
+        state = make_state(
+            ("write", {"name": "w1"}),
+            ("read", {"name": "r1"}),
+            ("write", {"name": "w2"}),
+        )
+
+        asyncio.run(node.ainvoke(state))
+
+        assert [name for kind, name in recorder.events if kind == "start"] == ["w1", "r1", "w2"]
+        assert recorder.peak == 1
+
+    def test_plans_are_released(self):
+        scheduler = ToolSchedulerMiddleware()
+        node = make_node(make_tools(Recorder()), scheduler=scheduler)
+
+        node.invoke(make_state(("read", {"name": "r1"}), ("write", {"name": "w1"})))
+
+        assert scheduler._plans == {}
+
+    def test_answered_calls_are_left_out_on_resume(self):
+        scheduler = ToolSchedulerMiddleware()
+        tools = make_tools(Recorder())
+        state = make_state(*[("write", {"name": f"w{i}"}) for i in range(3)])
+        # The first two calls were answered before an interrupt
+        state["messages"] += [
+            ToolMessage(content="wrote w0", tool_call_id="call_0"),
+            ToolMessage(content="wrote w1", tool_call_id="call_1"),
+        ]
+        request = SimpleNamespace(
+            state=state,
+            tool_call=state["messages"][0].tool_calls[2],
+            tool=tools[1],
+            runtime=SimpleNamespace(tools=tools),
+        )
+        results = []
+
+        worker = threading.Thread(
+            target=lambda: results.append(scheduler.wrap_tool_call(request, lambda _: "done"))
+        )
+        worker.start()
+        worker.join(5)
+
+        assert results == ["done"]
+        assert scheduler._plans == {}
+
+    def test_calls_stop_waiting_for_batches_that_never_finish(self, monkeypatch):
+        monkeypatch.setattr(scheduler_module, "BATCH_WAIT_TIMEOUT", 0.2)
+        scheduler = ToolSchedulerMiddleware()
+        tools = make_tools(Recorder())
+        state = make_state(("write", {"name": "w0"}), ("write", {"name": "w1"}))
+        # The call of the first batch never reaches the scheduler
+        request = SimpleNamespace(
+            state=state,
+            tool_call=state["messages"][0].tool_calls[1],
+            tool=tools[1],
+            runtime=SimpleNamespace(tools=tools),
+        )
+
+        assert scheduler.wrap_tool_call(request, lambda _: "done") == "done"
+        assert scheduler._plans == {}
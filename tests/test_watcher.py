@@ -0,0 +1,154 @@
+"""Tests for watcher.py module."""
+
+import os
+import sys
+import time
+
+import pytest
+
+from deer_code.tools.fs.cache import FsResultCache
+from deer_code.watcher import (
+    ChangeKind,
+    FileChange,
+    ProjectWatcher,
+    coalesce,
+    get_project_watcher,
+    start_project_watcher,
+    stop_project_watcher,
+)
+
+BACKENDS = ["polling"]
+if sys.platform.startswith("linux"):
+    BACKENDS.append("inotify")
+
+
+@pytest.fixture
+def project_dir(tmp_path):
+    root = tmp_path / "project"
+    (root / "src").mkdir(parents=True)
+    (root / "node_modules").mkdir()
+    (root / "src" / "app.py").write_text("print('hello')\n")
+    return root
+
+
+@pytest.fixture(params=BACKENDS)
+def watcher(request, project_dir):
+    watcher = ProjectWatcher(str(project_dir), backend=request.param, poll_interval=0.1)
+    batches = []
+    watcher.subscribe(batches.append)
+    watcher.batches = batches
+    watcher.start()
+    yield watcher
+    watcher.stop()
+
+
+def changes_of(watcher):
+    """Publish pending changes and return every change published so far."""
+    assert watcher.flush()
+    return {change for batch in watcher.batches for change in batch}
+
+
+@pytest.mark.unit
+class TestCoalesce:
+    """Tests for merging successive changes to a path."""
+
+    def test_created_then_modified_is_created(self):
+        assert coalesce(ChangeKind.created, ChangeKind.modified) == ChangeKind.created
+
+    def test_deleted_then_created_is_modified(self):
+        assert coalesce(ChangeKind.deleted, ChangeKind.created) == ChangeKind.modified
+
+    def test_latest_change_wins_otherwise(self):
+        assert coalesce(None, ChangeKind.modified) == ChangeKind.modified
+        assert coalesce(ChangeKind.modified, ChangeKind.deleted) == ChangeKind.deleted
+
+
+@pytest.mark.unit
+class TestProjectWatcher:
+    """Tests for ProjectWatcher with each backend."""
+
+    def test_reports_created_modified_and_deleted_files(self, watcher, project_dir):
+        root = os.path.realpath(project_dir)
+        created = project_dir / "src" / "new.py"
+        created.write_text("x = 1\n")
+        changes = changes_of(watcher)
+        assert FileChange(os.path.join(root, "src", "new.py"), ChangeKind.created) in changes
+
+        watcher.batches.clear()
+        app = project_dir / "src" / "app.py"
+        app.write_text("print('changed, and longer')\n")
+        created.unlink()
+        changes = changes_of(watcher)
+
+        assert FileChange(os.path.join(root, "src", "app.py"), ChangeKind.modified) in changes
+        assert FileChange(os.path.join(root, "src", "new.py"), ChangeKind.deleted) in changes
+
+    def test_reports_files_in_new_directories(self, watcher, project_dir):
+        root = os.path.realpath(project_dir)
+        (project_dir / "pkg" / "sub").mkdir(parents=True)
+        (project_dir / "pkg" / "sub" / "mod.py").write_text("pass\n")
+
+        paths = {change.path for change in changes_of(watcher)}
+
+        assert os.path.join(root, "pkg", "sub", "mod.py") in paths
+
+    def test_ignored_paths_are_not_reported(self, watcher, project_dir):
+        (project_dir / "node_modules" / "dep.js").write_text("x")
+        (project_dir / "debug.log").write_text("x")
+
+        paths = {change.path for change in changes_of(watcher)}
+
+        assert not any("node_modules" in path or path.endswith(".log") for path in paths)
+
+    def test_changes_are_published_without_flush(self, watcher, project_dir):
+        (project_dir / "later.py").write_text("x")
+
+        deadline = time.monotonic() + 5
+        while not watcher.batches and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        assert watcher.batches
+
+    def test_unsubscribe(self, watcher, project_dir):
+        received = []
+        unsubscribe = watcher.subscribe(received.append)
+        unsubscribe()
+
+        (project_dir / "file.py").write_text("x")
+        changes_of(watcher)
+
+        assert received == []
+
+    def test_flush_requires_a_running_watcher(self, project_dir):
+        assert ProjectWatcher(str(project_dir), backend="polling").flush() is False
+
+    def test_unknown_backend(self, project_dir):
+        with pytest.raises(ValueError):
+            ProjectWatcher(str(project_dir), backend="kqueue")
+
+
+@pytest.mark.unit
+class TestProjectWatcherService:
+    """Tests for the project-wide watcher and its subscribers."""
+
+    def test_invalidates_fs_cache_precisely(self, project_dir, monkeypatch):
+        from deer_code.tools.fs import cache as cache_module
+
+        cache = FsResultCache()
+        monkeypatch.setattr(cache_module, "fs_cache", cache)
+        src = str(project_dir / "src")
+        other = str(project_dir / "docs")
+        cache.put(("ls", src), "src listing", scope=src)
+        cache.put(("ls", other), "docs listing", scope=other)
+
+        watcher = start_project_watcher(str(project_dir), backend="polling")
+        try:
+            assert get_project_watcher() is watcher
+            (project_dir / "src" / "new.py").write_text("x")
+            watcher.flush()
+        finally:
+            stop_project_watcher()
+
+        assert get_project_watcher() is None
+        assert cache.get(("ls", src)) is None
+        assert cache.get(("ls", other)) == "docs listing"
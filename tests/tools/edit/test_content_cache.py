@@ -0,0 +1,201 @@
+"""
+Tests for the content cache shared by TextEditor reads and writes.
+
+This test suite covers:
+1. Cache hits and stat-based validation
+2. Racy entries and LRU eviction
+3. TextEditor integration and the text_editor tool
+"""
+
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.edit import content_cache as content_cache_module
+from deer_code.tools.edit.content_cache import FileContentCache
+from deer_code.tools.edit.path_validator import PathValidator
+from deer_code.tools.edit.text_editor import TextEditor
+
+
+def age(path: Path, seconds: int = 10):
+    """Move the mtime of a file into the past so its cache entry is not racy."""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - seconds * 1_000_000_000))
+
+
+@pytest.fixture
+def cache():
+    return FileContentCache()
+
+
+@pytest.fixture
+def editor(tmp_path, cache):
+    return TextEditor(path_validator=PathValidator(project_root=tmp_path), content_cache=cache)
+
+
+class TestFileContentCache:
+    """Test caching and validation."""
+
+    def test_second_read_is_a_hit(self, tmp_path, cache):
+        file = tmp_path / "a.txt"
+        file.write_text("hello\n")
+        age(file)
+
+        assert cache.read(file) == "hello\n"
+        assert cache.read(file) == "hello\n"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_modified_file_is_read_again(self, tmp_path, cache):
+        file = tmp_path / "a.txt"
+        file.write_text("hello\n")
+        age(file, 20)
+        cache.read(file)
+
+        file.write_text("HELLO\n")
+        age(file, 10)
+
+        assert cache.read(file) == "HELLO\n"
+
+    def test_racy_entry_is_not_trusted(self, tmp_path, cache):
+        file = tmp_path / "a.txt"
+        file.write_text("hello\n")
+        cache.read(file)
+
+        # Same size, and possibly the same mtime tick as the cached read
+        file.write_text("HELLO\n")
+        stat = file.stat()
+        os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        assert cache.read(file) == "HELLO\n"
+
+    def test_least_recently_used_files_are_evicted(self, tmp_path):
+        cache = FileContentCache(max_chars=10)
+        files = []
+        for name in "abc":
+            file = tmp_path / name
+            file.write_text(name * 4)
+            age(file)
+            files.append(file)
+
+        cache.read(files[0])
+        cache.read(files[1])
+        cache.read(files[0])
+        cache.read(files[2])
+
+        assert cache.stats()["entries"] == 2
+        assert cache.stats()["chars"] == 8
+        stat = files[1].stat()
+        assert cache.get(files[1], stat) is None
+        assert cache.get(files[0], files[0].stat()) == "aaaa"
+
+    def test_large_files_are_not_cached(self, tmp_path, cache, monkeypatch):
+        monkeypatch.setattr(content_cache_module, "MAX_CACHED_FILE_SIZE", 4)
+        file = tmp_path / "big.txt"
+        file.write_text("0123456789")
+
+        assert cache.read(file) == "0123456789"
+        assert cache.stats()["entries"] == 0
+
+    def test_invalidate(self, tmp_path, cache):
+        file = tmp_path / "a.txt"
+        file.write_text("hello\n")
+        age(file)
+        cache.read(file)
+
+        cache.invalidate(file)
+        assert cache.stats()["entries"] == 0
+
+        cache.read(file)
+        cache.invalidate()
+        assert cache.stats() == {"hits": 0, "misses": 2, "entries": 0, "chars": 0}
+
+
+class TestTextEditorWithCache:
+    """Test that TextEditor reads through and writes through the cache."""
+
+    def test_view_then_str_replace_reads_once(self, tmp_path, editor, cache):
+        file = tmp_path / "a.py"
+        file.write_text("x = 1\ny = 2\n")
+        age(file)
+
+        editor.view(file)
+        editor.str_replace(file, "x = 1", "x = 10")
+
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_writes_update_the_cache(self, tmp_path, editor, cache, monkeypatch):
+        monkeypatch.setattr(content_cache_module, "RACY_WINDOW_NS", -1)
+        file = tmp_path / "a.py"
+        file.write_text("x = 1\n")
+
+        editor.str_replace(file, "x = 1", "x = 2")
+
+        assert cache.get(file.resolve(), file.stat()) == "x = 2\n"
+        assert "x = 2" in editor.view(file)
+        assert cache.stats()["misses"] == 1
+
+    def test_carriage_returns_are_not_cached_on_write(self, tmp_path, editor, cache):
+        file = tmp_path / "a.txt"
+
+        editor.write_file(file, "a\r\nb\r\n")
+
+        assert cache.stats()["entries"] == 0
+        assert editor.read_file(file) == "a\nb\n"
+
+    def test_errors_keep_their_messages(self, tmp_path, editor):
+        with pytest.raises(ValueError, match="Path is not a file"):
+            editor.view(tmp_path)
+
+
+class TestTextEditorTool:
+    """Test the text_editor tool with the shared editor."""
+
+    def test_create_new_file(self, tmp_path, monkeypatch):
+        from deer_code.project import project
+        from deer_code.tools.edit import tool as tool_module
+
+        monkeypatch.setattr(project, "_root_dir", str(tmp_path))
+        runtime = MagicMock()
+        runtime.state = {}
+        file = tmp_path / "pkg" / "new.py"
+
+        result = tool_module.text_editor_tool.func(
+            runtime, command="create", path=str(file), file_text="x = 1\n"
+        )
+
+        assert "File successfully created" in result
+        assert file.read_text() == "x = 1\n"
+        assert tool_module._get_editor() is tool_module._get_editor()
+
+    def test_multi_edit(self, tmp_path, monkeypatch):
+        from deer_code.project import project
+        from deer_code.tools.edit import tool as tool_module
+
+        monkeypatch.setattr(project, "_root_dir", str(tmp_path))
+        file = tmp_path / "a.py"
+        file.write_text("x = 1\ny = 2\n")
+
+        runtime = MagicMock()
+        runtime.state = {}
+
+        result = tool_module.text_editor_tool.func(
+            runtime,
+            command="multi_edit",
+            path=str(file),
+            edits=[
+                {"old_str": "x = 1", "new_str": "x = 10"},
+                {"old_str": "y = 2", "new_str": "y = 20"},
+            ],
+        )
+
+        assert result.startswith("Successfully applied 2 edits")
+        assert file.read_text() == "x = 10\ny = 20\n"
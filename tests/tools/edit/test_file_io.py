@@ -0,0 +1,180 @@
+"""
+Tests for atomic writes and edit conflict detection.
+
+This test suite covers:
+1. Atomic writes, file modes and fsync
+2. Conflicts with changes made outside the editor
+3. Concurrent edits from several threads
+"""
+
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.edit import file_io
+from deer_code.tools.edit.content_cache import FileContentCache
+from deer_code.tools.edit.file_io import EditConflictError, atomic_write_text, file_signature
+from deer_code.tools.edit.path_validator import PathValidator
+from deer_code.tools.edit.text_editor import TextEditor
+
+
+def modify_externally(path: Path, content: str):
+    """Write a file the way another process would, with a distinct mtime."""
+    path.write_text(content)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def editor(tmp_path):
+    return TextEditor(
+        path_validator=PathValidator(project_root=tmp_path), content_cache=FileContentCache()
+    )
+
+
+class TestAtomicWrite:
+    """Test atomic_write_text."""
+
+    def test_new_file_gets_default_permissions(self, tmp_path):
+        test_file = tmp_path / "new.txt"
+
+        atomic_write_text(test_file, "content")
+
+        assert test_file.read_text() == "content"
+        assert test_file.stat().st_mode & 0o777 == 0o666 & ~file_io._UMASK
+        assert [path.name for path in tmp_path.iterdir()] == ["new.txt"]
+
+    def test_umask_is_read_without_changing_it(self, monkeypatch):
+        umask = os.umask(0o022)
+        os.umask(umask)
+        monkeypatch.setattr(os, "umask", lambda mask: pytest.fail("umask changed"))
+
+        assert file_io._read_umask() == umask
+
+    def test_fsync_flushes_file_and_directory_once(self, tmp_path, monkeypatch):
+        editor = TextEditor(
+            path_validator=PathValidator(project_root=tmp_path),
+            content_cache=FileContentCache(),
+            fsync=True,
+        )
+        synced = []
+        monkeypatch.setattr(os, "fsync", synced.append)
+        patch = "".join(
+            f"--- /dev/null\n+++ b/file{index}.txt\n@@ -0,0 +1 @@\n+{index}\n" for index in range(3)
+        )
+
+        editor.apply_patch(patch, tmp_path)
+
+        # One fsync per file, then one for their directory
+        assert len(synced) == 4
+
+
+class TestEditConflicts:
+    """Test that edits fail when a file changed since it was last seen."""
+
+    def test_edit_after_external_change_fails(self, tmp_path, editor):
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("hello world\n")
+        editor.view(test_file)
+
+        modify_externally(test_file, "hello there world\n")
+
+        with pytest.raises(EditConflictError, match="modified after you last viewed"):
+            editor.str_replace(test_file, "world", "earth")
+        assert test_file.read_text() == "hello there world\n"
+
+        editor.view(test_file)
+        editor.str_replace(test_file, "world", "earth")
+        assert test_file.read_text() == "hello there earth\n"
+
+    def test_own_edits_are_not_conflicts(self, tmp_path, editor):
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("a b c\n")
+
+        editor.view(test_file)
+        editor.str_replace(test_file, "a", "x")
+        editor.multi_edit(test_file, [("b", "y"), ("c", "z")])
+
+        assert test_file.read_text() == "x y z\n"
+
+    def test_touched_file_is_not_a_conflict(self, tmp_path, editor):
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("hello\n")
+        editor.view(test_file)
+
+        modify_externally(test_file, "hello\n")
+        editor.str_replace(test_file, "hello", "bye")
+
+        assert test_file.read_text() == "bye\n"
+
+    def test_change_between_read_and_write_fails(self, tmp_path, editor):
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("hello\n")
+        signature = file_signature(test_file.stat())
+
+        modify_externally(test_file, "changed\n")
+
+        with pytest.raises(EditConflictError, match="modified while it was being edited"):
+            editor._write_validated(test_file.resolve(), "bye\n", expected=signature)
+        assert test_file.read_text() == "changed\n"
+
+    def test_creation_fails_if_the_file_appeared(self, tmp_path, editor):
+        editor._write_validated(tmp_path / "new.txt", "x", expected=None, record=False)
+
+        with pytest.raises(EditConflictError):
+            editor._write_validated(tmp_path / "new.txt", "y", expected=None, record=False)
+        assert (tmp_path / "new.txt").read_text() == "x"
+
+
+class TestConcurrentEdits:
+    """Test edits from several threads."""
+
+    def test_parallel_edits_of_disjoint_files(self, tmp_path, editor):
+        files = [tmp_path / f"file{index}.txt" for index in range(8)]
+        for test_file in files:
+            test_file.write_text("count = 0\n")
+
+        def edit(test_file):
+            for count in range(10):
+                editor.str_replace(test_file, f"count = {count}\n", f"count = {count + 1}\n")
+
+        threads = [threading.Thread(target=edit, args=(test_file,)) for test_file in files]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert all(test_file.read_text() == "count = 10\n" for test_file in files)
+
+    def test_same_file_edits_are_serialized(self, tmp_path, editor):
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("".join(f"line {index}\n" for index in range(8)))
+
+        applied = []
+
+        def edit(index):
+            try:
+                editor.str_replace(test_file, f"line {index}\n", f"edited {index}\n")
+                applied.append(index)
+            except EditConflictError:
+                pass
+
+        threads = [threading.Thread(target=edit, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Every edit either applied or failed with a conflict, none was lost silently
+        content = test_file.read_text()
+        assert applied
+        assert sorted(applied) == [
+            index for index in range(8) if f"edited {index}\n" in content
+        ]
@@ -0,0 +1,176 @@
+"""
+Tests for the undo journal of the text editor.
+
+This test suite covers:
+1. Reverse diffs and undoing them
+2. Ring buffer bounds and spilling to disk
+3. undo_edit in TextEditor and the text_editor tool
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.edit.content_cache import FileContentCache
+from deer_code.tools.edit.journal import EditJournal
+from deer_code.tools.edit.path_validator import PathValidator
+from deer_code.tools.edit.text_editor import TextEditor
+
+
+@pytest.fixture
+def editor(tmp_path):
+    return TextEditor(
+        path_validator=PathValidator(project_root=tmp_path),
+        content_cache=FileContentCache(),
+        journal=EditJournal(),
+    )
+
+
+class TestEditJournal:
+    """Test recording and undoing reverse diffs."""
+
+    def test_stores_only_the_changed_region(self):
+        journal = EditJournal()
+        old = "a" * 1000 + "old" + "z" * 1000
+        new = "a" * 1000 + "brand new" + "z" * 1000
+
+        journal.record(Path("/f"), old, new)
+        entry = journal.pop(Path("/f"))
+
+        assert (entry.start, entry.old_text, entry.new_text) == (1000, "old", "brand new")
+        assert journal.undo(entry, new) == old
+
+    @pytest.mark.parametrize(
+        "old, new",
+        [("", "abc"), ("abc", ""), ("abc", "abc"), ("aaa", "aaaa"), ("abcabc", "abc"), ("x", "y")],
+    )
+    def test_undo_restores_any_edit(self, old, new):
+        journal = EditJournal()
+
+        journal.record(Path("/f"), old, new)
+
+        assert journal.undo(journal.pop(Path("/f")), new) == old
+
+    def test_edits_are_undone_latest_first_per_file(self):
+        journal = EditJournal()
+        journal.record(Path("/a"), "1", "2")
+        journal.record(Path("/b"), "x", "y")
+        journal.record(Path("/a"), "2", "3")
+
+        assert journal.pop(Path("/a")).new_text == "3"
+        assert journal.pop(Path("/a")).new_text == "2"
+        assert journal.pop(Path("/a")) is None
+        assert len(journal) == 1
+
+    def test_changed_files_are_not_undone(self):
+        journal = EditJournal()
+        journal.record(Path("/f"), "hello", "hello world")
+
+        with pytest.raises(ValueError, match="was changed after the last edit"):
+            journal.undo(journal.pop(Path("/f")), "hello there")
+
+    def test_ring_buffer_drops_the_oldest_entries(self):
+        journal = EditJournal(max_entries=2)
+        for index in range(3):
+            journal.record(Path(f"/{index}"), "", str(index))
+
+        assert len(journal) == 2
+        assert journal.pop(Path("/0")) is None
+
+    def test_spills_to_disk_over_the_memory_budget(self, tmp_path):
+        spill_dir = tmp_path / "spill"
+        journal = EditJournal(max_memory_chars=10, spill_dir=spill_dir)
+
+        journal.record(Path("/a"), "", "a" * 8)
+        journal.record(Path("/b"), "", "b" * 8)
+
+        assert len(list(spill_dir.iterdir())) == 1
+        assert journal.pop(Path("/a")).new_text == "a" * 8
+        assert list(spill_dir.iterdir()) == []
+
+        journal.clear()
+        assert not spill_dir.exists()
+
+    def test_drops_entries_over_the_memory_budget_without_spill_dir(self):
+        journal = EditJournal(max_memory_chars=10)
+
+        journal.record(Path("/a"), "", "a" * 8)
+        journal.record(Path("/b"), "", "b" * 8)
+
+        assert len(journal) == 1
+
+
+class TestTextEditorUndo:
+    """Test undo_edit in TextEditor."""
+
+    def test_undo_edits_in_reverse_order(self, tmp_path, editor):
+        test_file = tmp_path / "test.py"
+        test_file.write_text("x = 1\n")
+        editor.str_replace(test_file, "x = 1", "x = 2")
+        editor.insert(test_file, 1, "y = 3")
+
+        editor.undo_edit(test_file)
+        assert test_file.read_text() == "x = 2\n"
+        editor.undo_edit(test_file)
+        assert test_file.read_text() == "x = 1\n"
+
+        with pytest.raises(ValueError, match="No edit to undo"):
+            editor.undo_edit(test_file)
+
+    def test_undo_create_removes_the_file(self, tmp_path, editor):
+        test_file = tmp_path / "new.txt"
+
+        editor.write_file(test_file, "content")
+        editor.undo_edit(test_file)
+
+        assert not test_file.exists()
+
+    def test_undo_patch_deletion_restores_the_file(self, tmp_path, editor):
+        test_file = tmp_path / "old.txt"
+        test_file.write_text("bye\n")
+
+        editor.apply_patch("--- a/old.txt\n+++ /dev/null\n@@ -1 +0,0 @@\n-bye\n", tmp_path)
+        editor.undo_edit(test_file)
+
+        assert test_file.read_text() == "bye\n"
+
+    def test_failed_undo_keeps_the_entry(self, tmp_path, editor):
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("a\n")
+        editor.str_replace(test_file, "a", "b")
+        test_file.write_text("changed elsewhere\n")
+
+        with pytest.raises(ValueError, match="cannot be undone"):
+            editor.undo_edit(test_file)
+        test_file.write_text("b\n")
+        editor.undo_edit(test_file)
+
+        assert test_file.read_text() == "a\n"
+
+
+class TestUndoEditTool:
+    """Test the undo_edit command of the text_editor tool."""
+
+    def test_undo_edit_command(self, tmp_path, monkeypatch):
+        from deer_code.project import project
+        from deer_code.tools.edit import tool as tool_module
+
+        monkeypatch.setattr(project, "_root_dir", str(tmp_path))
+        runtime = MagicMock()
+        runtime.state = {}
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("hello\n")
+
+        tool_module.text_editor_tool.func(
+            runtime, command="str_replace", path=str(test_file), old_str="hello", new_str="bye"
+        )
+        result = tool_module.text_editor_tool.func(runtime, command="undo_edit", path=str(test_file))
+
+        assert result.startswith("Successfully reverted")
+        assert test_file.read_text() == "hello\n"
@@ -0,0 +1,120 @@
+"""
+Tests for the line-offset index used to view large files.
+
+This test suite covers:
+1. Line counts and ranges matching str.split("\\n")
+2. Index caching and invalidation
+3. Ranged and paged views of large files in TextEditor
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.edit import line_index, text_editor
+from deer_code.tools.edit.content_cache import FileContentCache
+from deer_code.tools.edit.line_index import LineIndex, get_line_index
+from deer_code.tools.edit.path_validator import PathValidator
+from deer_code.tools.edit.text_editor import TextEditor
+
+CONTENTS = [
+    "",
+    "one line",
+    "one line\n",
+    "a\nb\nc",
+    "a\n\n\nlonger line here\nx\n\n",
+    "".join(f"line {i}\n" for i in range(200)),
+]
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    """Use tiny blocks so that ranges span several of them."""
+    monkeypatch.setattr(line_index, "BLOCK_SIZE", 7)
+
+
+@pytest.fixture
+def large_editor(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_editor, "LARGE_FILE_SIZE", 0)
+    monkeypatch.setattr(text_editor, "VIEW_PAGE_LINES", 3)
+    return TextEditor(
+        path_validator=PathValidator(project_root=tmp_path), content_cache=FileContentCache()
+    )
+
+
+class TestLineIndex:
+    """Test that the index agrees with splitting the whole file."""
+
+    @pytest.mark.parametrize("content", CONTENTS)
+    def test_ranges_match_split(self, tmp_path, content):
+        file = tmp_path / "file.txt"
+        file.write_text(content)
+        lines = content.split("\n")
+
+        index = LineIndex(file)
+
+        assert index.line_count == len(lines)
+        for start in range(1, len(lines) + 1):
+            for end in range(start, min(len(lines), start + 4) + 1):
+                assert index.read_lines(start, end) == "\n".join(lines[start - 1 : end])
+
+    def test_index_is_cached_until_the_file_changes(self, tmp_path):
+        file = tmp_path / "file.txt"
+        file.write_text("a\nb\n")
+
+        index = get_line_index(file)
+        assert get_line_index(file) is index
+
+        file.write_text("a\nb\nc\n")
+        stat = file.stat()
+        os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert get_line_index(file).line_count == 4
+
+
+class TestLargeFileView:
+    """Test TextEditor.view for files above the large file threshold."""
+
+    def test_ranged_view(self, tmp_path, large_editor):
+        file = tmp_path / "big.log"
+        file.write_text("".join(f"entry {i}\n" for i in range(1, 101)))
+
+        result = large_editor.view(file, [50, 52])
+
+        assert result == " 50 entry 50\n 51 entry 51\n 52 entry 52"
+
+    def test_ranged_view_to_end_of_file(self, tmp_path, large_editor):
+        file = tmp_path / "big.log"
+        file.write_text("a\nb\nc")
+
+        assert large_editor.view(file, [2, -1]) == "  2 b\n  3 c"
+        assert large_editor.view(file, [2, 99]) == "  2 b\n  3 c"
+
+    def test_invalid_range(self, tmp_path, large_editor):
+        file = tmp_path / "big.log"
+        file.write_text("a\nb\nc")
+
+        with pytest.raises(ValueError, match="start line `10`"):
+            large_editor.view(file, [10, 12])
+
+    def test_unranged_view_is_paged(self, tmp_path, large_editor):
+        file = tmp_path / "big.log"
+        file.write_text("".join(f"entry {i}\n" for i in range(1, 11)))
+
+        result = large_editor.view(file)
+
+        assert result.startswith("  1 entry 1\n  2 entry 2\n  3 entry 3\n\n")
+        assert "The file has 11 lines, showing lines 1-3" in result
+        assert "Use `view_range` [4, 6] to view the next page." in result
+
+    def test_unranged_view_of_a_single_page(self, tmp_path, large_editor):
+        file = tmp_path / "big.log"
+        file.write_text("a\nb")
+
+        assert large_editor.view(file) == "  1 a\n  2 b"
@@ -0,0 +1,189 @@
+"""
+Tests for file outlines.
+
+This test suite covers:
+1. Python outlines from the syntax tree
+2. Regex outlines of other languages
+3. The outline cache and the outline command
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.edit import outline
+from deer_code.tools.edit.content_cache import FileContentCache
+from deer_code.tools.edit.outline import Symbol, format_outline, get_outline
+from deer_code.tools.edit.path_validator import PathValidator
+from deer_code.tools.edit.text_editor import TextEditor
+
+PYTHON_SOURCE = '''\
+import os
+
+
+def top(a):
+    return a
+
+
+class Greeter:
+    """Says hello."""
+
+    @property
+    def name(self):
+        return "world"
+
+    async def greet(self):
+        def helper():
+            pass
+        return helper
+
+
+if os.name == "nt":
+    def windows_only():
+        pass
+'''
+
+
+@pytest.fixture
+def editor(tmp_path):
+    return TextEditor(
+        path_validator=PathValidator(project_root=tmp_path), content_cache=FileContentCache()
+    )
+
+
+class TestPythonOutline:
+    """Test outlines of Python files."""
+
+    def test_classes_functions_and_methods(self):
+        assert get_outline(PYTHON_SOURCE, ".py") == [
+            Symbol("function", "top", 4, 5, 0),
+            Symbol("class", "Greeter", 8, 18, 0),
+            Symbol("method", "name", 11, 13, 1),
+            Symbol("async method", "greet", 15, 18, 1),
+            Symbol("function", "helper", 16, 17, 2),
+            Symbol("function", "windows_only", 22, 23, 0),
+        ]
+
+    def test_syntax_errors_fall_back_to_indentation(self):
+        symbols = get_outline("class A:\n    def f(self):\n        x = (\n\ndef g():\n    pass\n", ".py")
+
+        assert symbols == [
+            Symbol("class", "A", 1, 4, 0),
+            Symbol("function", "f", 2, 4, 1),
+            Symbol("function", "g", 5, 6, 0),
+        ]
+
+
+class TestRegexOutline:
+    """Test the regex outlines of other languages."""
+
+    def test_typescript(self):
+        source = (
+            "export class Store {\n"
+            "  private items: string[] = [];\n"
+            "\n"
+            "  add(item: string): void {\n"
+            "    if (item) {\n"
+            '      this.items.push("}");\n'
+            "    }\n"
+            "  }\n"
+            "}\n"
+            "\n"
+            "export const load = async (url: string) => {\n"
+            "  return fetch(url);\n"
+            "};\n"
+        )
+
+        assert get_outline(source, ".ts") == [
+            Symbol("class", "Store", 1, 9, 0),
+            Symbol("method", "add", 4, 8, 1),
+            Symbol("function", "load", 11, 13, 0),
+        ]
+
+    def test_go_with_brace_on_the_next_line(self):
+        source = "type Server struct {\n\tport int\n}\n\nfunc (s *Server) Start()\n{\n\ts.run()\n}\n"
+
+        assert get_outline(source, ".go") == [
+            Symbol("type", "Server", 1, 3, 0),
+            Symbol("function", "Start", 5, 8, 0),
+        ]
+
+    def test_ruby_ends_at_the_next_sibling(self):
+        source = "class Dog\n  def bark\n    puts 1\n  end\n\n  def sit\n  end\nend\n"
+
+        assert get_outline(source, ".rb") == [
+            Symbol("class", "Dog", 1, 8, 0),
+            Symbol("method", "bark", 2, 5, 1),
+            Symbol("method", "sit", 6, 8, 1),
+        ]
+
+    def test_unsupported_language(self):
+        assert get_outline("hello", ".txt") is None
+
+
+class TestOutlineCache:
+    """Test that outlines are cached by content."""
+
+    def test_same_content_is_parsed_once(self, monkeypatch):
+        calls = []
+        parse = outline.outline_python
+        monkeypatch.setattr(outline, "outline_python", lambda content: calls.append(1) or parse(content))
+        source = "def cached_once():\n    pass\n"
+
+        first = get_outline(source, ".py")
+        second = get_outline(source, ".py")
+        get_outline(source + "\n", ".py")
+
+        assert first is second
+        assert len(calls) == 2
+
+    def test_cache_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(outline, "MAX_CACHED_OUTLINES", 2)
+
+        for index in range(5):
+            get_outline(f"def f{index}(): pass\n", ".py")
+
+        assert len(outline._cache) == 2
+
+
+class TestOutlineCommand:
+    """Test outline in TextEditor and the text_editor tool."""
+
+    def test_format(self):
+        assert format_outline(
+            [Symbol("class", "A", 1, 12, 0), Symbol("method", "f", 2, 3, 1)]
+        ) == " 1-12 class A\n 2-3    method f"
+
+    def test_editor_outline(self, tmp_path, editor):
+        test_file = tmp_path / "test.py"
+        test_file.write_text(PYTHON_SOURCE)
+        empty_file = tmp_path / "empty.py"
+        empty_file.write_text("x = 1\n")
+        text_file = tmp_path / "notes.txt"
+        text_file.write_text("notes\n")
+
+        assert editor.outline(test_file).startswith(" 4-5  function top\n 8-18 class Greeter\n")
+        assert editor.outline(empty_file) == f"No classes or functions found in {empty_file}."
+        with pytest.raises(ValueError, match="not supported for `.txt` files"):
+            editor.outline(text_file)
+
+    def test_outline_command(self, tmp_path, monkeypatch):
+        from deer_code.project import project
+        from deer_code.tools.edit.tool import text_editor_tool
+
+        monkeypatch.setattr(project, "_root_dir", str(tmp_path))
+        runtime = MagicMock()
+        runtime.state = {}
+        test_file = tmp_path / "test.py"
+        test_file.write_text(PYTHON_SOURCE)
+
+        result = text_editor_tool.func(runtime, command="outline", path=str(test_file))
+
+        assert result.startswith(f"Here's the outline of {test_file}:")
+        assert "async method greet" in result
@@ -0,0 +1,234 @@
+"""
+Tests for applying unified diffs.
+
+This test suite covers:
+1. Parsing single and multi-file diffs
+2. Applying hunks exactly, at an offset and with fuzz
+3. Multi-file patches through TextEditor and the patch tool
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.edit.content_cache import FileContentCache
+from deer_code.tools.edit import text_editor as text_editor_module
+from deer_code.tools.edit.patch import PatchError, PatchWriteError, apply_hunks, parse_patch
+from deer_code.tools.edit.path_validator import PathValidationError, PathValidator
+from deer_code.tools.edit.text_editor import TextEditor
+
+ORIGINAL = "".join(f"line {i}\n" for i in range(1, 11))
+
+SIMPLE_PATCH = """\
+--- a/file.txt
++++ b/file.txt
+@@ -3,3 +3,3 @@
+ line 3
+-line 4
++line four
+ line 5
+"""
+
+
+@pytest.fixture
+def editor(tmp_path):
+    return TextEditor(
+        path_validator=PathValidator(project_root=tmp_path), content_cache=FileContentCache()
+    )
+
+
+class TestParsePatch:
+    """Test parsing unified diffs."""
+
+    def test_git_prefixes_and_hunks(self):
+        (file_patch,) = parse_patch("diff --git a/file.txt b/file.txt\nindex 1..2 100644\n" + SIMPLE_PATCH)
+
+        assert file_patch.old_path == file_patch.new_path == "file.txt"
+        assert len(file_patch.hunks) == 1
+        assert file_patch.hunks[0].lines == [" line 3", "-line 4", "+line four", " line 5"]
+
+    def test_creation_and_deletion(self):
+        patches = parse_patch(
+            "--- /dev/null\n+++ b/new.txt\n@@ -0,0 +1 @@\n+hello\n"
+            "--- a/old.txt\n+++ /dev/null\n@@ -1 +0,0 @@\n-bye\n"
+        )
+
+        assert patches[0].is_creation and patches[0].path == "new.txt"
+        assert patches[1].is_deletion and patches[1].path == "old.txt"
+
+    def test_malformed_patches(self):
+        with pytest.raises(PatchError, match="No file changes"):
+            parse_patch("just some text")
+        with pytest.raises(PatchError, match="shorter than its header"):
+            parse_patch("--- a/f\n+++ b/f\n@@ -1,3 +1,3 @@\n line\n")
+
+
+class TestApplyHunks:
+    """Test applying hunks to content."""
+
+    def test_exact(self):
+        content, results = apply_hunks(ORIGINAL, parse_patch(SIMPLE_PATCH)[0].hunks)
+
+        assert content == ORIGINAL.replace("line 4\n", "line four\n")
+        assert results[0].describe() == "hunk 1 applied at line 3"
+
+    def test_offset(self):
+        content, results = apply_hunks("new\n" * 5 + ORIGINAL, parse_patch(SIMPLE_PATCH)[0].hunks)
+
+        assert "line four" in content
+        assert results[0].offset == 5
+
+    def test_fuzz(self):
+        changed = ORIGINAL.replace("line 3\n", "line three\n")
+
+        content, results = apply_hunks(changed, parse_patch(SIMPLE_PATCH)[0].hunks)
+
+        assert content == changed.replace("line 4\n", "line four\n")
+        assert results[0].fuzz == 1
+
+    def test_failed_hunk(self):
+        content, results = apply_hunks("nothing here\n", parse_patch(SIMPLE_PATCH)[0].hunks)
+
+        assert content is None
+        assert results[0].describe() == "hunk 1 FAILED: no match near line 3"
+
+    def test_no_newline_at_end_of_file(self):
+        patch = "--- a/f\n+++ b/f\n@@ -1 +1 @@\n-a\n\\ No newline at end of file\n+b\n"
+
+        content, _ = apply_hunks("a", parse_patch(patch)[0].hunks)
+
+        assert content == "b\n"
+
+
+class TestEditorApplyPatch:
+    """Test applying multi-file patches with TextEditor."""
+
+    def test_creates_modifies_deletes_and_renames(self, tmp_path, editor):
+        (tmp_path / "file.txt").write_text(ORIGINAL)
+        (tmp_path / "old.txt").write_text("bye\n")
+        (tmp_path / "moved.txt").write_text("keep\n")
+        patch = (
+            SIMPLE_PATCH
+            + "--- /dev/null\n+++ b/pkg/new.txt\n@@ -0,0 +1,2 @@\n+hello\n+world\n"
+            + "--- a/old.txt\n+++ /dev/null\n@@ -1 +0,0 @@\n-bye\n"
+            + "--- a/moved.txt\n+++ b/renamed.txt\n@@ -1 +1 @@\n-keep\n+kept\n"
+        )
+
+        applied, results = editor.apply_patch(patch, tmp_path)
+
+        assert applied
+        assert [result.action for result in results] == ["modified", "created", "deleted", "renamed"]
+        assert "line four" in (tmp_path / "file.txt").read_text()
+        assert (tmp_path / "pkg" / "new.txt").read_text() == "hello\nworld\n"
+        assert not (tmp_path / "old.txt").exists()
+        assert not (tmp_path / "moved.txt").exists()
+        assert (tmp_path / "renamed.txt").read_text() == "kept\n"
+
+    def test_nothing_is_written_if_a_hunk_fails(self, tmp_path, editor):
+        (tmp_path / "file.txt").write_text(ORIGINAL)
+        (tmp_path / "other.txt").write_text("something else\n")
+        patch = SIMPLE_PATCH + SIMPLE_PATCH.replace("file.txt", "other.txt")
+
+        applied, results = editor.apply_patch(patch, tmp_path)
+
+        assert not applied
+        assert results[0].ok and not results[1].ok
+        assert (tmp_path / "file.txt").read_text() == ORIGINAL
+
+    def test_written_files_are_restored_if_a_write_fails(self, tmp_path, editor, monkeypatch):
+        (tmp_path / "file.txt").write_text(ORIGINAL)
+        (tmp_path / "other.txt").write_text(ORIGINAL)
+        (tmp_path / "old.txt").write_text("bye\n")
+        patch = (
+            SIMPLE_PATCH
+            + "--- /dev/null\n+++ b/new.txt\n@@ -0,0 +1 @@\n+hello\n"
+            + "--- a/old.txt\n+++ /dev/null\n@@ -1 +0,0 @@\n-bye\n"
+            + SIMPLE_PATCH.replace("file.txt", "other.txt")
+        )
+        atomic_write_text = text_editor_module.atomic_write_text
+
+        def fail_on_other(path, content, **kwargs):
+            if path.name == "other.txt" and content != ORIGINAL:
+                raise OSError(28, "No space left on device")
+            atomic_write_text(path, content, **kwargs)
+
+        monkeypatch.setattr(text_editor_module, "atomic_write_text", fail_on_other)
+
+        with pytest.raises(PatchWriteError, match="No file was changed") as error:
+            editor.apply_patch(patch, tmp_path)
+
+        assert str(tmp_path / "other.txt") not in error.value.changed
+        assert (tmp_path / "file.txt").read_text() == ORIGINAL
+        assert (tmp_path / "other.txt").read_text() == ORIGINAL
+        assert (tmp_path / "old.txt").read_text() == "bye\n"
+        assert not (tmp_path / "new.txt").exists()
+        assert len(editor.journal) == 0
+
+    def test_creating_an_existing_file_fails(self, tmp_path, editor):
+        (tmp_path / "new.txt").write_text("exists\n")
+
+        applied, results = editor.apply_patch(
+            "--- /dev/null\n+++ b/new.txt\n@@ -0,0 +1 @@\n+hello\n", tmp_path
+        )
+
+        assert not applied
+        assert "already exists" in results[0].describe()
+
+    def test_paths_are_validated(self, tmp_path, editor):
+        with pytest.raises(PathValidationError):
+            editor.apply_patch(SIMPLE_PATCH.replace("a/file.txt", "a/../outside.txt"), tmp_path)
+
+
+class TestPatchTool:
+    """Test the patch tool."""
+
+    def test_patch_tool(self, tmp_path, monkeypatch):
+        from deer_code.project import project
+        from deer_code.tools.edit.tool import patch_tool
+
+        monkeypatch.setattr(project, "_root_dir", str(tmp_path))
+        (tmp_path / "file.txt").write_text(ORIGINAL)
+        runtime = MagicMock()
+        runtime.state = {}
+
+        result = patch_tool.func(runtime, SIMPLE_PATCH)
+        failed = patch_tool.func(runtime, SIMPLE_PATCH)
+
+        assert result.startswith("Successfully patched 1 files:")
+        assert "file.txt (modified): hunk 1 applied at line 3" in result
+        assert failed.startswith("Error: the patch was not applied")
+
+    def test_files_left_changed_are_reported(self, tmp_path, monkeypatch):
+        from deer_code.project import project
+        from deer_code.tools.edit import tool as tool_module
+
+        monkeypatch.setattr(project, "_root_dir", str(tmp_path))
+        (tmp_path / "file.txt").write_text(ORIGINAL)
+        (tmp_path / "other.txt").write_text(ORIGINAL)
+        noted = []
+        monkeypatch.setattr(tool_module, "_note_written", noted.extend)
+        atomic_write_text = text_editor_module.atomic_write_text
+
+        def fail_on_other_and_restore(path, content, **kwargs):
+            if path.name == "other.txt" or content == ORIGINAL:
+                raise OSError(28, "No space left on device")
+            atomic_write_text(path, content, **kwargs)
+
+        monkeypatch.setattr(text_editor_module, "atomic_write_text", fail_on_other_and_restore)
+        runtime = MagicMock()
+        runtime.state = {}
+
+        result = tool_module.patch_tool.func(
+            runtime, SIMPLE_PATCH + SIMPLE_PATCH.replace("file.txt", "other.txt")
+        )
+
+        assert result.startswith("Error: the patch was not applied")
+        assert f"could not be restored: {tmp_path / 'file.txt'}" in result
+        assert noted == [str(tmp_path / "file.txt")]
+        assert "line four" in (tmp_path / "file.txt").read_text()
@@ -315,3 +315,110 @@ class TestPathValidatorIsSafeMethod:
 
         assert is_safe is True
         assert error is None
+
+
+class TestPathValidatorCache:
+    """Test the cache of resolved directories."""
+
+    def test_parent_directory_is_resolved_once(self, tmp_path, monkeypatch):
+        """Test that files in the same directory reuse its resolved form."""
+        validator = PathValidator(project_root=tmp_path)
+        (tmp_path / "a.txt").write_text("a")
+        (tmp_path / "b.txt").write_text("b")
+        calls = []
+        original_resolve = Path.resolve
+        monkeypatch.setattr(
+            Path, "resolve", lambda self, strict=False: calls.append(self) or original_resolve(self, strict)
+        )
+
+        validator.validate(tmp_path / "a.txt")
+        validator.validate(tmp_path / "b.txt")
+        validator.validate(tmp_path / "c.txt", allow_nonexistent=True)
+
+        assert calls == [tmp_path]
+
+    def test_replaced_symlink_is_noticed(self, tmp_path):
+        """Test that a cached directory is not trusted once its symlink changes."""
+        project = tmp_path / "project"
+        inside = project / "inside"
+        inside.mkdir(parents=True)
+        outside = tmp_path / "outside"
+        outside.mkdir()
+        (inside / "file.txt").write_text("inside")
+        (outside / "file.txt").write_text("outside")
+        link = project / "link"
+        link.symlink_to(inside)
+        validator = PathValidator(project_root=project)
+
+        assert validator.validate(link / "file.txt") == (inside / "file.txt").resolve()
+
+        link.unlink()
+        link.symlink_to(outside)
+
+        with pytest.raises(PathValidationError, match="outside project root"):
+            validator.validate(link / "file.txt")
+
+    def test_symlinked_file_is_resolved(self, tmp_path):
+        """Test that a symlink as last component is followed, not cached."""
+        project = tmp_path / "project"
+        project.mkdir()
+        (tmp_path / "secret.txt").write_text("secret")
+        (project / "file.txt").symlink_to(tmp_path / "secret.txt")
+        validator = PathValidator(project_root=project)
+
+        with pytest.raises(PathValidationError, match="outside project root"):
+            validator.validate(project / "file.txt")
+
+    def test_invalidate(self, tmp_path):
+        """Test forgetting the directories under a changed path."""
+        validator = PathValidator(project_root=tmp_path)
+        (tmp_path / "src").mkdir()
+        validator.validate(tmp_path / "src" / "new.py", allow_nonexistent=True)
+        validator.validate(tmp_path / "new.py", allow_nonexistent=True)
+
+        validator.invalidate([str(tmp_path / "src")])
+        assert list(validator._directories) == [str(tmp_path)]
+
+        validator.invalidate()
+        assert not validator._directories
+
+
+class TestPathValidatorBatch:
+    """Test validate_many() and the shared validators."""
+
+    def test_validate_many(self, tmp_path):
+        """Test that every path is resolved, in order."""
+        validator = PathValidator(project_root=tmp_path)
+        paths = [tmp_path / "b.txt", tmp_path / "sub" / "a.txt"]
+
+        assert validator.validate_many(paths, allow_nonexistent=True) == [
+            path.resolve() for path in paths
+        ]
+
+    def test_validate_many_reports_every_failure(self, tmp_path):
+        """Test that all failing paths are listed in one error."""
+        project = tmp_path / "project"
+        project.mkdir()
+        validator = PathValidator(project_root=project)
+
+        with pytest.raises(PathValidationError) as exc_info:
+            validator.validate_many(
+                [project / "ok.txt", tmp_path / "one.txt", tmp_path / "two.txt"],
+                allow_nonexistent=True,
+            )
+
+        assert "one.txt" in str(exc_info.value)
+        assert "two.txt" in str(exc_info.value)
+
+    def test_get_path_validator_is_shared_per_project_root(self, tmp_path, monkeypatch):
+        """Test that the shared validator follows project.root_dir."""
+        from deer_code.project import project
+        from deer_code.tools.edit.path_validator import get_path_validator
+
+        monkeypatch.setattr(project, "_root_dir", str(tmp_path))
+
+        validator = get_path_validator()
+
+        assert validator is get_path_validator(tmp_path)
+        assert validator.project_root == tmp_path.resolve()
+        assert get_path_validator(tmp_path / ".") is validator
@@ -207,6 +207,71 @@ class TestTextEditorStrReplace:
             editor.str_replace(tmp_path, "old", "new")
 
 
+class TestTextEditorMultiEdit:
+    """Test applying several replacements at once."""
+
+    def test_multi_edit_applies_all_edits(self, tmp_path, editor):
+        """Test that every edit is applied in a single write."""
+        test_file = tmp_path / "test.py"
+        test_file.write_text("def foo():\n    return 1\n\n\ndef bar():\n    return 2\n")
+
+        count = editor.multi_edit(
+            test_file,
+            [("def bar():", "def baz():"), ("return 1", "return 10"), ("    return 2\n", None)],
+        )
+
+        assert count == 3
+        assert test_file.read_text() == "def foo():\n    return 10\n\n\ndef baz():\n"
+
+    def test_multi_edit_matches_original_content(self, tmp_path, editor):
+        """Test that an edit does not see the output of another edit."""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("a b")
+
+        editor.multi_edit(test_file, [("a", "b"), ("b", "c")])
+
+        assert test_file.read_text() == "b c"
+
+    def test_multi_edit_is_all_or_nothing(self, tmp_path, editor):
+        """Test that nothing is written when one edit is invalid."""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("foo bar foo")
+
+        with pytest.raises(ValueError, match="Edit 2: String is not unique"):
+            editor.multi_edit(test_file, [("bar", "baz"), ("foo", "qux")])
+        with pytest.raises(ValueError, match="Edit 2: String not found"):
+            editor.multi_edit(test_file, [("bar", "baz"), ("missing", "qux")])
+
+        assert test_file.read_text() == "foo bar foo"
+
+    def test_multi_edit_rejects_overlapping_edits(self, tmp_path, editor):
+        """Test that overlapping edits are rejected."""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("Hello World")
+
+        with pytest.raises(ValueError, match="Edits 1 and 2 overlap"):
+            editor.multi_edit(test_file, [("Hello W", "Hi"), ("World", "Earth")])
+
+    def test_multi_edit_requires_edits(self, tmp_path, editor):
+        """Test that an empty list of edits is rejected."""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("Hello World")
+
+        with pytest.raises(ValueError, match="No edits"):
+            editor.multi_edit(test_file, [])
+
+    def test_multi_edit_keeps_file_mode(self, tmp_path, editor):
+        """Test that rewriting a file keeps its permissions."""
+        test_file = tmp_path / "script.sh"
+        test_file.write_text("echo hello\n")
+        test_file.chmod(0o755)
+
+        editor.multi_edit(test_file, [("hello", "world")])
+
+        assert test_file.stat().st_mode & 0o777 == 0o755
+        assert [path.name for path in tmp_path.iterdir()] == ["script.sh"]
+
+
 class TestTextEditorInsert:
     """Test text insertion functionality."""
 
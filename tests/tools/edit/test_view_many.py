@@ -0,0 +1,144 @@
+"""
+Tests for viewing several files at once.
+
+This test suite covers:
+1. Paths, ranges and globs
+2. Splitting the character budget between files
+3. view_many in the text_editor tool
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.edit import text_editor
+from deer_code.tools.edit.content_cache import FileContentCache
+from deer_code.tools.edit.path_validator import PathValidationError, PathValidator
+from deer_code.tools.edit.text_editor import TextEditor, _allocate_budget
+
+
+@pytest.fixture
+def editor(tmp_path):
+    return TextEditor(
+        path_validator=PathValidator(project_root=tmp_path), content_cache=FileContentCache()
+    )
+
+
+def write_lines(path: Path, count: int, prefix: str = "line"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"{prefix} {index}\n" for index in range(1, count + 1)))
+
+
+class TestAllocateBudget:
+    """Test splitting the budget between files."""
+
+    def test_everything_fits(self):
+        assert _allocate_budget([10, 20, 30], 100) == [10, 20, 30]
+
+    def test_small_files_are_kept_whole(self):
+        # 10 fits in a third of 100; the other two share 90 by size
+        assert _allocate_budget([10, 200, 400], 100) == [10, 30, 60]
+
+
+class TestViewMany:
+    """Test TextEditor.view_many."""
+
+    def test_paths_and_ranges(self, tmp_path, editor):
+        write_lines(tmp_path / "a.txt", 3)
+        write_lines(tmp_path / "b.txt", 10)
+
+        result = editor.view_many([(tmp_path / "a.txt", None), (tmp_path / "b.txt", [4, 5])])
+
+        assert result == (
+            f"==> {tmp_path / 'a.txt'} <==\n  1 line 1\n  2 line 2\n  3 line 3\n"
+            f"\n"
+            f"==> {tmp_path / 'b.txt'} (lines 4-5 of 10) <==\n  4 line 4\n  5 line 5"
+        )
+
+    def test_globs_skip_ignored_directories(self, tmp_path, editor):
+        write_lines(tmp_path / "src" / "pkg" / "one.py", 1)
+        write_lines(tmp_path / "src" / "two.py", 1)
+        write_lines(tmp_path / "src" / "node_modules" / "dep.py", 1)
+        write_lines(tmp_path / "src" / "notes.txt", 1)
+
+        result = editor.view_many([(tmp_path / "src" / "**" / "*.py", None)])
+
+        assert f"==> {tmp_path / 'src' / 'pkg' / 'one.py'} <==" in result
+        assert f"==> {tmp_path / 'src' / 'two.py'} <==" in result
+        assert "dep.py" not in result
+        assert "notes.txt" not in result
+
+    def test_large_files_are_truncated_with_a_note(self, tmp_path, editor):
+        write_lines(tmp_path / "small.txt", 2)
+        write_lines(tmp_path / "big.txt", 1000)
+
+        result = editor.view_many(
+            [(tmp_path / "small.txt", None), (tmp_path / "big.txt", None)], budget=500
+        )
+
+        assert "  2 line 2" in result
+        assert f"==> {tmp_path / 'big.txt'} (lines 1-" in result
+        assert "more lines" in result and "Use `view` with `view_range`" in result
+        assert len(result) < 1000
+
+    def test_errors_are_reported_per_file(self, tmp_path, editor):
+        write_lines(tmp_path / "a.txt", 1)
+
+        result = editor.view_many([(tmp_path / "missing.txt", None), (tmp_path / "a.txt", None)])
+
+        assert f"==> {tmp_path / 'missing.txt'} <==\nError: File does not exist" in result
+        assert "  1 line 1" in result
+
+    def test_security_and_empty_globs_fail(self, tmp_path, editor):
+        with pytest.raises(PathValidationError):
+            editor.view_many([(tmp_path / ".." / "outside.txt", None)])
+        with pytest.raises(ValueError, match="No files match"):
+            editor.view_many([(tmp_path / "*.rs", None)])
+
+    def test_number_of_files_is_capped(self, tmp_path, editor, monkeypatch):
+        monkeypatch.setattr(text_editor, "VIEW_MANY_MAX_FILES", 2)
+        for index in range(3):
+            write_lines(tmp_path / f"{index}.txt", 1)
+
+        result = editor.view_many([(tmp_path / "*.txt", None)])
+
+        assert result.endswith("[1 more files omitted. View at most 2 files at once.]")
+
+    def test_counts_as_a_view_for_conflict_detection(self, tmp_path, editor):
+        test_file = tmp_path / "a.txt"
+        test_file.write_text("hello\n")
+
+        editor.view_many([(test_file, None)])
+
+        assert str(test_file.resolve()) in editor._versions
+
+
+class TestViewManyTool:
+    """Test the view_many command of the text_editor tool."""
+
+    def test_relative_files_and_globs(self, tmp_path, monkeypatch):
+        from deer_code.project import project
+        from deer_code.tools.edit.tool import text_editor_tool
+
+        monkeypatch.setattr(project, "_root_dir", str(tmp_path))
+        runtime = MagicMock()
+        runtime.state = {}
+        write_lines(tmp_path / "pkg" / "a.py", 2)
+        write_lines(tmp_path / "README.md", 5)
+
+        result = text_editor_tool.func(
+            runtime,
+            command="view_many",
+            path=str(tmp_path),
+            files=[{"path": "pkg/*.py"}, {"path": "README.md", "view_range": [2, 3]}],
+        )
+
+        assert result.startswith("Here's the result of running `cat -n` on the files:")
+        assert f"==> {tmp_path / 'pkg' / 'a.py'} <==" in result
+        assert f"==> {tmp_path / 'README.md'} (lines 2-3 of 5) <==" in result
@@ -0,0 +1,155 @@
+"""
+Tests for whitespace-tolerant matching.
+
+This test suite covers:
+1. Finding spans while ignoring indentation and whitespace
+2. Ambiguous and missing matches
+3. str_replace with ignore_whitespace in TextEditor and the text_editor tool
+"""
+
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.edit.content_cache import FileContentCache
+from deer_code.tools.edit.path_validator import PathValidator
+from deer_code.tools.edit.text_editor import TextEditor
+from deer_code.tools.edit.whitespace_match import find_ignoring_whitespace
+
+SOURCE = """\
+class Greeter:
+    def greet(self, name):
+        message = "hello,  " + name
+        print(message)
+        return message
+"""
+
+
+@pytest.fixture
+def editor(tmp_path):
+    return TextEditor(
+        path_validator=PathValidator(project_root=tmp_path), content_cache=FileContentCache()
+    )
+
+
+class TestFindIgnoringWhitespace:
+    """Test find_ignoring_whitespace."""
+
+    def test_different_indentation(self):
+        text = "  message = \"hello,  \" + name\n  print(message)\n"
+
+        (match,) = find_ignoring_whitespace(SOURCE, text)
+
+        assert SOURCE[match.start : match.end] == (
+            '        message = "hello,  " + name\n        print(message)\n'
+        )
+        assert (match.start_line, match.end_line) == (3, 5)
+
+    def test_partial_first_and_last_lines(self):
+        (match,) = find_ignoring_whitespace(SOURCE, "name):\n message =")
+
+        assert SOURCE[match.start : match.end] == "name):\n        message ="
+
+    def test_collapsed_inner_whitespace_and_trailing_spaces(self):
+        content = "x  =   compute( a,b )   \ny = 2\n"
+
+        (match,) = find_ignoring_whitespace(content, "x = compute( a,b )\ny = 2")
+
+        assert content[match.start : match.end] == "x  =   compute( a,b )   \ny = 2"
+
+    def test_single_line_with_indentation(self):
+        (match,) = find_ignoring_whitespace(SOURCE, "\treturn   message")
+
+        assert match.start_line == 5
+        assert SOURCE[match.start : match.end] == "        return message"
+
+    def test_several_matches(self):
+        content = "if a:\n    pass\nif b:\n    pass\n"
+
+        matches = find_ignoring_whitespace(content, "\tpass")
+
+        assert [(match.start_line, match.end_line) for match in matches] == [(2, 2), (4, 4)]
+
+    def test_no_match(self):
+        assert find_ignoring_whitespace(SOURCE, "print(message)\nreturn None") == []
+        assert find_ignoring_whitespace(SOURCE, "  \n\t") == []
+
+    def test_long_interior_in_a_large_file(self):
+        block = [f"    value_{index} = {index}" for index in range(50)]
+        content = "\n".join(["def f():"] + block * 3 + ["    marker = 1"] + block) + "\n"
+        text = "\n".join(line.strip() for line in block[20:]) + "\nmarker = 1"
+
+        (match,) = find_ignoring_whitespace(content, text)
+
+        assert match.end_line == 152
+        assert content[match.start : match.end].endswith("    marker = 1")
+
+
+class TestTextEditorStrReplaceIgnoringWhitespace:
+    """Test str_replace with ignore_whitespace."""
+
+    def test_replaces_the_unique_match(self, tmp_path, editor):
+        test_file = tmp_path / "greeter.py"
+        test_file.write_text(SOURCE)
+
+        occurrences = editor.str_replace(
+            test_file,
+            "print(message)\n  return message",
+            "return message",
+            ignore_whitespace=True,
+        )
+
+        assert occurrences == 1
+        assert test_file.read_text() == SOURCE.replace(
+            "print(message)\n        return message", "return message"
+        )
+
+    def test_exact_matches_are_preferred(self, tmp_path, editor):
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("a b\na  b\n")
+
+        assert editor.str_replace(test_file, "a b", "c", ignore_whitespace=True) == 1
+        assert test_file.read_text() == "c\na  b\n"
+
+    def test_ambiguous_match_changes_nothing(self, tmp_path, editor):
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("a  b\na   b\n")
+
+        with pytest.raises(ValueError, match="not unique in file when whitespace is ignored.*lines 1-1, 2-2"):
+            editor.str_replace(test_file, "a b", "c", ignore_whitespace=True)
+        assert test_file.read_text() == "a  b\na   b\n"
+
+    def test_disabled_by_default(self, tmp_path, editor):
+        test_file = tmp_path / "greeter.py"
+        test_file.write_text(SOURCE)
+
+        with pytest.raises(ValueError, match="String not found"):
+            editor.str_replace(test_file, "\treturn   message", "pass")
+
+    def test_tool_option(self, tmp_path, monkeypatch):
+        from deer_code.project import project
+        from deer_code.tools.edit.tool import text_editor_tool
+
+        monkeypatch.setattr(project, "_root_dir", str(tmp_path))
+        runtime = MagicMock()
+        runtime.state = {}
+        test_file = tmp_path / "greeter.py"
+        test_file.write_text(SOURCE)
+
+        result = text_editor_tool.func(
+            runtime,
+            command="str_replace",
+            path=str(test_file),
+            old_str="  print(message)\n  return  message",
+            new_str="        print(message, flush=True)\n        return message",
+            ignore_whitespace=True,
+        )
+
+        assert result.startswith("Successfully replaced 1 occurrences")
+        assert "        print(message, flush=True)\n" in test_file.read_text()
@@ -0,0 +1,238 @@
+"""
+Tests for the session-scoped fs tool result cache.
+
+This test suite covers:
+1. Hits, misses and LRU eviction
+2. Invalidation by change generation and directory mtimes
+3. Invalidation of the results affected by changed paths
+4. Integration with the ls, tree and grep tools
+"""
+
+import os
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.fs.cache import FsResultCache
+
+
+class TestFsResultCache:
+    """Test the FsResultCache class."""
+
+    def test_miss_then_hit(self):
+        cache = FsResultCache()
+
+        assert cache.get(("ls", "/a")) is None
+        cache.put(("ls", "/a"), "result")
+
+        assert cache.get(("ls", "/a")) == "result"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_invalidate_bumps_generation(self):
+        cache = FsResultCache()
+        cache.put(("grep", "x"), "result")
+
+        cache.invalidate()
+
+        assert cache.get(("grep", "x")) is None
+        assert cache.stats()["generation"] == 1
+
+    def test_watched_directory_change_invalidates(self, tmp_path):
+        cache = FsResultCache()
+        cache.put(("ls", str(tmp_path)), "result", watch=[tmp_path])
+        assert cache.get(("ls", str(tmp_path))) == "result"
+
+        (tmp_path / "new.txt").write_text("x")
+        # Make sure the mtime changes even on coarse-grained filesystems
+        stat = os.stat(tmp_path)
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+        assert cache.get(("ls", str(tmp_path))) is None
+
+    def test_invalidate_paths_drops_overlapping_scopes(self, tmp_path):
+        cache = FsResultCache()
+        src, docs = str(tmp_path / "src"), str(tmp_path / "docs")
+        cache.put(("ls", src), "src", scope=src)
+        cache.put(("ls", docs), "docs", scope=docs)
+        cache.put(("tree", str(tmp_path)), "tree", scope=str(tmp_path))
+        cache.put(("unscoped",), "unscoped")
+
+        dropped = cache.invalidate_paths([str(tmp_path / "src" / "app.py")])
+
+        assert dropped == 3
+        assert cache.get(("ls", docs)) == "docs"
+        assert cache.stats()["generation"] == 0
+
+    def test_invalidate_paths_drops_results_inside_changed_directory(self, tmp_path):
+        cache = FsResultCache()
+        nested = str(tmp_path / "src" / "pkg")
+        cache.put(("ls", nested), "pkg", scope=nested)
+
+        cache.invalidate_paths([str(tmp_path / "src")])
+
+        assert cache.get(("ls", nested)) is None
+
+    def test_invalidate_outside(self, tmp_path):
+        cache = FsResultCache()
+        inside = str(tmp_path / "project" / "src")
+        cache.put(("ls", inside), "inside", scope=inside)
+        cache.put(("ls", "/"), "outside", scope="/")
+
+        cache.invalidate_outside(str(tmp_path / "project"))
+
+        assert cache.get(("ls", inside)) == "inside"
+        assert cache.get(("ls", "/")) is None
+
+    def test_evicts_least_recently_used(self):
+        cache = FsResultCache(max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert cache.get("c") == "3"
+
+
+class TestLsToolCache:
+    """Test that ls_tool serves repeated calls from the cache."""
+
+    @pytest.fixture
+    def runtime(self):
+        runtime = MagicMock()
+        runtime.state = {}
+        return runtime
+
+    def test_repeated_ls_is_cached(self, tmp_path, runtime, monkeypatch):
+        from deer_code.tools.fs import ls as ls_module
+
+        cache = FsResultCache()
+        monkeypatch.setattr(ls_module, "fs_cache", cache)
+        (tmp_path / "file.txt").write_text("x")
+
+        first = ls_module.ls_tool.func(runtime, path=str(tmp_path))
+        second = ls_module.ls_tool.func(runtime, path=str(tmp_path))
+
+        assert first == second
+        assert "file.txt" in first
+        assert cache.stats()["hits"] == 1
+
+    def test_ls_after_invalidate_sees_new_files(self, tmp_path, runtime, monkeypatch):
+        from deer_code.tools.fs import ls as ls_module
+
+        cache = FsResultCache()
+        monkeypatch.setattr(ls_module, "fs_cache", cache)
+        ls_module.ls_tool.func(runtime, path=str(tmp_path))
+
+        (tmp_path / "created.txt").write_text("x")
+        cache.invalidate()
+
+        assert "created.txt" in ls_module.ls_tool.func(runtime, path=str(tmp_path))
+
+    def test_ls_after_gitignore_edit(self, tmp_path, runtime, monkeypatch):
+        from deer_code.project import project
+        from deer_code.tools.fs import ls as ls_module
+
+        monkeypatch.setattr(ls_module, "fs_cache", FsResultCache())
+        monkeypatch.setattr(project, "_root_dir", str(tmp_path))
+        sub = tmp_path / "sub"
+        sub.mkdir()
+        (sub / "secret.txt").write_text("x")
+        (tmp_path / ".gitignore").write_text("")
+        assert "secret.txt" in ls_module.ls_tool.func(runtime, path=str(sub))
+
+        # Edited in place, so neither directory's mtime changes
+        gitignore = tmp_path / ".gitignore"
+        gitignore.write_text("secret.txt\n")
+        mtime = gitignore.stat().st_mtime_ns + 1_000_000_000
+        os.utime(gitignore, ns=(mtime, mtime))
+
+        assert "secret.txt" not in ls_module.ls_tool.func(runtime, path=str(sub))
+
+
+class TestTreeToolCache:
+    """Test that tree_tool only caches trees the project watcher keeps fresh."""
+
+    @pytest.fixture
+    def tree_module(self, monkeypatch):
+        from deer_code.tools.fs import tree as tree_module
+
+        monkeypatch.setattr(tree_module, "fs_cache", FsResultCache())
+        return tree_module
+
+    def test_tree_without_watcher_sees_changes_in_subdirectories(self, tmp_path, tree_module):
+        runtime = MagicMock()
+        runtime.state = {}
+        (tmp_path / "sub").mkdir()
+        tree_module.tree_tool.func(runtime, path=str(tmp_path))
+
+        (tmp_path / "sub" / "added.txt").write_text("x")
+
+        assert "added.txt" in tree_module.tree_tool.func(runtime, path=str(tmp_path))
+        assert tree_module.fs_cache.stats()["entries"] == 0
+
+    def test_tree_under_watcher_is_cached(self, tmp_path, tree_module, monkeypatch):
+        from deer_code.watcher import ProjectWatcher
+
+        runtime = MagicMock()
+        runtime.state = {}
+        watcher = ProjectWatcher(str(tmp_path))
+        monkeypatch.setattr(tree_module, "get_project_watcher", lambda: watcher)
+        (tmp_path / "a.txt").write_text("x")
+
+        first = tree_module.tree_tool.func(runtime, path=str(tmp_path))
+        second = tree_module.tree_tool.func(runtime, path=str(tmp_path))
+
+        assert first == second
+        assert tree_module.fs_cache.stats()["hits"] == 1
+
+
+class TestGrepToolCache:
+    """Test that grep_tool only caches results the project watcher keeps fresh."""
+
+    @pytest.fixture
+    def grep_module(self, tmp_path, monkeypatch):
+        # Load config.yaml from the working directory before leaving it
+        import deer_code.config  # noqa: F401
+        from deer_code.project import project
+        from deer_code.tools.fs import grep as grep_module
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(project, "_root_dir", str(tmp_path))
+        monkeypatch.setattr(grep_module, "fs_cache", FsResultCache())
+        return grep_module
+
+    def test_grep_without_watcher_sees_outside_edits(self, tmp_path, grep_module):
+        runtime = MagicMock()
+        runtime.state = {}
+        (tmp_path / "a.txt").write_text("needle\n")
+        grep_module.grep_tool.func(runtime, pattern="needle", path=str(tmp_path))
+
+        # Changed without the agent, so nothing invalidates the cache
+        (tmp_path / "b.txt").write_text("needle\n")
+
+        assert "b.txt" in grep_module.grep_tool.func(runtime, pattern="needle", path=str(tmp_path))
+        assert grep_module.fs_cache.stats()["entries"] == 0
+
+    def test_grep_under_watcher_is_cached(self, tmp_path, grep_module, monkeypatch):
+        runtime = MagicMock()
+        runtime.state = {}
+        from deer_code.watcher import ProjectWatcher
+
+        watcher = ProjectWatcher(str(tmp_path))
+        monkeypatch.setattr(grep_module, "get_project_watcher", lambda: watcher)
+        (tmp_path / "a.txt").write_text("needle\n")
+
+        first = grep_module.grep_tool.func(runtime, pattern="needle", path=str(tmp_path))
+        second = grep_module.grep_tool.func(runtime, pattern="needle", path=str(tmp_path))
+
+        assert first == second
+        assert grep_module.fs_cache.stats()["hits"] == 1
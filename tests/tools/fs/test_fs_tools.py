@@ -154,6 +154,108 @@ class TestTreeGeneration:
             pass
 
 
+class TestTreeWalker:
+    """Test the scandir-based tree walker."""
+
+    def test_symlink_loop_is_not_followed(self, tmp_path):
+        from deer_code.tools.fs.tree import generate_tree
+
+        nested = tmp_path / "a" / "b"
+        nested.mkdir(parents=True)
+        (nested / "back").symlink_to(tmp_path, target_is_directory=True)
+
+        lines = generate_tree(tmp_path, max_depth=10)
+
+        assert lines == ["└── a/", "    └── b/", "        └── back/"]
+
+    def test_output_matches_serial_layout(self, tmp_path):
+        from deer_code.tools.fs.tree import generate_tree
+
+        for name in ["beta", "Alpha", "gamma"]:
+            directory = tmp_path / name
+            directory.mkdir()
+            (directory / "file.txt").write_text("x")
+        (tmp_path / "readme.md").write_text("x")
+
+        lines = generate_tree(tmp_path, workers=4)
+
+        assert lines == [
+            "├── Alpha/",
+            "│   └── file.txt",
+            "├── beta/",
+            "│   └── file.txt",
+            "├── gamma/",
+            "│   └── file.txt",
+            "└── readme.md",
+        ]
+
+    def test_walk_tree_lists_only_needed_levels(self, tmp_path):
+        from deer_code.tools.fs.ignore import IgnoreMatcher
+        from deer_code.tools.fs.tree import walk_tree
+
+        (tmp_path / "one" / "two" / "three").mkdir(parents=True)
+
+        listings = walk_tree(tmp_path, max_depth=2, matcher=IgnoreMatcher([]))
+
+        assert set(listings) == {str(tmp_path), str(tmp_path / "one")}
+
+
+class TestBudgetedTree:
+    """Test per-directory caps and character budgets for tree output."""
+
+    @pytest.fixture
+    def data_dir(self, tmp_path):
+        for i in range(20):
+            (tmp_path / f"record_{i:02d}.json").write_text("x" * 100)
+        (tmp_path / "loader.py").write_text("code")
+        (tmp_path / "schemas").mkdir()
+        return tmp_path
+
+    def test_caps_entries_and_summarizes_the_rest(self, data_dir):
+        from deer_code.tools.fs.tree import generate_tree
+
+        lines = generate_tree(data_dir, max_entries_per_dir=3)
+
+        # Directories and source files are kept before data files
+        assert lines == [
+            "├── schemas/",
+            "├── loader.py",
+            "├── record_00.json",
+            "└── … 19 more files (1.9 KB, mostly .json)",
+        ]
+
+    def test_summary_for_hidden_directories(self, tmp_path):
+        from deer_code.tools.fs.tree import generate_tree
+
+        for name in ["a", "b", "c"]:
+            (tmp_path / name).mkdir()
+
+        lines = generate_tree(tmp_path, max_entries_per_dir=1)
+
+        assert lines == ["├── a/", "└── … 2 more directories"]
+
+    def test_char_budget_lowers_the_cap(self, data_dir):
+        from deer_code.tools.fs.tree import generate_tree
+
+        full = generate_tree(data_dir)
+        budgeted = generate_tree(data_dir, max_chars=200)
+
+        assert sum(len(line) + 1 for line in full) > 200
+        assert sum(len(line) + 1 for line in budgeted) <= 200
+        assert any("more files" in line for line in budgeted)
+
+    def test_no_budget_lists_everything(self, data_dir):
+        from deer_code.tools.fs.tree import generate_tree
+
+        assert len(generate_tree(data_dir, max_chars=100_000)) == 22
+
+    def test_format_size(self):
+        from deer_code.tools.fs.tree import _format_size
+
+        assert _format_size(512) == "512 B"
+        assert _format_size(2_200_000) == "2.1 MB"
+
+
 class TestIgnorePatterns:
     """Test DEFAULT_IGNORE_PATTERNS functionality."""
 
@@ -176,6 +278,180 @@ class TestIgnorePatterns:
         assert "__pycache__" in patterns_str or "*.pyc" in patterns_str
 
 
+class TestIgnoreMatcher:
+    """Test the compiled ignore matcher shared by ls, tree and grep."""
+
+    def test_default_patterns_match_names_at_any_depth(self):
+        from deer_code.tools.fs.ignore import IgnoreMatcher
+
+        matcher = IgnoreMatcher()
+
+        assert matcher.is_ignored("/project/node_modules", is_dir=True)
+        assert matcher.is_ignored("/project/pkg/__pycache__", is_dir=True)
+        assert matcher.is_ignored("/project/app.pyc")
+        assert matcher.is_ignored("/project/server.log.1")
+        assert not matcher.is_ignored("/project/src/main.py")
+
+    def test_gitignore_layer(self, tmp_path):
+        from deer_code.tools.fs.ignore import IgnoreMatcher
+
+        (tmp_path / ".gitignore").write_text(
+            "# comment\n/generated\n*.sqlite\ncache/\n!keep.sqlite\n"
+        )
+        matcher = IgnoreMatcher([]).with_gitignore(tmp_path)
+
+        assert matcher.is_ignored(tmp_path / "generated", is_dir=True)
+        # Anchored patterns only apply relative to the .gitignore location
+        assert not matcher.is_ignored(tmp_path / "src" / "generated", is_dir=True)
+        assert matcher.is_ignored(tmp_path / "src" / "db.sqlite")
+        assert not matcher.is_ignored(tmp_path / "keep.sqlite")
+        # Directory-only patterns don't match files
+        assert matcher.is_ignored(tmp_path / "cache", is_dir=True)
+        assert not matcher.is_ignored(tmp_path / "cache", is_dir=False)
+
+    def test_nested_gitignore_overrides_parent(self, tmp_path):
+        from deer_code.tools.fs.ignore import IgnoreMatcher
+
+        (tmp_path / ".gitignore").write_text("*.json\n")
+        sub = tmp_path / "config"
+        sub.mkdir()
+        (sub / ".gitignore").write_text("!settings.json\n")
+
+        matcher = IgnoreMatcher([]).with_gitignores(sub, root=tmp_path)
+
+        assert matcher.is_ignored(sub / "data.json")
+        assert not matcher.is_ignored(sub / "settings.json")
+
+    def test_last_matching_pattern_wins(self, tmp_path):
+        from deer_code.tools.fs.ignore import IgnoreMatcher
+
+        (tmp_path / ".gitignore").write_text("!keep.log\n*.log\n!important.log\nbuild/\n!build/\n")
+        matcher = IgnoreMatcher([]).with_gitignore(tmp_path)
+
+        assert matcher.is_ignored(tmp_path / "keep.log")
+        assert not matcher.is_ignored(tmp_path / "important.log")
+        assert not matcher.is_ignored(tmp_path / "build", is_dir=True)
+
+    def test_without_gitignore_returns_same_matcher(self, tmp_path):
+        from deer_code.tools.fs.ignore import IgnoreMatcher
+
+        matcher = IgnoreMatcher()
+
+        assert matcher.with_gitignore(tmp_path) is matcher
+
+    def test_generate_tree_applies_gitignore(self, tmp_path):
+        from deer_code.tools.fs.tree import generate_tree
+
+        sub = tmp_path / "sub"
+        sub.mkdir()
+        (sub / ".gitignore").write_text("secret.txt\n")
+        (sub / "secret.txt").write_text("hidden")
+        (sub / "public.txt").write_text("shown")
+
+        tree_str = "\n".join(generate_tree(tmp_path))
+
+        assert "public.txt" in tree_str
+        assert "secret.txt" not in tree_str
+
+    def test_ripgrep_ignore_file(self):
+        from deer_code.tools.fs.ignore import IgnoreMatcher
+
+        path = IgnoreMatcher(["node_modules/**", "*.pyc"]).ripgrep_ignore_file()
+
+        assert Path(path).read_text().splitlines() == ["node_modules", "*.pyc"]
+
+    def test_ripgrep_ignore_file_is_private_and_checked(self):
+        import stat
+
+        from deer_code.tools.fs.ignore import IgnoreMatcher
+
+        matcher = IgnoreMatcher(["*.secret"])
+        path = Path(matcher.ripgrep_ignore_file())
+
+        assert not stat.S_IMODE(path.parent.stat().st_mode) & 0o077
+        # A file whose content was changed is written again
+        path.write_text("*\n")
+        assert Path(matcher.ripgrep_ignore_file()).read_text() == "*.secret\n"
+
+
+class TestStreamRipgrep:
+    """Test streaming of search output with early termination."""
+
+    def test_collects_all_lines_without_limit(self):
+        from deer_code.tools.fs.grep import _stream_ripgrep
+
+        lines, stderr, returncode = _stream_ripgrep(["seq", "1", "5"])
+
+        assert lines == ["1", "2", "3", "4", "5"]
+        assert stderr == ""
+        assert returncode == 0
+
+    def test_stops_after_head_limit(self):
+        from deer_code.tools.fs.grep import _stream_ripgrep
+
+        # An endless producer would never finish without early termination
+        lines, stderr, returncode = _stream_ripgrep(["yes", "match"], head_limit=3)
+
+        assert lines == ["match", "match", "match"]
+        assert returncode is None
+
+    def test_reports_stderr(self):
+        from deer_code.tools.fs.grep import _stream_ripgrep
+
+        lines, stderr, returncode = _stream_ripgrep(
+            [sys.executable, "-c", "import sys; sys.stderr.write('bad regex'); sys.exit(2)"]
+        )
+
+        assert lines == []
+        assert stderr == "bad regex"
+        assert returncode == 2
+
+
+class TestAsyncTools:
+    """Test the async variants of the fs tools."""
+
+    @pytest.mark.asyncio
+    async def test_astream_stops_after_head_limit(self):
+        from deer_code.tools.fs.grep import _astream_ripgrep
+
+        lines, stderr, returncode = await _astream_ripgrep(["yes", "match"], head_limit=2)
+
+        assert lines == ["match", "match"]
+        assert returncode is None
+
+    @pytest.mark.asyncio
+    async def test_astream_reports_stderr(self):
+        from deer_code.tools.fs.grep import _astream_ripgrep
+
+        lines, stderr, returncode = await _astream_ripgrep(
+            [sys.executable, "-c", "import sys; print('hit'); sys.stderr.write('warn')"]
+        )
+
+        assert lines == ["hit"]
+        assert stderr == "warn"
+        assert returncode == 0
+
+    def test_tools_have_coroutines(self):
+        from deer_code.tools.fs import grep_tool, ls_tool, tree_tool
+
+        for tool in (grep_tool, ls_tool, tree_tool):
+            assert tool.coroutine is not None
+
+    @pytest.mark.asyncio
+    async def test_als_matches_sync_result(self, tmp_path):
+        from unittest.mock import MagicMock
+
+        from deer_code.tools.fs import ls_tool
+
+        runtime = MagicMock()
+        runtime.state = {}
+        (tmp_path / "file.txt").write_text("x")
+
+        result = await ls_tool.coroutine(runtime, path=str(tmp_path))
+
+        assert result == ls_tool.func(runtime, path=str(tmp_path))
+
+
 # Note: Security scenarios and edge cases for ls_tool and tree_tool
 # will be tested during integration testing, as they require proper
 # ToolRuntime setup which is complex to mock in unit tests.
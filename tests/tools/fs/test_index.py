@@ -0,0 +1,251 @@
+"""
+Tests for the trigram index used to narrow grep searches.
+
+This test suite covers:
+1. Literal extraction from regex patterns
+2. Building, querying and incrementally updating the index
+3. Staleness and fallback behavior
+4. Changes reported by the project watcher
+5. Narrowing grep searches with the index
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.fs.index import TrigramIndex
+from deer_code.tools.fs.literals import extract_literals
+
+
+class TestExtractLiterals:
+    """Test extraction of required literals from regex patterns."""
+
+    def test_plain_literal(self):
+        assert extract_literals("hello") == ["hello"]
+
+    def test_split_on_metacharacters(self):
+        assert extract_literals(r"def \w+_tool\(") == ["def ", "_tool("]
+
+    def test_optional_atom_is_dropped(self):
+        assert extract_literals("colou?r") == ["colo", "r"]
+
+    def test_escaped_punctuation_is_literal(self):
+        assert extract_literals(r"interface\{\}") == ["interface{}"]
+
+    def test_groups_and_classes_are_skipped(self):
+        assert extract_literals("foo(bar)?baz[0-9]+qux") == ["foo", "baz", "qux"]
+
+    def test_alternation_has_no_required_literal(self):
+        assert extract_literals("foo|bar") is None
+
+    def test_alternation_inside_class_is_literal(self):
+        assert extract_literals("a[|]bcd") == ["a", "bcd"]
+
+    def test_code_point_escapes_end_the_literal(self):
+        assert extract_literals(r"\x41BC") == ["BC"]
+        assert extract_literals(r"\x{41}BCD") == ["BCD"]
+        assert extract_literals(r"\u00c4rger") == ["rger"]
+        assert extract_literals(r"foo\0123bar") == ["foo", "bar"]
+        assert extract_literals(r"(a)\1xyz") == ["xyz"]
+
+
+class TestTrigramIndex:
+    """Test building and querying the trigram index."""
+
+    @pytest.fixture
+    def project(self, tmp_path):
+        root = tmp_path / "project"
+        (root / "src").mkdir(parents=True)
+        (root / "docs").mkdir()
+        (root / "node_modules").mkdir()
+        (root / "src" / "app.py").write_text("def create_agent():\n    pass\n")
+        (root / "src" / "util.py").write_text("def helper():\n    return 1\n")
+        (root / "docs" / "guide.md").write_text("Call Create_Agent to start.\n")
+        (root / "node_modules" / "dep.js").write_text("create_agent()\n")
+        (root / "setup.py").write_text("name = 'demo'\n")
+        return root
+
+    @pytest.fixture
+    def index(self, project, tmp_path):
+        return TrigramIndex(project, index_dir=tmp_path / "index")
+
+    def test_missing_index_returns_none(self, index):
+        assert index.exists() is False
+        assert index.candidates("create_agent") is None
+
+    def test_build_and_query(self, project, index):
+        stats = index.build(workers=1)
+
+        assert stats["shards"] == 3
+        assert index.exists()
+        candidates = index.candidates("create_agent")
+        # Matching is case-insensitive and ignored directories are excluded
+        assert candidates == [project / "docs" / "guide.md", project / "src" / "app.py"]
+
+    def test_query_restricted_to_path(self, project, index):
+        index.build(workers=1)
+
+        candidates = index.candidates("create_agent", path=project / "src")
+
+        assert candidates == [project / "src" / "app.py"]
+
+    def test_pattern_without_trigrams_is_not_narrowed(self, index):
+        index.build(workers=1)
+
+        assert index.candidates(r"\w+") is None
+        assert index.candidates("ab") is None
+        assert index.candidates("foo|bar") is None
+
+    def test_stale_index_returns_none(self, index):
+        index.build(workers=1)
+
+        assert index.candidates("helper", max_age=3600) is not None
+        assert index.candidates("helper", max_age=-1) is None
+
+    def test_update_rebuilds_only_changed_shards(self, project, index):
+        index.build(workers=1)
+        app = project / "src" / "app.py"
+        app.write_text("def renamed_function():\n    pass\n")
+        # Make sure the mtime changes even on coarse-grained filesystems
+        os.utime(app, ns=(time.time_ns(), time.time_ns() + 10_000_000))
+
+        stats = index.update(workers=1)
+
+        assert stats["rebuilt_shards"] == 1
+        assert index.candidates("renamed_function") == [app]
+        assert index.candidates("create_agent") == [project / "docs" / "guide.md"]
+
+    def test_update_drops_removed_directories(self, project, index):
+        index.build(workers=1)
+        (project / "docs" / "guide.md").unlink()
+        (project / "docs").rmdir()
+
+        stats = index.update(workers=1)
+
+        assert stats["shards"] == 2
+        assert index.candidates("create_agent") == [project / "src" / "app.py"]
+
+    def test_large_files_are_always_candidates(self, project, index, monkeypatch):
+        from deer_code.tools.fs import index as index_module
+
+        monkeypatch.setattr(index_module, "MAX_INDEXED_FILE_SIZE", 10)
+        index.build(workers=1)
+
+        candidates = index.candidates("nothing_matches_this")
+
+        assert project / "src" / "app.py" in candidates
+
+    def test_changed_files_are_candidates_until_update(self, project, index):
+        index.build(workers=1)
+        util = project / "src" / "util.py"
+        util.write_text("def create_agent():\n    pass\n")
+        (project / "docs" / "guide.md").unlink()
+
+        index.note_changes([util, project / "docs" / "guide.md"])
+
+        assert index.candidates("create_agent") == [project / "src" / "app.py", util]
+        index.update(workers=1)
+        assert index._changed == set()
+        assert index.candidates("create_agent") == [project / "src" / "app.py", util]
+
+    def test_escaped_code_points_are_not_dropped(self, project, index):
+        (project / "src" / "abc.txt").write_text("ABCD\n")
+        index.build(workers=1)
+
+        assert project / "src" / "abc.txt" in index.candidates(r"\x41BCD")
+
+    def test_non_ascii_literals_match_regardless_of_case(self, project, index):
+        (project / "docs" / "de.md").write_text("Ärger im Büro\n")
+        index.build(workers=1)
+
+        assert project / "docs" / "de.md" in index.candidates("Ärger")
+        assert project / "docs" / "de.md" in index.candidates("ärger")
+
+    def test_files_written_by_the_agent_are_candidates(self, project, index, monkeypatch):
+        from deer_code.tools.fs import index as index_module
+
+        monkeypatch.setitem(index_module._indexes, str(project.resolve()), index)
+        index.build(workers=1)
+        util = project / "src" / "util.py"
+        util.write_text("def create_agent():\n    pass\n")
+
+        index_module.note_file_changes([str(util)])
+
+        assert util in index.candidates("create_agent")
+        index_module.mark_indexes_stale()
+        assert index.candidates("create_agent") is None
+
+    def test_change_to_root_marks_index_stale(self, project, index):
+        index.build(workers=1)
+
+        index.note_changes([project])
+
+        assert index.stale
+        assert index.candidates("create_agent") is None
+        index.update(workers=1)
+        assert index.candidates("create_agent") is not None
+
+
+class TestGrepWithIndex:
+    """Test that grep answers the same with and without the index."""
+
+    @pytest.fixture
+    def project(self, tmp_path, monkeypatch):
+        import deer_code.config
+        from deer_code.project import project as current_project
+        from deer_code.tools.fs import grep as grep_module
+
+        root = tmp_path / "project"
+        (root / "src" / "pkg").mkdir(parents=True)
+        (root / "src" / "app.py").write_text("needle = 1\n")
+        (root / "src" / "pkg" / "deep.py").write_text("needle = 2\n")
+        (root / "README.md").write_text("needle\n")
+        index = TrigramIndex(root, index_dir=tmp_path / "index")
+        index.build(workers=1)
+
+        self.settings = {"index": False}
+        # ripgrep matches path globs relative to its working directory
+        monkeypatch.chdir(root)
+        monkeypatch.setattr(deer_code.config, "get_config_section", lambda key: self.settings)
+        monkeypatch.setattr(current_project, "_root_dir", str(root))
+        monkeypatch.setattr(grep_module, "get_project_index", lambda root: index)
+        monkeypatch.setattr(grep_module, "get_project_watcher", lambda: None)
+        return root
+
+    def grep(self, project, **kwargs):
+        from deer_code.tools.fs.grep import grep_tool
+
+        runtime = MagicMock()
+        runtime.state = {}
+        kwargs.setdefault("path", str(project))
+        return grep_tool.func(runtime, pattern="needle", **kwargs)
+
+    def grep_both(self, project, **kwargs):
+        """Return the output without and with the index."""
+        self.settings["index"] = False
+        scanned = self.grep(project, **kwargs)
+        self.settings["index"] = True
+        return scanned, self.grep(project, **kwargs)
+
+    @pytest.mark.parametrize("glob", ["*.py", "!*.md", "src/*.py", "src/**"])
+    def test_globs(self, project, glob):
+        scanned, indexed = self.grep_both(project, glob=glob)
+
+        assert "No matches found" not in indexed
+        assert sorted(indexed.splitlines()) == sorted(scanned.splitlines())
+
+    def test_paths_are_printed_like_a_scan(self, project):
+        from deer_code.tools.fs.grep import _narrow_with_index
+
+        scanned, indexed = self.grep_both(project, path="src", output_mode="content")
+
+        assert _narrow_with_index("needle", "src", None, None) == ["src/app.py", "src/pkg/deep.py"]
+        assert sorted(indexed.splitlines()) == sorted(scanned.splitlines())
@@ -0,0 +1,244 @@
+"""
+Tests for the pure-Python search engine used when ripgrep is missing.
+
+This test suite covers:
+1. Output modes and ripgrep's output format
+2. Context lines, line numbers, case and match caps
+3. File selection: ignores, hidden and binary files, globs and types
+4. Parallel search and the grep tool fallback
+"""
+
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.fs import pysearch
+from deer_code.tools.fs.pysearch import iter_files, search
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "node_modules").mkdir()
+    (root / ".hidden").mkdir()
+    (root / "src" / "app.py").write_text(
+        "import os\ndef foo():\n    return 1\n\n\ndef bar():\n    foo()\n    return 2\n"
+    )
+    (root / "src" / "pkg" / "notes.txt").write_text("FOO = 1\nfoo bar\n")
+    (root / "node_modules" / "dep.js").write_text("foo\n")
+    (root / ".hidden" / "secret.txt").write_text("foo\n")
+    (root / ".gitignore").write_text("generated.txt\n")
+    (root / "generated.txt").write_text("foo\n")
+    (root / "data.bin").write_bytes(b"foo\x00\x01\x02")
+    return root
+
+
+class TestOutputModes:
+    """Test the output of each mode."""
+
+    def test_files_with_matches(self, project):
+        assert search("foo", str(project), workers=1) == [
+            f"{project}/src/app.py",
+            f"{project}/src/pkg/notes.txt",
+        ]
+
+    def test_content_with_line_numbers(self, project):
+        assert search("foo", str(project), output_mode="content", n=True, workers=1) == [
+            f"{project}/src/app.py:2:def foo():",
+            f"{project}/src/app.py:7:    foo()",
+            f"{project}/src/pkg/notes.txt:2:foo bar",
+        ]
+
+    def test_count_counts_matching_lines(self, project):
+        assert search("o", str(project), output_mode="count", workers=1) == [
+            f"{project}/src/app.py:3",
+            f"{project}/src/pkg/notes.txt:1",
+        ]
+
+    def test_single_file_has_no_filename(self, project):
+        app = str(project / "src" / "app.py")
+
+        assert search("foo", app, output_mode="content", n=True) == [
+            "2:def foo():",
+            "7:    foo()",
+        ]
+        assert search("foo", app, output_mode="count") == ["2"]
+
+    def test_relative_paths_keep_their_form(self, project, monkeypatch):
+        monkeypatch.chdir(project)
+
+        assert search("bar", ".", workers=1) == ["./src/app.py", "./src/pkg/notes.txt"]
+
+
+class TestSearchOptions:
+    """Test context, case, limits and multiline matching."""
+
+    def test_context_lines_and_separators(self, project):
+        app = str(project / "src" / "app.py")
+
+        assert search("foo", app, output_mode="content", n=True, A=1) == [
+            "2:def foo():",
+            "3-    return 1",
+            "--",
+            "7:    foo()",
+            "8-    return 2",
+        ]
+        assert search("bar", app, output_mode="content", C=1) == [
+            "",
+            "def bar():",
+            "    foo()",
+        ]
+
+    def test_overlapping_context_is_merged(self, project):
+        notes = str(project / "src" / "pkg" / "notes.txt")
+
+        assert search("(?i)foo", notes, output_mode="content", n=True, C=2) == [
+            "1:FOO = 1",
+            "2:foo bar",
+        ]
+
+    def test_case_insensitive(self, project):
+        notes = str(project / "src" / "pkg" / "notes.txt")
+
+        assert search("foo", notes, output_mode="count") == ["1"]
+        assert search("foo", notes, output_mode="count", i=True) == ["2"]
+
+    def test_case_insensitive_non_ascii(self, project):
+        notes = project / "src" / "pkg" / "umlauts.txt"
+        notes.write_text("Ärger im Büro\n")
+
+        assert search("ärger", str(notes), output_mode="count", i=True) == ["1"]
+        assert search("ÄRGER IM BÜRO", str(notes), output_mode="count", i=True) == ["1"]
+        assert search("ärger", str(notes), output_mode="count") == []
+
+    def test_code_point_escapes(self, project):
+        notes = str(project / "src" / "pkg" / "notes.txt")
+
+        assert search(r"\x46OO", notes, output_mode="count") == ["1"]
+
+    def test_max_count_and_head_limit(self, project):
+        assert search("foo", str(project), output_mode="content", max_count=1, workers=1) == [
+            f"{project}/src/app.py:def foo():",
+            f"{project}/src/pkg/notes.txt:foo bar",
+        ]
+        assert search("foo", str(project), output_mode="content", head_limit=1, workers=1) == [
+            f"{project}/src/app.py:def foo():",
+        ]
+
+    def test_multiline(self, project):
+        app = str(project / "src" / "app.py")
+
+        assert search(r"foo\(\):\n\s+return", app, output_mode="content") == []
+        assert search(r"foo\(\):\n\s+return", app, output_mode="content", multiline=True) == [
+            "def foo():",
+            "    return 1",
+        ]
+
+    def test_invalid_regex(self, project):
+        with pytest.raises(ValueError, match="regex parse error"):
+            search("foo(", str(project))
+
+    def test_missing_path(self, project):
+        with pytest.raises(ValueError, match="No such file or directory"):
+            search("foo", str(project / "missing"))
+
+
+class TestFileSelection:
+    """Test which files are searched."""
+
+    def test_skips_ignored_hidden_and_binary_files(self, project):
+        files = list(iter_files(str(project)))
+
+        assert f"{project}/generated.txt" not in files
+        assert f"{project}/node_modules/dep.js" not in files
+        assert f"{project}/.hidden/secret.txt" not in files
+        # Binary files are listed but never match
+        assert search("foo", str(project / "data.bin")) == []
+
+    def test_glob_with_braces_and_negation(self, project):
+        assert list(iter_files(str(project), glob="*.{py,txt}")) == [
+            f"{project}/src/app.py",
+            f"{project}/src/pkg/notes.txt",
+        ]
+        assert list(iter_files(str(project), glob="!*.txt")) == [
+            f"{project}/data.bin",
+            f"{project}/src/app.py",
+        ]
+
+    @pytest.mark.skipif(shutil.which("rg") is None, reason="ripgrep is not installed")
+    @pytest.mark.parametrize(
+        "glob", ["src/*.py", "src/**", "src/**/*.py", "**/b/*.py", "/a/*.py", "*.py", "!src/*.py"]
+    )
+    def test_globs_select_the_files_ripgrep_selects(self, tmp_path, monkeypatch, glob):
+        for path in ["src/app.py", "src/a/b/deep.py", "src/a/mid.py", "a/top.py", "a/b/c.py", "x/b/d.py"]:
+            (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / path).write_text("foo\n")
+        monkeypatch.chdir(tmp_path)
+
+        ripgrep = subprocess.run(
+            ["rg", "--files", "--glob", glob], capture_output=True, text=True
+        ).stdout.split()
+
+        assert sorted(iter_files(".", glob=glob)) == sorted(f"./{path}" for path in ripgrep)
+
+    def test_type(self, project):
+        assert list(iter_files(str(project), type="py")) == [f"{project}/src/app.py"]
+        with pytest.raises(ValueError, match="unrecognized file type"):
+            search("foo", str(project), type="nope")
+
+    def test_explicit_files(self, project):
+        notes = str(project / "src" / "pkg" / "notes.txt")
+
+        assert search("foo", str(project), files=[notes], output_mode="count") == [f"{notes}:1"]
+
+
+class TestParallelSearch:
+    """Test searching across worker processes."""
+
+    def test_parallel_results_match_serial_results(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(pysearch, "PARALLEL_MIN_FILES", 4)
+        for index in range(40):
+            (tmp_path / f"file{index:02}.txt").write_text(f"line {index}\nneedle {index}\n")
+
+        serial = search("needle", str(tmp_path), output_mode="content", n=True, workers=1)
+        try:
+            parallel = search("needle", str(tmp_path), output_mode="content", n=True, workers=2)
+        finally:
+            pysearch.shutdown_workers()
+
+        assert len(serial) == 40
+        assert parallel == serial
+
+
+class TestGrepToolFallback:
+    """Test that grep_tool uses the built-in engine when ripgrep is missing."""
+
+    def test_grep_tool_without_ripgrep(self, project, monkeypatch):
+        # Load config.yaml from the working directory before leaving it
+        import deer_code.config  # noqa: F401
+        from deer_code.project import project as current_project
+        from deer_code.tools.fs import grep as grep_module
+        from deer_code.tools.fs.cache import FsResultCache
+
+        monkeypatch.chdir(project)
+        monkeypatch.setattr(current_project, "_root_dir", str(project))
+        monkeypatch.setattr(grep_module, "_ripgrep_available", lambda: False)
+        monkeypatch.setattr(grep_module, "fs_cache", FsResultCache())
+        runtime = MagicMock()
+        runtime.state = {}
+
+        result = grep_module.grep_tool.func(
+            runtime, pattern="def \\w+", path=str(project), output_mode="content", n=True
+        )
+
+        assert f"{project}/src/app.py:2:def foo():" in result
+        assert f"{project}/src/app.py:6:def bar():" in result
@@ -52,6 +52,14 @@ class TestBashTerminalBasics:
         finally:
             terminal.close()
 
+    def test_getcwd_has_no_control_sequences(self, tmp_path):
+        """Test that getcwd returns a usable path, even with bracketed paste mode."""
+        terminal = BashTerminal(cwd=str(tmp_path))
+        try:
+            assert os.path.samefile(terminal.getcwd(), str(tmp_path))
+        finally:
+            terminal.close()
+
     def test_simple_command_execution(self):
         """Test executing a simple command."""
         terminal = BashTerminal()
@@ -126,6 +134,80 @@ class TestBashTerminalWorkingDirectory:
             terminal.close()
 
 
+class TestBashTerminalReset:
+    """Test resetting the shell in place."""
+
+    def test_reset_restores_cwd_and_environment(self, tmp_path):
+        """Test that reset undoes directory and environment changes without a new shell."""
+        (tmp_path / "subdir").mkdir()
+        terminal = BashTerminal(cwd=str(tmp_path))
+        try:
+            path = terminal.execute("printenv PATH")
+            pid = terminal.shell.pid
+            terminal.execute("cd subdir")
+            terminal.execute("export DEER_CODE_TEST=1")
+            terminal.execute("export PATH=/nowhere")
+
+            terminal.reset()
+
+            assert terminal.getcwd() == str(tmp_path)
+            assert terminal.run("printenv DEER_CODE_TEST").exit_code == 1
+            assert terminal.execute("printenv PATH") == path
+            assert terminal.shell.pid == pid
+        finally:
+            terminal.close()
+
+    def test_saved_environment_cannot_be_removed(self, tmp_path):
+        """Test that commands can't break reset by changing the saved environment."""
+        terminal = BashTerminal(cwd=str(tmp_path))
+        try:
+            assert terminal.run("unset __deer_code_env").exit_code != 0
+            assert terminal.run("declare __deer_code_env=").exit_code != 0
+            terminal.execute("export PATH=/nowhere")
+
+            terminal.reset()
+
+            assert terminal.run("ls").exit_code == 0
+        finally:
+            terminal.close()
+
+    def test_reset_starts_a_new_shell_when_needed(self, tmp_path, monkeypatch):
+        """Test that reset recovers a shell that lost its prompt sentinel."""
+        monkeypatch.setattr(bash_terminal, "RESET_TIMEOUT", 0.5)
+        terminal = BashTerminal(cwd=str(tmp_path))
+        try:
+            pid = terminal.shell.pid
+            terminal.shell.sendline("exec /bin/bash --norc --noediting")
+
+            terminal.reset()
+
+            assert terminal.shell.pid != pid
+            assert terminal.execute("echo alive") == "alive"
+            assert terminal.getcwd() == str(tmp_path)
+        finally:
+            terminal.close()
+
+    def test_reset_to_another_directory(self, tmp_path):
+        """Test that reset changes to the given directory."""
+        other = tmp_path / "other dir"
+        other.mkdir()
+        terminal = BashTerminal(cwd=str(tmp_path))
+        try:
+            terminal.reset(str(other))
+            assert terminal.getcwd() == str(other)
+        finally:
+            terminal.close()
+
+    def test_terminal_without_rc_files(self, tmp_path):
+        """Test that a terminal skipping the rc files works."""
+        terminal = BashTerminal(cwd=str(tmp_path), load_rc=False)
+        try:
+            assert terminal.execute("echo hello") == "hello"
+            assert terminal.getcwd() == str(tmp_path)
+        finally:
+            terminal.close()
+
+
 class TestBashTerminalFileOperations:
     """Test file operations through bash commands."""
 
@@ -454,3 +536,103 @@ class TestBashTerminalTimeout:
                 terminal.execute("sleep 35")
         finally:
             terminal.close()
+
+
+class TestBashTerminalStreaming:
+    """Test streaming output while a command runs."""
+
+    def test_output_arrives_in_chunks(self):
+        """Test that output is passed to the callback before the command ends."""
+        terminal = BashTerminal()
+        chunks = []
+        try:
+            result = terminal.execute(
+                "python3 -u -c \"[print(i) or __import__('time').sleep(0.3) for i in range(3)]\"",
+                on_output=chunks.append,
+            )
+            assert len(chunks) >= 2
+            assert "".join(chunks).split() == ["0", "1", "2"]
+            assert "\x1b" not in "".join(chunks)
+            assert "0\n1\n2" in result
+        finally:
+            terminal.close()
+
+    def test_prompt_is_never_streamed(self):
+        """Test that a prompt split across reads is held back."""
+        assert bash_terminal._pending_length("output\nBASH_TERM", "BASH_TERMINAL_PROMPT> ") == 9
+        assert bash_terminal._pending_length("output\n\x1b[?20", "BASH_TERMINAL_PROMPT> ") == 5
+        assert bash_terminal._pending_length("output\n", "BASH_TERMINAL_PROMPT> ") == 0
+
+    def test_streaming_timeout(self, monkeypatch):
+        """Test that streamed commands still time out."""
+        monkeypatch.setattr(bash_terminal, "COMMAND_TIMEOUT", 0.5)
+        terminal = BashTerminal()
+        try:
+            with pytest.raises(bash_terminal.pexpect.TIMEOUT):
+                terminal.execute("sleep 2", on_output=lambda chunk: None)
+        finally:
+            terminal.close()
+
+
+class TestBashTerminalCommandResult:
+    """Test the exit code, working directory and duration read from the prompt sentinel."""
+
+    def test_run_reports_exit_code(self, tmp_path):
+        """Test that run returns the exit code of the command."""
+        terminal = BashTerminal(cwd=str(tmp_path))
+        try:
+            assert terminal.run("echo hello").exit_code == 0
+            result = terminal.run("bash -c 'exit 3'")
+            assert result.exit_code == 3
+            assert result.output == ""
+            assert result.duration_ms >= 0
+        finally:
+            terminal.close()
+
+    def test_run_reports_cwd_without_extra_commands(self, tmp_path, monkeypatch):
+        """Test that the working directory is tracked from the sentinel."""
+        (tmp_path / "subdir").mkdir()
+        terminal = BashTerminal(cwd=str(tmp_path))
+        try:
+            result = terminal.run("cd subdir")
+            assert os.path.samefile(result.cwd, str(tmp_path / "subdir"))
+
+            # getcwd answers without running a command
+            with monkeypatch.context() as patch:
+                patch.setattr(terminal.shell, "sendline", None)
+                assert terminal.getcwd() == result.cwd
+        finally:
+            terminal.close()
+
+    def test_output_without_trailing_newline(self):
+        """Test that output not ending with a newline is kept whole."""
+        terminal = BashTerminal()
+        try:
+            assert terminal.execute("printf abc") == "abc"
+            assert terminal.execute("echo next") == "next"
+        finally:
+            terminal.close()
+
+    def test_sentinel_is_never_streamed(self):
+        """Test that neither the sentinel nor the prompt reach the output callback."""
+        terminal = BashTerminal()
+        chunks = []
+        try:
+            terminal.run("echo hello", on_output=chunks.append)
+            assert "".join(chunks).strip() == "hello"
+        finally:
+            terminal.close()
+
+    def test_output_of_timed_out_command_is_dropped(self, monkeypatch):
+        """Test that late output of a timed out command is not taken for the next command's."""
+        monkeypatch.setattr(bash_terminal, "COMMAND_TIMEOUT", 0.5)
+        terminal = BashTerminal()
+        try:
+            with pytest.raises(bash_terminal.pexpect.TIMEOUT):
+                terminal.run("python3 -c \"__import__('time').sleep(1) or print('late')\"")
+            monkeypatch.setattr(bash_terminal, "COMMAND_TIMEOUT", 5)
+            result = terminal.run("echo next")
+            assert result.output == "next"
+            assert result.exit_code == 0
+        finally:
+            terminal.close()
@@ -0,0 +1,121 @@
+"""
+Tests for background bash jobs.
+
+This test suite covers:
+1. Starting jobs and reading their output incrementally
+2. Waiting for, killing and listing jobs
+3. Output limits and job limits
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.terminal import jobs
+from deer_code.tools.terminal.command_validator import CommandValidationError
+from deer_code.tools.terminal.jobs import JobManager
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager()
+    yield manager
+    manager.close()
+
+
+class TestJobs:
+    """Test running commands as background jobs."""
+
+    def test_start_returns_immediately(self, tmp_path, manager):
+        start = time.monotonic()
+        job = manager.start("sleep 5", str(tmp_path))
+
+        assert time.monotonic() - start < 1
+        assert job.id == "job-1"
+        assert job.is_running
+        assert job.status.startswith("running for")
+
+    def test_output_is_read_incrementally(self, tmp_path, manager):
+        job = manager.start(
+            "python3 -u -c \"[print(i) or __import__('time').sleep(0.5) for i in range(2)]\"",
+            str(tmp_path),
+        )
+
+        time.sleep(0.3)
+        first = job.read_output()
+        assert job.wait(5)
+        rest = job.read_output()
+
+        assert first.split() == ["0"]
+        assert rest.split() == ["1"]
+        assert job.read_output() == ""
+        assert job.exit_code == 0
+        assert job.status.startswith("exited with code 0")
+
+    def test_runs_in_cwd_and_reports_exit_code(self, tmp_path, manager):
+        (tmp_path / "marker.txt").write_text("")
+        job = manager.start("ls", str(tmp_path))
+        failed = manager.start("false", str(tmp_path))
+
+        assert job.wait(5) and failed.wait(5)
+        assert "marker.txt" in job.read_output()
+        assert failed.exit_code == 1
+
+    def test_kill_stops_the_whole_process_group(self, tmp_path, manager):
+        job = manager.start("bash -c 'sleep 30 | cat'", str(tmp_path))
+
+        job.kill()
+
+        assert not job.is_running
+        assert job.status.startswith("killed")
+
+    def test_jobs_run_side_by_side(self, tmp_path, manager):
+        start = time.monotonic()
+        started = [manager.start("sleep 1", str(tmp_path)) for _ in range(3)]
+
+        assert all(job.wait(5) for job in started)
+        assert time.monotonic() - start < 2.5
+        assert [job.id for job in manager.list()] == ["job-1", "job-2", "job-3"]
+
+    def test_dropped_output_is_reported(self, tmp_path, manager, monkeypatch):
+        monkeypatch.setattr(jobs, "MAX_JOB_OUTPUT_CHARS", 100)
+        job = manager.start("seq 1000", str(tmp_path))
+
+        assert job.wait(5)
+        output = job.read_output()
+
+        assert output.startswith("[")
+        assert "characters of output were dropped" in output
+        assert output.rstrip().endswith("1000")
+
+
+class TestJobManager:
+    """Test the job manager."""
+
+    def test_commands_are_validated(self, tmp_path, manager):
+        with pytest.raises(CommandValidationError):
+            manager.start("sleep 1; rm -rf /", str(tmp_path))
+
+    def test_unknown_job(self, manager):
+        with pytest.raises(ValueError, match="No job with id job-9"):
+            manager.get("job-9")
+
+    def test_finished_jobs_make_room(self, tmp_path):
+        manager = JobManager(max_jobs=2)
+        try:
+            done = manager.start("true", str(tmp_path))
+            assert done.wait(5)
+            manager.start("sleep 5", str(tmp_path))
+            manager.start("sleep 5", str(tmp_path))
+
+            assert done not in manager.list()
+            with pytest.raises(ValueError, match="2 jobs are already running"):
+                manager.start("sleep 5", str(tmp_path))
+        finally:
+            manager.close()
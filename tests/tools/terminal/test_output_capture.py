@@ -0,0 +1,97 @@
+"""
+Tests for bounded output capture.
+
+This test suite covers:
+1. Short output kept whole in memory
+2. Long output cut to its start and end and spilled to a file
+3. Long output of BashTerminal commands
+"""
+
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.terminal.bash_terminal import BashTerminal
+from deer_code.tools.terminal.output_capture import OutputCapture
+
+
+def numbered_lines(count: int) -> str:
+    return "".join(f"line {index}\n" for index in range(1, count + 1))
+
+
+class TestOutputCapture:
+    """Test OutputCapture."""
+
+    def test_short_output_is_kept_whole(self, tmp_path):
+        with OutputCapture(max_chars=100, spill_dir=str(tmp_path)) as capture:
+            capture.write("hello\n")
+            capture.write("world\n")
+
+        assert not capture.truncated
+        assert capture.text == "hello\nworld\n"
+        assert (capture.total_bytes, capture.total_lines) == (12, 2)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_long_output_keeps_head_and_tail(self, tmp_path):
+        output = numbered_lines(1000)
+
+        with OutputCapture(max_chars=200, spill_dir=str(tmp_path)) as capture:
+            for start in range(0, len(output), 37):
+                capture.write(output[start : start + 37])
+
+        assert capture.truncated
+        assert capture.head.startswith("line 1\n") and capture.head.endswith("\n")
+        assert capture.tail.endswith("line 1000\n")
+        assert capture.tail.startswith("line ")
+        assert len(capture.head) <= 100 and len(capture.tail) <= 100
+        assert Path(capture.spill_path).read_text() == output
+        with pytest.raises(ValueError):
+            capture.text
+
+    def test_summary_reports_totals(self, tmp_path):
+        with OutputCapture(max_chars=40, spill_dir=str(tmp_path)) as capture:
+            capture.write("é" * 10 + "\n" + numbered_lines(20))
+
+        summary = capture.summary()
+        omitted = 21 - capture.head.count("\n") - capture.tail.count("\n")
+        assert summary.startswith(f"[{omitted} lines omitted.")
+        assert f"wrote {capture.total_bytes} bytes in 21 lines" in summary
+        assert capture.total_bytes == len(("é" * 10 + "\n" + numbered_lines(20)).encode())
+        assert capture.spill_path in summary
+
+
+class TestBashTerminalOutputLimit:
+    """Test the output limit of BashTerminal."""
+
+    def test_long_output_is_cut_and_saved(self, tmp_path):
+        terminal = BashTerminal(max_output_chars=2000, spill_dir=str(tmp_path))
+        try:
+            result = terminal.execute("seq 100000")
+
+            assert result.startswith("1\n2\n3")
+            assert result.endswith("99999\n100000")
+            assert "lines omitted" in result
+            # Bash may print a newline before the output
+            assert re.search(r"in 10000[01] lines", result)
+            assert len(result) < 3000
+            (spill_file,) = tmp_path.iterdir()
+            assert spill_file.read_text().split() == [str(i) for i in range(1, 100001)]
+
+            # The terminal keeps working after a long output
+            assert terminal.execute("echo done") == "done"
+        finally:
+            terminal.close()
+
+    def test_short_output_is_not_saved(self, tmp_path):
+        terminal = BashTerminal(max_output_chars=2000, spill_dir=str(tmp_path))
+        try:
+            assert terminal.execute("seq 3") == "1\n2\n3"
+            assert list(tmp_path.iterdir()) == []
+        finally:
+            terminal.close()
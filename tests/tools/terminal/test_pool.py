@@ -0,0 +1,132 @@
+"""
+Tests for the pool of bash terminals.
+
+This test suite covers:
+1. Starting spare terminals in the background
+2. Handing out a terminal per conversation
+3. Replacing exited terminals and closing idle ones
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path for direct import
+src_path = Path(__file__).parent.parent.parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from deer_code.tools.terminal.bash_terminal import BashTerminal
+from deer_code.tools.terminal.pool import TerminalPool
+
+
+def wait_for_spares(pool: TerminalPool, count: int, timeout: float = 10) -> bool:
+    deadline = time.monotonic() + timeout
+    while pool.spare_count < count:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+@pytest.fixture
+def started():
+    """Terminals started by the pool's factory."""
+    return []
+
+
+@pytest.fixture
+def make_pool(tmp_path, started):
+    pools = []
+
+    def make_pool(**kwargs):
+        def factory():
+            terminal = BashTerminal(str(tmp_path), load_rc=False)
+            started.append(terminal)
+            return terminal
+
+        pool = TerminalPool(factory, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make_pool
+    for pool in pools:
+        pool.close()
+
+
+class TestTerminalPool:
+    """Test TerminalPool."""
+
+    def test_warm_starts_spares_in_background(self, make_pool, started):
+        pool = make_pool(size=2)
+
+        start = time.monotonic()
+        pool.warm()
+        assert time.monotonic() - start < 0.5
+
+        assert wait_for_spares(pool, 2)
+        pool.warm()
+        time.sleep(0.2)
+        assert len(started) == 2
+
+    def test_spare_is_handed_out_and_replaced(self, make_pool, started, tmp_path):
+        pool = make_pool(size=1)
+        pool.warm()
+        assert wait_for_spares(pool, 1)
+        spare = started[0]
+
+        with pool.session("thread-1", str(tmp_path)) as terminal:
+            assert terminal is spare
+
+        assert wait_for_spares(pool, 1)
+        assert len(started) == 2
+
+    def test_conversations_get_their_own_terminal(self, make_pool, tmp_path):
+        pool = make_pool(size=0)
+        (tmp_path / "subdir").mkdir()
+
+        with pool.session("thread-1", str(tmp_path)) as terminal:
+            terminal.execute("cd subdir")
+        with pool.session("thread-2", str(tmp_path)) as terminal:
+            assert terminal.getcwd() == str(tmp_path)
+        with pool.session("thread-1", str(tmp_path)) as terminal:
+            assert terminal.getcwd() == str(tmp_path / "subdir")
+
+    def test_new_terminal_is_moved_to_cwd(self, make_pool, tmp_path):
+        pool = make_pool(size=0)
+        (tmp_path / "subdir").mkdir()
+
+        with pool.session("thread-1", str(tmp_path / "subdir")) as terminal:
+            assert terminal.getcwd() == str(tmp_path / "subdir")
+
+    def test_exited_terminal_is_replaced(self, make_pool, started, tmp_path):
+        pool = make_pool(size=0)
+        with pool.session("thread-1", str(tmp_path)) as terminal:
+            terminal.close()
+
+        with pool.session("thread-1", str(tmp_path)) as terminal:
+            assert terminal.execute("echo alive") == "alive"
+        assert len(started) == 2
+
+    def test_idle_terminals_are_closed(self, make_pool, tmp_path):
+        pool = make_pool(size=0, idle_timeout=0.2)
+        with pool.session("thread-1", str(tmp_path)) as idle:
+            pass
+
+        time.sleep(0.3)
+        with pool.session("thread-2", str(tmp_path)) as active:
+            pass
+
+        assert not idle.shell.isalive()
+        assert active.shell.isalive()
+
+    def test_close_closes_every_terminal(self, make_pool, started, tmp_path):
+        pool = make_pool(size=1)
+        with pool.session("thread-1", str(tmp_path)):
+            pass
+        assert wait_for_spares(pool, 1)
+
+        pool.close()
+
+        assert not any(terminal.shell.isalive() for terminal in started)